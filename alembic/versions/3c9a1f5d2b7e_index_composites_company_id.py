@@ -0,0 +1,63 @@
+"""Index composites company_id (articles, retraits, chantiers, users)
+
+Revision ID: 3c9a1f5d2b7e
+Revises: 7e0ec40b883f
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9a1f5d2b7e'
+down_revision: Union[str, Sequence[str], None] = '7e0ec40b883f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (nom, table, colonnes) — mêmes définitions que __table_args__ dans models.py
+INDEXES = [
+    ('ix_articles_company_id_nom', 'articles', ['company_id', 'nom']),
+    ('ix_retraits_company_id_date_retrait', 'retraits', ['company_id', 'date_retrait', 'id']),
+    ('ix_chantiers_company_id_date_creation', 'chantiers', ['company_id', 'date_creation', 'id']),
+    ('ix_users_company_id', 'users', ['company_id']),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema - Index composites multi-entreprises.
+
+    Sur PostgreSQL : CREATE INDEX CONCURRENTLY (pas de verrou d'écriture sur
+    les tables), hors transaction. IF NOT EXISTS car Base.metadata.create_all
+    au démarrage de l'API a pu les créer avant la migration.
+    """
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns,
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=is_postgres,
+            )
+
+    print("✅ Index composites company_id créés")
+
+
+def downgrade() -> None:
+    """Downgrade schema - Suppression des index composites."""
+    is_postgres = op.get_bind().dialect.name == 'postgresql'
+
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(
+                name, table_name=table,
+                if_exists=True,
+                postgresql_concurrently=is_postgres,
+            )
+
+    print("✅ Downgrade terminé - Index composites supprimés")
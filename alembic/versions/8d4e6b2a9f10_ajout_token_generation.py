@@ -0,0 +1,44 @@
+"""Ajout token_generation sur users et companies
+
+Revision ID: 8d4e6b2a9f10
+Revises: 3c9a1f5d2b7e
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4e6b2a9f10'
+down_revision: Union[str, Sequence[str], None] = '3c9a1f5d2b7e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ['users', 'companies']
+
+
+def upgrade() -> None:
+    """Upgrade schema - Génération de token (révocation des JWT)."""
+    inspector = sa.inspect(op.get_bind())
+
+    for table in TABLES:
+        columns = [col['name'] for col in inspector.get_columns(table)]
+        if 'token_generation' not in columns:
+            op.add_column(table, sa.Column(
+                'token_generation', sa.Integer(), nullable=False, server_default='0'
+            ))
+
+    print("✅ Colonnes token_generation ajoutées")
+
+
+def downgrade() -> None:
+    """Downgrade schema - Suppression des colonnes token_generation."""
+    for table in reversed(TABLES):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('token_generation')
+
+    print("✅ Downgrade terminé - Colonnes token_generation supprimées")
@@ -0,0 +1,53 @@
+"""Ajout synonymes de catégorie par entreprise
+
+Revision ID: a7c3e5f1b9d2
+Revises: f3c9d2e8a7b1
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e5f1b9d2'
+down_revision: Union[str, Sequence[str], None] = 'f3c9d2e8a7b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Upgrade schema - Table categorie_synonymes (mots-clés de catégorie propres
+    à une entreprise). Les articles sans catégorie se classent ensuite avec
+    `python categories.py`.
+    """
+    inspector = sa.inspect(op.get_bind())
+    if 'categorie_synonymes' in inspector.get_table_names():
+        print("ℹ️ Table categorie_synonymes déjà présente")
+        return
+
+    op.create_table(
+        'categorie_synonymes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('categorie', sa.String(), nullable=False),
+        sa.Column('mot', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_categorie_synonymes_company_id_mot', 'categorie_synonymes', ['company_id', 'mot'], unique=True
+    )
+
+    print("✅ Table categorie_synonymes créée")
+
+
+def downgrade() -> None:
+    """Downgrade schema - Suppression des synonymes de catégorie."""
+    op.drop_index('ix_categorie_synonymes_company_id_mot', table_name='categorie_synonymes')
+    op.drop_table('categorie_synonymes')
+
+    print("✅ Downgrade terminé - Synonymes de catégorie supprimés")
@@ -0,0 +1,60 @@
+"""Ajout table email_outbox
+
+Revision ID: b5f2c7d1e3a4
+Revises: 8d4e6b2a9f10
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5f2c7d1e3a4'
+down_revision: Union[str, Sequence[str], None] = '8d4e6b2a9f10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+email_status = sa.Enum('PENDING', 'SENT', 'FAILED', 'SIMULATED', name='emailstatusenum')
+
+
+def upgrade() -> None:
+    """Upgrade schema - Outbox des emails (envoi asynchrone)."""
+    inspector = sa.inspect(op.get_bind())
+    if 'email_outbox' in inspector.get_table_names():
+        print("ℹ️ Table email_outbox déjà présente")
+        return
+
+    op.create_table(
+        'email_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('to_email', sa.String(), nullable=False),
+        sa.Column('subject', sa.String(), nullable=False),
+        sa.Column('body', sa.Text(), nullable=False),
+        sa.Column('status', email_status, nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_email_outbox_id', 'email_outbox', ['id'])
+    op.create_index(
+        'ix_email_outbox_status_next_attempt_at', 'email_outbox', ['status', 'next_attempt_at']
+    )
+
+    print("✅ Table email_outbox créée")
+
+
+def downgrade() -> None:
+    """Downgrade schema - Suppression de la table email_outbox."""
+    op.drop_index('ix_email_outbox_status_next_attempt_at', table_name='email_outbox')
+    op.drop_index('ix_email_outbox_id', table_name='email_outbox')
+    op.drop_table('email_outbox')
+    email_status.drop(op.get_bind(), checkfirst=True)
+
+    print("✅ Downgrade terminé - Table email_outbox supprimée")
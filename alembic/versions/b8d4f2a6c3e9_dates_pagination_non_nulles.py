@@ -0,0 +1,50 @@
+"""Dates de pagination non nulles (retraits.date_retrait, chantiers.date_creation)
+
+Revision ID: b8d4f2a6c3e9
+Revises: a7c3e5f1b9d2
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d4f2a6c3e9'
+down_revision: Union[str, Sequence[str], None] = 'a7c3e5f1b9d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, colonne) : premières colonnes des clés de pagination (date, id)
+COLONNES = (('retraits', 'date_retrait'), ('chantiers', 'date_creation'))
+
+
+def upgrade() -> None:
+    """
+    Upgrade schema - Les lignes anciennes sans date reçoivent la plus ancienne
+    date de la table (maintenant si aucune), puis la colonne devient NOT NULL :
+    une date NULL en fin de page faisait disparaître toutes les lignes
+    suivantes de la pagination keyset.
+    """
+    for table, colonne in COLONNES:
+        op.execute(
+            f"UPDATE {table} SET {colonne} = COALESCE("
+            f"(SELECT MIN({colonne}) FROM {table}), CURRENT_TIMESTAMP"
+            f") WHERE {colonne} IS NULL"
+        )
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(colonne, existing_type=sa.DateTime(), nullable=False)
+
+    print("✅ Dates de pagination renseignées et NOT NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema - Colonnes de date à nouveau nullables."""
+    for table, colonne in reversed(COLONNES):
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(colonne, existing_type=sa.DateTime(), nullable=True)
+
+    print("✅ Downgrade terminé - Dates de pagination nullables")
@@ -0,0 +1,77 @@
+"""Ajout statistiques de stock par entreprise (maintenues par deltas)
+
+Revision ID: c81d4f0a6e29
+Revises: b5f2c7d1e3a4
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81d4f0a6e29'
+down_revision: Union[str, Sequence[str], None] = 'b5f2c7d1e3a4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEUIL_ALERTE = 10  # = stock_stats.SEUIL_ALERTE
+
+
+def upgrade() -> None:
+    """Upgrade schema - Tables company_stock_stats / company_category_stats, remplies depuis articles."""
+    inspector = sa.inspect(op.get_bind())
+    if 'company_stock_stats' in inspector.get_table_names():
+        print("ℹ️ Tables de statistiques déjà présentes")
+        return
+
+    op.create_table(
+        'company_stock_stats',
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('total_articles', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('stock_total', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('alertes_stock_faible', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('categories', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id']),
+        sa.PrimaryKeyConstraint('company_id'),
+    )
+    op.create_table(
+        'company_category_stats',
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('categorie', sa.String(), nullable=False),
+        sa.Column('nombre_articles', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('stock_total', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id']),
+        sa.PrimaryKeyConstraint('company_id', 'categorie'),
+    )
+
+    # Remplissage initial (équivalent de `python stock_stats.py`)
+    op.execute("""
+        INSERT INTO company_category_stats (company_id, categorie, nombre_articles, stock_total)
+        SELECT company_id, COALESCE(category, ''), COUNT(id), COALESCE(SUM(quantite), 0)
+        FROM articles
+        WHERE company_id IS NOT NULL
+        GROUP BY company_id, COALESCE(category, '')
+    """)
+    op.execute(f"""
+        INSERT INTO company_stock_stats (company_id, total_articles, stock_total, alertes_stock_faible, categories)
+        SELECT a.company_id, COUNT(a.id), COALESCE(SUM(a.quantite), 0),
+               COUNT(CASE WHEN a.quantite <= {SEUIL_ALERTE} THEN 1 END),
+               COUNT(DISTINCT COALESCE(a.category, ''))
+        FROM articles a
+        WHERE a.company_id IS NOT NULL
+        GROUP BY a.company_id
+    """)
+
+    print("✅ Tables de statistiques de stock créées et remplies")
+
+
+def downgrade() -> None:
+    """Downgrade schema - Suppression des tables de statistiques."""
+    op.drop_table('company_category_stats')
+    op.drop_table('company_stock_stats')
+
+    print("✅ Downgrade terminé - Tables de statistiques supprimées")
@@ -0,0 +1,40 @@
+"""Outbox : corps des emails terminés effacé (mot de passe temporaire)
+
+Revision ID: c9e5a3b7d1f4
+Revises: b8d4f2a6c3e9
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e5a3b7d1f4'
+down_revision: Union[str, Sequence[str], None] = 'b8d4f2a6c3e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Upgrade schema - email_outbox.body devient nullable ; le corps des emails
+    déjà envoyés / simulés / abandonnés (mots de passe temporaires en clair)
+    est effacé.
+    """
+    with op.batch_alter_table('email_outbox') as batch_op:
+        batch_op.alter_column('body', existing_type=sa.Text(), nullable=True)
+    op.execute("UPDATE email_outbox SET body = NULL WHERE status IN ('SENT', 'SIMULATED', 'FAILED')")
+
+    print("✅ Corps des emails terminés effacés")
+
+
+def downgrade() -> None:
+    """Downgrade schema - email_outbox.body à nouveau NOT NULL (corps effacés : chaîne vide)."""
+    op.execute("UPDATE email_outbox SET body = '' WHERE body IS NULL")
+    with op.batch_alter_table('email_outbox') as batch_op:
+        batch_op.alter_column('body', existing_type=sa.Text(), nullable=False)
+
+    print("✅ Downgrade terminé - email_outbox.body NOT NULL")
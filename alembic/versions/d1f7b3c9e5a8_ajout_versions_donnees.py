@@ -0,0 +1,42 @@
+"""Ajout versions des données par entreprise (cache des rapports PDF)
+
+Revision ID: d1f7b3c9e5a8
+Revises: c9e5a3b7d1f4
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1f7b3c9e5a8'
+down_revision: Union[str, Sequence[str], None] = 'c9e5a3b7d1f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Table donnees_versions (lignes créées à la première écriture)."""
+    inspector = sa.inspect(op.get_bind())
+    if 'donnees_versions' in inspector.get_table_names():
+        print("ℹ️ Table donnees_versions déjà présente")
+        return
+
+    op.create_table(
+        'donnees_versions',
+        sa.Column('company_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('version', sa.Integer(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('company_id'),
+    )
+
+    print("✅ Table donnees_versions créée")
+
+
+def downgrade() -> None:
+    """Downgrade schema - Suppression de donnees_versions."""
+    op.drop_table('donnees_versions')
+
+    print("✅ Downgrade terminé - donnees_versions supprimée")
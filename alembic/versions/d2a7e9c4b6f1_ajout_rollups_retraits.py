@@ -0,0 +1,65 @@
+"""Ajout agrégats journaliers des retraits
+
+Revision ID: d2a7e9c4b6f1
+Revises: c81d4f0a6e29
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7e9c4b6f1'
+down_revision: Union[str, Sequence[str], None] = 'c81d4f0a6e29'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Upgrade schema - Tables retrait_rollups_jour / rollup_etats.
+    Le backfill n'est pas fait ici (table retraits potentiellement énorme) :
+    il est lancé par le worker au démarrage ou par `python retrait_rollups.py`.
+    """
+    inspector = sa.inspect(op.get_bind())
+    if 'retrait_rollups_jour' in inspector.get_table_names():
+        print("ℹ️ Tables de rollups déjà présentes")
+        return
+
+    op.create_table(
+        'retrait_rollups_jour',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('jour', sa.Date(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=True),
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('nombre_retraits', sa.Integer(), nullable=False),
+        sa.Column('quantite_totale', sa.Integer(), nullable=False),
+        sa.Column('poids_total', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_retrait_rollups_jour_company_id_jour', 'retrait_rollups_jour', ['company_id', 'jour']
+    )
+    op.create_index('ix_retrait_rollups_jour_jour', 'retrait_rollups_jour', ['jour'])
+    op.create_table(
+        'rollup_etats',
+        sa.Column('nom', sa.String(), nullable=False),
+        sa.Column('jour_consolide', sa.Date(), nullable=True),
+        sa.PrimaryKeyConstraint('nom'),
+    )
+
+    print("✅ Tables de rollups des retraits créées (backfill : python retrait_rollups.py)")
+
+
+def downgrade() -> None:
+    """Downgrade schema - Suppression des tables de rollups."""
+    op.drop_table('rollup_etats')
+    op.drop_index('ix_retrait_rollups_jour_jour', table_name='retrait_rollups_jour')
+    op.drop_index('ix_retrait_rollups_jour_company_id_jour', table_name='retrait_rollups_jour')
+    op.drop_table('retrait_rollups_jour')
+
+    print("✅ Downgrade terminé - Tables de rollups supprimées")
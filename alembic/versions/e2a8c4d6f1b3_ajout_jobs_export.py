@@ -0,0 +1,56 @@
+"""Ajout table des jobs d'export PDF (partagés entre workers)
+
+Revision ID: e2a8c4d6f1b3
+Revises: d1f7b3c9e5a8
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a8c4d6f1b3'
+down_revision: Union[str, Sequence[str], None] = 'd1f7b3c9e5a8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Table export_jobs (jusqu'ici un dict en mémoire par worker)."""
+    inspector = sa.inspect(op.get_bind())
+    if 'export_jobs' in inspector.get_table_names():
+        print("ℹ️ Table export_jobs déjà présente")
+        return
+
+    op.create_table(
+        'export_jobs',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('rapport', sa.String(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('statut', sa.String(), nullable=False),
+        sa.Column('date_creation', sa.DateTime(), nullable=False),
+        sa.Column('date_fin', sa.DateTime(), nullable=True),
+        sa.Column('expire_le', sa.DateTime(), nullable=True),
+        sa.Column('taille_octets', sa.Integer(), nullable=True),
+        sa.Column('erreur', sa.String(), nullable=True),
+        sa.Column('nom_fichier', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_export_jobs_company_id_statut', 'export_jobs', ['company_id', 'statut'])
+    op.create_index('ix_export_jobs_expire_le', 'export_jobs', ['expire_le'])
+
+    print("✅ Table export_jobs créée")
+
+
+def downgrade() -> None:
+    """Downgrade schema - Suppression de export_jobs."""
+    op.drop_index('ix_export_jobs_expire_le', table_name='export_jobs')
+    op.drop_index('ix_export_jobs_company_id_statut', table_name='export_jobs')
+    op.drop_table('export_jobs')
+
+    print("✅ Downgrade terminé - export_jobs supprimée")
@@ -0,0 +1,105 @@
+"""Ajout journal des mouvements de stock et snapshots
+
+Revision ID: e4b8a1c7f2d5
+Revises: d2a7e9c4b6f1
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b8a1c7f2d5'
+down_revision: Union[str, Sequence[str], None] = 'd2a7e9c4b6f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+source_mouvement = sa.Enum(
+    'CREATION', 'MODIFICATION', 'AJUSTEMENT', 'RETRAIT', 'ALLOCATION', 'SUPPRESSION',
+    name='sourcemouvementenum'
+)
+
+
+def upgrade() -> None:
+    """
+    Upgrade schema - Tables mouvements_stock / stock_snapshots / stock_snapshot_lignes.
+    Un snapshot initial par entreprise (quantités actuelles) sert de point de
+    départ : l'historique est disponible à partir de cette migration.
+    """
+    inspector = sa.inspect(op.get_bind())
+    if 'mouvements_stock' in inspector.get_table_names():
+        print("ℹ️ Tables du journal de stock déjà présentes")
+        return
+
+    op.create_table(
+        'mouvements_stock',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('date_mouvement', sa.DateTime(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=True),
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.Column('delta', sa.Integer(), nullable=False),
+        sa.Column('quantite_apres', sa.Integer(), nullable=False),
+        sa.Column('source', source_mouvement, nullable=False),
+        sa.Column('raison', sa.String(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_mouvements_stock_company_id_date_mouvement', 'mouvements_stock',
+        ['company_id', 'date_mouvement', 'id']
+    )
+    op.create_index(
+        'ix_mouvements_stock_article_id_date_mouvement', 'mouvements_stock',
+        ['article_id', 'date_mouvement', 'id']
+    )
+    op.create_table(
+        'stock_snapshots',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('date_snapshot', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(
+        'ix_stock_snapshots_company_id_date_snapshot', 'stock_snapshots', ['company_id', 'date_snapshot']
+    )
+    op.create_table(
+        'stock_snapshot_lignes',
+        sa.Column('snapshot_id', sa.Integer(), nullable=False),
+        sa.Column('article_id', sa.Integer(), nullable=False),
+        sa.Column('quantite', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['snapshot_id'], ['stock_snapshots.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('snapshot_id', 'article_id'),
+    )
+
+    # Snapshot initial
+    op.get_bind().execute(
+        sa.text("INSERT INTO stock_snapshots (company_id, date_snapshot) SELECT id, :maintenant FROM companies"),
+        {"maintenant": datetime.utcnow()}
+    )
+    op.execute("""
+        INSERT INTO stock_snapshot_lignes (snapshot_id, article_id, quantite)
+        SELECT s.id, a.id, COALESCE(a.quantite, 0)
+        FROM articles a
+        JOIN stock_snapshots s ON s.company_id = a.company_id
+    """)
+
+    print("✅ Tables du journal de stock créées, snapshot initial pris")
+
+
+def downgrade() -> None:
+    """Downgrade schema - Suppression du journal de stock et des snapshots."""
+    op.drop_table('stock_snapshot_lignes')
+    op.drop_index('ix_stock_snapshots_company_id_date_snapshot', table_name='stock_snapshots')
+    op.drop_table('stock_snapshots')
+    op.drop_index('ix_mouvements_stock_article_id_date_mouvement', table_name='mouvements_stock')
+    op.drop_index('ix_mouvements_stock_company_id_date_mouvement', table_name='mouvements_stock')
+    op.drop_table('mouvements_stock')
+    source_mouvement.drop(op.get_bind(), checkfirst=True)
+
+    print("✅ Downgrade terminé - Journal de stock supprimé")
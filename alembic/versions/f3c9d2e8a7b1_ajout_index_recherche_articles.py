@@ -0,0 +1,84 @@
+"""Ajout index de recherche des articles (FTS5 / pg_trgm)
+
+Revision ID: f3c9d2e8a7b1
+Revises: e4b8a1c7f2d5
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c9d2e8a7b1'
+down_revision: Union[str, Sequence[str], None] = 'e4b8a1c7f2d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Upgrade schema - SQLite : table FTS5 articles_fts (trigram) + triggers de
+    synchronisation, remplie depuis articles. PostgreSQL : pg_trgm + index GIN.
+    """
+    dialecte = op.get_bind().dialect.name
+    if dialecte == 'sqlite':
+        inspector = sa.inspect(op.get_bind())
+        if 'articles_fts' in inspector.get_table_names():
+            print("ℹ️ Index articles_fts déjà présent")
+            return
+        op.execute("""
+            CREATE VIRTUAL TABLE articles_fts USING fts5(
+                nom, reference, category, entreprise, tokenize='trigram'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER articles_fts_ai AFTER INSERT ON articles BEGIN
+                INSERT INTO articles_fts (rowid, nom, reference, category, entreprise)
+                VALUES (new.id, new.nom, new.reference, new.category, '#' || new.company_id || '#');
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER articles_fts_ad AFTER DELETE ON articles BEGIN
+                DELETE FROM articles_fts WHERE rowid = old.id;
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER articles_fts_au
+            AFTER UPDATE OF id, nom, reference, category, company_id ON articles BEGIN
+                DELETE FROM articles_fts WHERE rowid = old.id;
+                INSERT INTO articles_fts (rowid, nom, reference, category, entreprise)
+                VALUES (new.id, new.nom, new.reference, new.category, '#' || new.company_id || '#');
+            END
+        """)
+        op.execute("""
+            INSERT INTO articles_fts (rowid, nom, reference, category, entreprise)
+            SELECT id, nom, reference, category, '#' || company_id || '#' FROM articles
+        """)
+        print("✅ Index de recherche articles_fts créé et rempli")
+    elif dialecte == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for colonne in ('nom', 'reference', 'category'):
+            op.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_articles_{colonne}_trgm "
+                f"ON articles USING gin ({colonne} gin_trgm_ops)"
+            )
+        print("✅ Index pg_trgm des articles créés")
+    else:
+        print(f"ℹ️ Pas d'index de recherche pour {dialecte} (ILIKE sans index)")
+
+
+def downgrade() -> None:
+    """Downgrade schema - Suppression de l'index de recherche."""
+    dialecte = op.get_bind().dialect.name
+    if dialecte == 'sqlite':
+        for trigger in ('articles_fts_ai', 'articles_fts_ad', 'articles_fts_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS articles_fts")
+    elif dialecte == 'postgresql':
+        for colonne in ('nom', 'reference', 'category'):
+            op.execute(f"DROP INDEX IF EXISTS ix_articles_{colonne}_trgm")
+
+    print("✅ Downgrade terminé - Index de recherche supprimé")
@@ -0,0 +1,50 @@
+"""Ajout table des lots de création d'utilisateurs (partagés entre workers)
+
+Revision ID: f6b2d8a4c1e7
+Revises: e2a8c4d6f1b3
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b2d8a4c1e7'
+down_revision: Union[str, Sequence[str], None] = 'e2a8c4d6f1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema - Table provisioning_jobs (jusqu'ici un dict en mémoire par worker)."""
+    inspector = sa.inspect(op.get_bind())
+    if 'provisioning_jobs' in inspector.get_table_names():
+        print("ℹ️ Table provisioning_jobs déjà présente")
+        return
+
+    op.create_table(
+        'provisioning_jobs',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('date_creation', sa.DateTime(), nullable=False),
+        sa.Column('expire_le', sa.DateTime(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('crees', sa.Integer(), nullable=False),
+        sa.Column('lignes', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['company_id'], ['companies.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_provisioning_jobs_expire_le', 'provisioning_jobs', ['expire_le'])
+
+    print("✅ Table provisioning_jobs créée")
+
+
+def downgrade() -> None:
+    """Downgrade schema - Suppression de provisioning_jobs."""
+    op.drop_index('ix_provisioning_jobs_expire_le', table_name='provisioning_jobs')
+    op.drop_table('provisioning_jobs')
+
+    print("✅ Downgrade terminé - provisioning_jobs supprimée")
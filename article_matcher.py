@@ -0,0 +1,163 @@
+# article_matcher.py
+"""
+Résolution approchée des noms d'articles saisis pour un retrait
+("poteau 2 m" → "Poteau 2m").
+
+Un catalogue par entreprise, construit une fois (une requête) et gardé en
+mémoire : noms normalisés (normalisation.normaliser_nom), forme compacte
+sans espaces, index inversé des trigrammes. Résolution :
+1. forme compacte identique à un seul article → acceptée ;
+2. sinon, parmi les articles portant les mêmes nombres (jamais "Poteau 2m"
+   pour "Poteau 3m"), candidats par trigrammes communs reclassés par
+   distance d'édition ; le meilleur est accepté si son score atteint
+   SEUIL_ACCEPTATION et devance le suivant d'au moins ECART_MIN ;
+3. sinon rien n'est accepté : les candidats les plus proches du catalogue
+   entier sont retournés.
+
+Tenu à jour au commit des créations / renommages / suppressions (ORM,
+via suivi_articles) ; ARTICLE_MATCHER_TTL borne le délai sur les autres workers.
+"""
+import os
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from normalisation import normaliser_nom
+from suivi_articles import IndexParEntreprise
+
+load_dotenv()
+
+ARTICLE_MATCHER_TTL = int(os.getenv("ARTICLE_MATCHER_TTL", "300"))  # secondes
+SEUIL_ACCEPTATION = 0.85
+ECART_MIN = 0.05
+CANDIDATS_MAX = 5
+SCORE_CANDIDAT_MIN = 0.5  # en dessous, pas proposé
+_PRESELECTION = 30  # candidats par trigrammes reclassés par distance d'édition
+
+_NOMBRES = re.compile(r"\d+(?:[.,]\d+)?")
+
+
+@dataclass
+class Resolution:
+    article_id: Optional[int] = None          # None : pas de correspondance sûre
+    nom: Optional[str] = None
+    candidats: List[Tuple[int, str, float]] = field(default_factory=list)  # (id, nom, score)
+
+
+def _compact(cle: str) -> str:
+    return cle.replace(" ", "")
+
+
+def _trigrammes(compact: str) -> FrozenSet[str]:
+    borne = f"^{compact}$"
+    return frozenset(borne[i:i + 3] for i in range(len(borne) - 2))
+
+
+def _nombres(cle: str) -> Tuple[str, ...]:
+    return tuple(n.replace(",", ".") for n in _NOMBRES.findall(cle))
+
+
+def _similarite(a: str, b: str) -> float:
+    """1 - distance de Levenshtein / longueur max"""
+    if a == b:
+        return 1.0
+    if len(a) < len(b):
+        a, b = b, a
+    precedente = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        courante = [i]
+        for j, cb in enumerate(b, 1):
+            courante.append(min(precedente[j] + 1, courante[j - 1] + 1, precedente[j - 1] + (ca != cb)))
+        precedente = courante
+    return 1 - precedente[-1] / len(a)
+
+
+class _Catalogue:
+    def __init__(self, articles):
+        self.expire = time.monotonic() + ARTICLE_MATCHER_TTL
+        self.articles: Dict[int, Tuple[str, str, Tuple[str, ...]]] = {}  # id -> (nom, compact, nombres)
+        self.par_compact: Dict[str, Set[int]] = {}
+        self.par_nombres: Dict[Tuple[str, ...], Set[int]] = {}
+        self.index: Dict[str, Set[int]] = {}  # trigramme -> ids
+        for article_id, nom in articles:
+            self.ajouter(article_id, nom)
+
+    def ajouter(self, article_id: int, nom: Optional[str]):
+        if not nom:
+            return
+        cle = normaliser_nom(nom)
+        compact, nombres = _compact(cle), _nombres(cle)
+        self.articles[article_id] = (nom, compact, nombres)
+        self.par_compact.setdefault(compact, set()).add(article_id)
+        self.par_nombres.setdefault(nombres, set()).add(article_id)
+        for g in _trigrammes(compact):
+            self.index.setdefault(g, set()).add(article_id)
+
+    def retirer(self, article_id: int, nom: Optional[str] = None):
+        entree = self.articles.pop(article_id, None)
+        if entree is None:
+            return
+        _, compact, nombres = entree
+        for cles, valeur in ((self.par_compact, compact), (self.par_nombres, nombres)):
+            cles[valeur].discard(article_id)
+            if not cles[valeur]:
+                del cles[valeur]
+        for g in _trigrammes(compact):
+            self.index[g].discard(article_id)
+            if not self.index[g]:
+                del self.index[g]
+
+    def _classer(self, compact: str, parmi: Optional[Set[int]] = None) -> List[Tuple[int, str, float]]:
+        """
+        Candidats classés par distance d'édition, parmi les _PRESELECTION
+        articles partageant le plus de trigrammes (ou parmi `parmi`).
+        """
+        if parmi is not None and len(parmi) <= _PRESELECTION:
+            preselection = parmi
+        else:
+            communs = Counter()
+            for g in _trigrammes(compact):
+                ids = self.index.get(g)
+                if ids:
+                    communs.update(ids if parmi is None else ids & parmi)
+            preselection = [aid for aid, _ in communs.most_common(_PRESELECTION)]
+        classes = sorted(
+            ((aid, self.articles[aid][0], round(_similarite(compact, self.articles[aid][1]), 3))
+             for aid in preselection),
+            key=lambda c: (-c[2], c[1])
+        )
+        return [c for c in classes if c[2] >= SCORE_CANDIDAT_MIN][:CANDIDATS_MAX]
+
+    def resoudre(self, nom: str) -> Resolution:
+        cle = normaliser_nom(nom)
+        compact = _compact(cle)
+        identiques = self.par_compact.get(compact, ())
+        if len(identiques) == 1:
+            article_id = next(iter(identiques))
+            return Resolution(article_id, self.articles[article_id][0], [(article_id, self.articles[article_id][0], 1.0)])
+
+        if not identiques:
+            # Acceptation : uniquement parmi les articles portant les mêmes nombres
+            classes = self._classer(compact, self.par_nombres.get(_nombres(cle), set()))
+            if classes:
+                article_id, nom_trouve, score = classes[0]
+                suivant = classes[1][2] if len(classes) > 1 else 0.0
+                if score >= SEUIL_ACCEPTATION and score - suivant >= ECART_MIN:
+                    return Resolution(article_id, nom_trouve, classes)
+        return Resolution(candidats=self._classer(compact))
+
+
+_catalogues = IndexParEntreprise(_Catalogue)
+
+
+# -----------------------------
+# 🔎 RÉSOLUTION
+# -----------------------------
+def resoudre(db: Session, company_id: int, nom: str) -> Resolution:
+    """Article de l'entreprise correspondant à `nom` saisi librement (voir en-tête)"""
+    return _catalogues.interroger(db, company_id, lambda catalogue: catalogue.resoudre(nom))
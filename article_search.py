@@ -0,0 +1,180 @@
+# article_search.py
+"""
+Index de recherche des articles (nom, référence, catégorie).
+
+- SQLite : table FTS5 `articles_fts` (tokenizer trigram, rowid = id de
+  l'article), tenue à jour par triggers sur articles : toutes les écritures
+  sont couvertes, y compris les UPDATE hors ORM. Les décréments de stock
+  ne touchent pas les colonnes indexées et ne déclenchent rien.
+  L'entreprise est indexée comme un mot ("#12#") : le filtre par
+  entreprise est résolu dans l'index, pas ligne par ligne.
+- PostgreSQL : extension pg_trgm, index GIN (gin_trgm_ops) sur les trois
+  colonnes : ILIKE '%terme%' passe par l'index.
+- Autres bases : ILIKE sans index.
+
+Chaque mot de la recherche doit apparaître (sous-chaîne, casse ignorée)
+dans l'une des colonnes. Les mots de moins de 3 caractères n'ont pas de
+trigramme : ils filtrent seulement les articles déjà trouvés par les autres
+mots (ou toute la table s'ils sont seuls). Classement : bm25 sur SQLite,
+similarité de trigrammes sur PostgreSQL, le nom pesant le plus.
+
+Le classement score et trie toutes les correspondances : pour un mot
+courant (~1 article sur 6, 1M articles) il coûtait ~220 ms contre ~2 ms
+pour l'ancien ILIKE, qui s'arrêtait aux 100 premières lignes. Sur SQLite,
+au-delà de SEUIL_CLASSEMENT correspondances, les résultats sont donc
+rendus dans l'ordre des id, sans classement, et la lecture de l'index
+s'arrête à la page (quelques ms). Sur PostgreSQL le classement porte
+toujours sur toutes les correspondances. Mesures : scripts/bench_recherche.py.
+"""
+from typing import List, Optional
+
+from sqlalchemy import and_, column, func, literal_column, or_, select, table, text
+
+from models import Article
+
+TAILLE_TRIGRAMME = 3
+# Au-delà de ce nombre de correspondances, pas de classement bm25 (qui score
+# et trie toutes les correspondances avant de rendre la première page)
+SEUIL_CLASSEMENT = 1000
+
+_fts = table("articles_fts", column("rowid"))
+_FTS = literal_column("articles_fts")
+
+_SQLITE_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+        nom, reference, category, entreprise, tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS articles_fts_ai AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts (rowid, nom, reference, category, entreprise)
+        VALUES (new.id, new.nom, new.reference, new.category, '#' || new.company_id || '#');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS articles_fts_ad AFTER DELETE ON articles BEGIN
+        DELETE FROM articles_fts WHERE rowid = old.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS articles_fts_au
+    AFTER UPDATE OF id, nom, reference, category, company_id ON articles BEGIN
+        DELETE FROM articles_fts WHERE rowid = old.id;
+        INSERT INTO articles_fts (rowid, nom, reference, category, entreprise)
+        VALUES (new.id, new.nom, new.reference, new.category, '#' || new.company_id || '#');
+    END""",
+)
+_SQLITE_REMPLISSAGE = """
+    INSERT INTO articles_fts (rowid, nom, reference, category, entreprise)
+    SELECT id, nom, reference, category, '#' || company_id || '#' FROM articles
+"""
+_POSTGRES_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_articles_nom_trgm ON articles USING gin (nom gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_articles_reference_trgm ON articles USING gin (reference gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_articles_category_trgm ON articles USING gin (category gin_trgm_ops)",
+)
+
+
+# -----------------------------
+# 🏗️ INSTALLATION
+# -----------------------------
+def installer(engine):
+    """
+    Crée l'index s'il manque (bases créées par create_all, hors Alembic) ;
+    sur SQLite, une table FTS nouvellement créée est remplie depuis articles.
+    """
+    dialecte = engine.dialect.name
+    with engine.begin() as conn:
+        if dialecte == "sqlite":
+            existe = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'articles_fts'"
+            )).first()
+            for ddl in _SQLITE_DDL:
+                conn.execute(text(ddl))
+            if not existe:
+                conn.execute(text(_SQLITE_REMPLISSAGE))
+                print("🔎 Index de recherche articles_fts créé")
+        elif dialecte == "postgresql":
+            try:
+                with conn.begin_nested():
+                    for ddl in _POSTGRES_DDL:
+                        conn.execute(text(ddl))
+            except Exception as e:
+                print(f"⚠️ Index pg_trgm non créé (recherche sans index) : {e}")
+
+
+def reconstruire(engine):
+    """Vide et remplit à nouveau articles_fts (SQLite) ; REINDEX sur PostgreSQL"""
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            conn.execute(text("DELETE FROM articles_fts"))
+            conn.execute(text(_SQLITE_REMPLISSAGE))
+        elif engine.dialect.name == "postgresql":
+            for nom in ("nom", "reference", "category"):
+                conn.execute(text(f"REINDEX INDEX ix_articles_{nom}_trgm"))
+
+
+# -----------------------------
+# 🔎 RECHERCHE
+# -----------------------------
+def _mots(recherche: str) -> List[str]:
+    return [m for m in recherche.split() if m]
+
+
+def _ilike(mot: str):
+    motif = f"%{mot}%"
+    return or_(Article.nom.ilike(motif), Article.reference.ilike(motif), Article.category.ilike(motif))
+
+
+def _expression_fts(mots: List[str], company_id: Optional[int]) -> str:
+    # Chaque mot en chaîne FTS5 : sous-chaîne exacte avec le tokenizer trigram
+    termes = ['{nom reference category} : "' + m.replace('"', '""') + '"' for m in mots]
+    if company_id is not None:
+        termes.insert(0, f'entreprise : "#{int(company_id)}#"')
+    return " AND ".join(termes)
+
+
+def _peu_selectif(query, correspond) -> bool:
+    """Plus de SEUIL_CLASSEMENT correspondances (lecture de l'index bornée au seuil)"""
+    sonde = select(_fts.c.rowid).where(correspond).limit(SEUIL_CLASSEMENT + 1).subquery()
+    return query.session.execute(select(func.count()).select_from(sonde)).scalar() > SEUIL_CLASSEMENT
+
+
+def filtrer(query, recherche: str, company_id: Optional[int] = None, classer: bool = False):
+    """
+    Restreint `query` (sur Article ou ses colonnes) aux articles correspondant
+    à `recherche` ; classer=True trie par pertinence (requête sur Article).
+    """
+    mots = _mots(recherche)
+    if not mots:
+        return query
+    dialecte = query.session.get_bind().dialect.name
+    longs = [m for m in mots if len(m) >= TAILLE_TRIGRAMME]
+    courts = [m for m in mots if len(m) < TAILLE_TRIGRAMME]
+
+    if dialecte == "sqlite" and longs:
+        correspond = _FTS.op("MATCH")(_expression_fts(longs, company_id))
+        if classer and _peu_selectif(query, correspond):
+            # Mots courants : ordre des id, que l'index FTS rend directement ;
+            # la lecture s'arrête à la limite de la page
+            fts = select(_fts.c.rowid.label("article_id")).where(correspond).subquery()
+            query = query.join(fts, fts.c.article_id == Article.id).order_by(fts.c.article_id)
+        elif classer:
+            fts = select(
+                _fts.c.rowid.label("article_id"),
+                # Poids bm25 : nom, référence, catégorie, entreprise
+                func.bm25(_FTS, 10.0, 5.0, 1.0, 0.0).label("score"),
+            ).where(correspond).subquery()
+            query = query.join(fts, fts.c.article_id == Article.id).order_by(fts.c.score, Article.id)
+        else:
+            query = query.filter(Article.id.in_(select(_fts.c.rowid).where(correspond)))
+        mots = courts
+    elif classer and dialecte == "postgresql":
+        terme = " ".join(mots)
+        score = (
+            2 * func.word_similarity(terme, Article.nom)
+            + func.word_similarity(terme, func.coalesce(Article.reference, ""))
+            + 0.5 * func.word_similarity(terme, func.coalesce(Article.category, ""))
+        )
+        query = query.order_by(score.desc(), Article.id)
+    elif classer:
+        query = query.order_by(Article.nom, Article.id)
+
+    if mots:
+        query = query.filter(and_(*[_ilike(m) for m in mots]))
+    return query
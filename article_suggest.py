@@ -0,0 +1,105 @@
+# article_suggest.py
+"""
+Index en mémoire des noms d'articles pour l'autocomplétion (/articles/suggest).
+
+Un index par entreprise, construit à la première demande (une requête) :
+tableaux triés de noms normalisés (normalisation.normaliser_nom),
+parcourus par bisect. Un nom est trouvé par le début du nom puis
+par le début de chacun de ses mots ("3.07" → "Moise 3.07m").
+
+Mis à jour au commit des créations / renommages / suppressions d'articles
+(écritures ORM, publiées par suivi_articles). Index propre au process :
+SUGGEST_INDEX_TTL borne le délai avant de voir les écritures des autres
+workers (reconstruction à la demande suivante).
+"""
+import os
+import time
+from bisect import bisect_left, insort
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from normalisation import normaliser_nom
+from suivi_articles import IndexParEntreprise
+
+load_dotenv()
+
+SUGGEST_INDEX_TTL = int(os.getenv("SUGGEST_INDEX_TTL", "300"))  # secondes
+
+Entree = Tuple[str, str, int]  # (clé normalisée, nom, article_id)
+
+
+def _entrees(nom: Optional[str], article_id: int) -> Tuple[Optional[Entree], List[Entree]]:
+    """(entrée du nom complet, entrées de chaque mot après le premier)"""
+    if not nom:
+        return None, []
+    cle = normaliser_nom(nom)
+    debut = (cle, nom, article_id)
+    mots = []
+    position = cle.find(" ")
+    while position != -1:
+        mots.append((cle[position + 1:], nom, article_id))
+        position = cle.find(" ", position + 1)
+    return debut, mots
+
+
+def _retirer(tableau: List[Entree], entree: Entree):
+    i = bisect_left(tableau, entree)
+    if i < len(tableau) and tableau[i] == entree:
+        del tableau[i]
+
+
+class _IndexEntreprise:
+    def __init__(self, articles):
+        self.expire = time.monotonic() + SUGGEST_INDEX_TTL
+        self.debuts: List[Entree] = []
+        self.mots: List[Entree] = []
+        for article_id, nom in articles:
+            debut, mots = _entrees(nom, article_id)
+            if debut:
+                self.debuts.append(debut)
+                self.mots.extend(mots)
+        self.debuts.sort()
+        self.mots.sort()
+
+    def ajouter(self, article_id: int, nom: Optional[str]):
+        debut, mots = _entrees(nom, article_id)
+        if debut:
+            insort(self.debuts, debut)
+            for entree in mots:
+                insort(self.mots, entree)
+
+    def retirer(self, article_id: int, nom: Optional[str]):
+        debut, mots = _entrees(nom, article_id)
+        if debut:
+            _retirer(self.debuts, debut)
+            for entree in mots:
+                _retirer(self.mots, entree)
+
+    def chercher(self, prefixe: str, limit: int) -> List[str]:
+        noms: List[str] = []
+        vus = set()
+        for tableau in (self.debuts, self.mots):
+            i = bisect_left(tableau, (prefixe,))
+            while i < len(tableau) and len(noms) < limit:
+                cle, nom, _ = tableau[i]
+                if not cle.startswith(prefixe):
+                    break
+                if nom not in vus:
+                    vus.add(nom)
+                    noms.append(nom)
+                i += 1
+        return noms
+
+
+_index = IndexParEntreprise(_IndexEntreprise)
+
+
+# -----------------------------
+# 🔎 SUGGESTIONS
+# -----------------------------
+def suggerer(db: Session, company_id: int, q: str, limit: int = 10) -> List[str]:
+    """Noms d'articles de l'entreprise commençant par `q` (ou dont un mot commence par `q`)"""
+    prefixe = normaliser_nom(q)
+    return _index.interroger(db, company_id, lambda index: index.chercher(prefixe, limit))
@@ -1,12 +1,20 @@
 # auth.py
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from threading import Lock
+from typing import List, NamedTuple, Optional
+import time
+import uuid
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-from database import SessionLocal
-from models import User, RoleEnum, CompanyStatusEnum
+# Même dépendance que les routes : FastAPI la met en cache par requête,
+# l'authentification et la route partagent donc UNE session / connexion
+from database import get_db
+from models import User, Company, RoleEnum, CompanyStatusEnum
 import os
 from dotenv import load_dotenv
 
@@ -15,33 +23,155 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "CHANGE_ME_SUPER_SECRET")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "480"))
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "60"))  # secondes
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS") or os.cpu_count() or 1)
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
-# Dépendance pour obtenir la session DB
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# -----------------------------
+# 🔐 BCRYPT SUR POOL DÉDIÉ
+# -----------------------------
+# bcrypt coûte ~100-300 ms CPU par appel (et relâche le GIL) : les hachages
+# passent par un pool borné au nombre de cœurs pour ne pas saturer le
+# threadpool des routes. Appel bloquant : à utiliser depuis une route `def`
+# (exécutée hors boucle d'événements), jamais depuis une route `async def`.
+_hash_pool = ThreadPoolExecutor(
+    max_workers=max(1, PASSWORD_HASH_WORKERS),
+    thread_name_prefix="bcrypt"
+)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return _hash_pool.submit(pwd_context.hash, password).result()
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+    return _hash_pool.submit(pwd_context.verify, plain, hashed).result()
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """Hache un lot de mots de passe en parallèle sur le pool (ordre conservé)"""
+    return list(_hash_pool.map(pwd_context.hash, passwords))
 
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     token = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     print(f"🔑 Token créé: {token[:50]}...")  # ✅ DEBUG
     return token
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def create_user_token(user: User) -> str:
+    """
+    Token porteur des claims d'autorisation : id, rôle, entreprise et
+    générations de token (utilisateur / entreprise) pour la révocation.
+    """
+    return create_access_token({
+        "sub": user.username,
+        "uid": user.id,
+        "role": user.role.value if hasattr(user.role, "value") else str(user.role),
+        "cid": user.company_id,
+        "ugen": user.token_generation or 0,
+        "cgen": (user.company.token_generation or 0) if user.company else 0,
+    })
+
+# ------------------------------------------------------------
+# 🧠 UTILISATEUR AUTHENTIFIÉ (PRINCIPAL) + CACHE DES GÉNÉRATIONS
+# ------------------------------------------------------------
+class Principal(NamedTuple):
+    """Utilisateur authentifié, construit depuis les claims du token"""
+    id: int
+    username: str
+    role: RoleEnum
+    company_id: Optional[int]
+    company_status: Optional[CompanyStatusEnum]
+
+
+class _TTLCache:
+    """Cache LRU borné avec expiration, partagé entre threads"""
+    MISSING = object()
+
+    def __init__(self, ttl: int, maxsize: int):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict" = OrderedDict()  # clé → (expire, valeur)
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return self.MISSING
+            if entry[0] < time.monotonic():
+                del self._data[key]
+                return self.MISSING
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# user_id → token_generation (None = utilisateur supprimé)
+_user_generations = _TTLCache(AUTH_CACHE_TTL, AUTH_CACHE_SIZE)
+# company_id → (status, token_generation) (None = entreprise supprimée)
+_company_states = _TTLCache(AUTH_CACHE_TTL, AUTH_CACHE_SIZE)
+
+
+def _get_user_generation(db: Session, user_id: int) -> Optional[int]:
+    generation = _user_generations.get(user_id)
+    if generation is _TTLCache.MISSING:
+        row = db.query(User.token_generation).filter(User.id == user_id).first()
+        generation = (row.token_generation or 0) if row else None
+        _user_generations.set(user_id, generation)
+    return generation
+
+
+def _get_company_state(db: Session, company_id: int):
+    state = _company_states.get(company_id)
+    if state is _TTLCache.MISSING:
+        row = db.query(Company.status, Company.token_generation).filter(Company.id == company_id).first()
+        state = (row.status, row.token_generation or 0) if row else None
+        _company_states.set(company_id, state)
+    return state
+
+
+def invalidate_token_cache(user_id: Optional[int] = None, company_id: Optional[int] = None):
+    """
+    À appeler après le commit d'un changement de génération ou de statut
+    (mot de passe, suppression, suspension, réactivation, résiliation).
+    Cache propre au process : AUTH_CACHE_TTL borne le délai sur les autres workers.
+    """
+    if user_id is None and company_id is None:
+        _user_generations.clear()
+        _company_states.clear()
+        return
+    if user_id is not None:
+        _user_generations.pop(user_id)
+    if company_id is not None:
+        _company_states.pop(company_id)
+
+
+def _blocage_entreprise(company_status: Optional[CompanyStatusEnum]):
+    # 🚫 BLOCAGE ENTREPRISE
+    if company_status is not None and company_status != CompanyStatusEnum.ACTIVE:
+        raise HTTPException(
+            status_code=403,
+            detail="Entreprise suspendue ou résiliée"
+        )
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
     print(f"🔍 Décodage du token: {token[:50]}...")  # ✅ DEBUG
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -60,30 +190,54 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError as e:
         print(f"❌ Erreur JWT: {e}")  # ✅ DEBUG
         raise credentials_exception
-    
+
+    # ⚡ Chemin rapide : on fait confiance aux claims, seules les générations
+    #    (cache) sont vérifiées → aucune requête utilisateur
+    if "uid" in payload:
+        company_id = payload.get("cid")
+        company_status = None
+        if company_id is not None:
+            state = _get_company_state(db, company_id)
+            if state is None:
+                raise credentials_exception
+            company_status, company_generation = state
+            _blocage_entreprise(company_status)
+            if company_generation != payload.get("cgen", 0):
+                raise credentials_exception
+        if _get_user_generation(db, payload["uid"]) != payload.get("ugen", 0):
+            print("❌ Token révoqué ou utilisateur supprimé")  # ✅ DEBUG
+            raise credentials_exception
+        return Principal(
+            id=payload["uid"],
+            username=username,
+            role=RoleEnum(payload["role"]),
+            company_id=company_id,
+            company_status=company_status
+        )
+
+    # Anciens tokens (sans claims) : résolution en base
     user = db.query(User).filter(User.username == username).first()
     if not user:
         print("❌ Utilisateur non trouvé dans la DB")  # ✅ DEBUG
         raise credentials_exception
     
     print(f"✅ Utilisateur trouvé: {user.username}")  # ✅ DEBUG
+    company_status = user.company.status if user.company else None
+    _blocage_entreprise(company_status)
+    return Principal(
+        id=user.id,
+        username=user.username,
+        role=user.role,
+        company_id=user.company_id,
+        company_status=company_status
+    )
 
-    # 🚫 BLOCAGE ENTREPRISE
-    if user.company:
-        if user.company.status != CompanyStatusEnum.ACTIVE:
-            raise HTTPException(
-                status_code=403,
-                detail="Entreprise suspendue ou résiliée"
-            )
-        
-    return user
-
-def require_superadmin(user: User = Depends(get_current_user)):
+def require_superadmin(user: Principal = Depends(get_current_user)):
     if user.role != RoleEnum.SUPERADMIN:
         raise HTTPException(status_code=403, detail="Superadmin requis")
     return user
 
-def require_admin_or_super(user: User = Depends(get_current_user)):
+def require_admin_or_super(user: Principal = Depends(get_current_user)):
     if user.role not in (RoleEnum.ADMIN, RoleEnum.SUPERADMIN):
         raise HTTPException(status_code=403, detail="Admin requis")
     return user
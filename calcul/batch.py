@@ -0,0 +1,78 @@
+# app-stock-api/calcul/batch.py
+"""
+Version vectorisée (NumPy) du moteur de quantités.
+
+Mêmes règles que calcul/quantites.py, appliquées à N façades d'un coup :
+chaque quantité est un tableau de longueur N.
+"""
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from calcul.quantites import MODULE_H, MODULE_L, normaliser_dimension
+
+
+def calculer_quantites_batch(
+    hauteurs: List[float],
+    longueurs: List[float]
+) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+    """
+    Calcule la nomenclature de N façades en une passe.
+
+    Retour:
+        (pieces, geometrie)
+        pieces    : {nom_article: tableau int64 (N,)} dans l'ordre de montage,
+                    les quantités nulles sont conservées (à filtrer par façade)
+        geometrie : {nb_travees, nb_travees_acces, nb_niveaux, ...: tableau (N,)}
+    """
+    h = np.fromiter((normaliser_dimension(v) for v in hauteurs), dtype=np.float64)
+    l = np.fromiter((normaliser_dimension(v) for v in longueurs), dtype=np.float64)
+
+    nb_niveaux = np.ceil(h / MODULE_H).astype(np.int64)
+    nb_travees = np.ceil(l / MODULE_L).astype(np.int64)
+    nb_lignes_poteaux = nb_travees + 1
+
+    nb_travees_acces = np.maximum(1, np.ceil(l / 20).astype(np.int64))
+    nb_travees_travail = np.maximum(0, nb_travees - nb_travees_acces)
+    niveaux_gc = np.maximum(0, nb_niveaux - 1)
+    nb_trappes = nb_travees_acces * niveaux_gc
+
+    # Amarrages EN 12811 : max(surface ÷ 24, grille 4m × 8m), 4 mini au-delà de 6m
+    amarrages = np.maximum(
+        np.ceil(h * l / 24).astype(np.int64),
+        np.ceil(h / 4).astype(np.int64) * np.ceil(l / 8).astype(np.int64)
+    )
+    amarrages = np.where(h > 6, np.maximum(amarrages, 4), amarrages)
+
+    pieces = {
+        "Cale bois 50mm": nb_lignes_poteaux * 2,
+        "Vérin de socle 30cm": nb_lignes_poteaux * 2,
+        "Embase standard": nb_lignes_poteaux * 2,
+        "Poteau 2m": nb_lignes_poteaux * 2 * nb_niveaux,
+        "Moise 3.07m": nb_travees * nb_niveaux * 2,
+        "Moise 0.73m": nb_lignes_poteaux * nb_niveaux * 2,
+        "plancher acier 3.07m": (
+            2 * nb_travees_travail * nb_niveaux
+            + 2 * nb_travees_acces
+            + nb_travees_acces * niveaux_gc
+        ),
+        "Trappe d'accès 3.07m": nb_trappes,
+        "Garde-corps latéral 3.07m": nb_travees * niveaux_gc * 2,
+        "Garde-corps frontal 0.73m": 2 * niveaux_gc,
+        "Plinthe alu 3.07m": nb_travees * niveaux_gc * 2,
+        "Plinthe alu 0.73m": 2 * niveaux_gc,
+        "Diagonale 3.0m": np.ceil(nb_travees * nb_niveaux / 2).astype(np.int64),
+        "Diagonale 0.73m": np.ceil(nb_lignes_poteaux * nb_niveaux / 2).astype(np.int64),
+        "Platine d'ancrage au sol": amarrages,
+    }
+
+    geometrie = {
+        "nb_travees": nb_travees,
+        "nb_travees_acces": nb_travees_acces,
+        "nb_niveaux": nb_niveaux,
+        "nb_lignes_poteaux": nb_lignes_poteaux,
+        "surface_facade_m2": h * l,
+        "amarrages_calcules": amarrages,
+        "trappes_acces": nb_trappes,
+    }
+    return pieces, geometrie
@@ -0,0 +1,161 @@
+# app-stock-api/calcul/quantites.py
+"""
+Moteur de calcul des quantités d'un échafaudage de façade.
+
+Fonctions pures : aucune requête BDD, aucun print. Le résultat ne dépend
+que de (hauteur, longueur, largeur, niveaux_travail), il est donc mis en
+cache (LRU) sur ces entrées. Les dimensions ne sont pas arrondies : un
+arrondi changerait les ceil (2.0004 m = 2 niveaux, 2.0 m = 1).
+"""
+import math
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+# --------------------------------------------------------
+# MODULES NORMALISÉS ÉCHAFAUDAGE
+# --------------------------------------------------------
+MODULE_H = 2.0     # hauteur d'un niveau
+MODULE_L = 3.07    # longueur d'une travée
+
+CACHE_SIZE = 1024
+
+
+def normaliser_dimension(valeur: float) -> float:
+    """Dimension en float (2 et 2.0 : même clé de cache), valeur exacte conservée"""
+    return float(valeur)
+
+
+def normaliser_niveaux_travail(niveaux_travail: str) -> str:
+    return (niveaux_travail or "tous").strip()
+
+
+def parse_niveaux_travail(niveaux_travail: str, nb_niveaux: int) -> List[int]:
+    """
+    Détermine les niveaux de travail (planchers)
+        "tous"          → tous les niveaux
+        "dernier"       → uniquement le dernier niveau (ex: toiture)
+        "liste:2,4,5"   → liste personnalisée
+    """
+    if niveaux_travail == "dernier":
+        return [nb_niveaux]
+    if niveaux_travail.startswith("liste:"):
+        try:
+            return [
+                int(n.strip())
+                for n in niveaux_travail.replace("liste:", "").split(",")
+            ]
+        except ValueError:
+            pass
+    return list(range(1, nb_niveaux + 1))
+
+
+def nombre_amarrages(hauteur: float, longueur: float) -> int:
+    """Amarrages selon normes EN 12811 : max(surface ÷ 24, grille 4m × 8m)"""
+    amarrages_par_surface = math.ceil(hauteur * longueur / 24)
+    niveaux_amarrage = math.ceil(hauteur / 4)
+    points_par_niveau = math.ceil(longueur / 8)
+    amarrages_total = max(amarrages_par_surface, niveaux_amarrage * points_par_niveau)
+    if hauteur > 6:
+        amarrages_total = max(amarrages_total, 4)
+    return amarrages_total
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _calculer_quantites(
+    hauteur: float,
+    longueur: float,
+    largeur: float,
+    niveaux_travail: str
+) -> Tuple[Tuple[Tuple[str, int], ...], Tuple[Tuple[str, object], ...]]:
+    # ========================================================
+    # CALCULS GÉOMÉTRIQUES DE BASE
+    # ========================================================
+    nb_niveaux = math.ceil(hauteur / MODULE_H)
+    nb_travees = math.ceil(longueur / MODULE_L)
+    nb_lignes_poteaux = nb_travees + 1
+    liste_niveaux_travail = parse_niveaux_travail(niveaux_travail, nb_niveaux)
+
+    # ✅ RÈGLE : 1 travée d'accès tous les 20m maximum
+    nb_travees_acces = max(1, math.ceil(longueur / 20))
+    nb_travees_travail = max(0, nb_travees - nb_travees_acces)
+
+    # ✅ NORMES EN 12810 : GC obligatoires à partir du niveau 1
+    niveaux_gc = max(0, nb_niveaux - 1)
+
+    nb_trappes = nb_travees_acces * max(0, nb_niveaux - 1)
+    amarrages_total = nombre_amarrages(hauteur, longueur)
+
+    # ========================================================
+    # NOMENCLATURE (ordre d'affichage conservé)
+    # ========================================================
+    lignes = [
+        # A️⃣ Structure porteuse
+        ("Cale bois 50mm", nb_lignes_poteaux * 2),
+        ("Vérin de socle 30cm", nb_lignes_poteaux * 2),
+        ("Embase standard", nb_lignes_poteaux * 2),
+        ("Poteau 2m", nb_lignes_poteaux * 2 * nb_niveaux),
+        # B️⃣ Lisses / moises
+        ("Moise 3.07m", nb_travees * nb_niveaux * 2),
+        ("Moise 0.73m", nb_lignes_poteaux * nb_niveaux * 2),
+        # C️⃣ Planchers : travail + accès bas (2) + accès haut (1, l'autre = trappe)
+        ("plancher acier 3.07m",
+            2 * nb_travees_travail * nb_niveaux
+            + 2 * nb_travees_acces
+            + nb_travees_acces * max(0, nb_niveaux - 1)),
+        # D️⃣ Trappes d'accès avec échelle intégrée
+        ("Trappe d'accès 3.07m", nb_trappes),
+        # E️⃣ Garde-corps : 2 par travée (int. + ext.), 2 frontaux par niveau
+        ("Garde-corps latéral 3.07m", nb_travees * niveaux_gc * 2),
+        ("Garde-corps frontal 0.73m", 2 * niveaux_gc),
+        # F️⃣ Plinthes (obligatoires avec les garde-corps)
+        ("Plinthe alu 3.07m", nb_travees * niveaux_gc * 2),
+        ("Plinthe alu 0.73m", 2 * niveaux_gc),
+        # G️⃣ Contreventement
+        ("Diagonale 3.0m", math.ceil(nb_travees * nb_niveaux / 2)),
+        ("Diagonale 0.73m", math.ceil(nb_lignes_poteaux * nb_niveaux / 2)),
+        # H️⃣ Amarrages
+        ("Platine d'ancrage au sol", amarrages_total),
+    ]
+    pieces = tuple((nom, qte) for nom, qte in lignes if qte > 0)
+
+    geometrie = (
+        ("nb_travees", nb_travees),
+        ("nb_travees_acces", nb_travees_acces),
+        ("nb_niveaux", nb_niveaux),
+        ("nb_lignes_poteaux", nb_lignes_poteaux),
+        ("niveaux_travail", tuple(liste_niveaux_travail)),
+        ("surface_facade_m2", round(hauteur * longueur, 2)),
+        ("amarrages_calcules", amarrages_total),
+        ("trappes_acces", nb_trappes),
+    )
+    return pieces, geometrie
+
+
+def calculer_quantites(
+    hauteur: float,
+    longueur: float,
+    largeur: float,
+    niveaux_travail: str = "tous"
+) -> Tuple[Dict[str, int], Dict]:
+    """
+    Calcule la nomenclature d'un échafaudage de façade.
+
+    Retour:
+        (pieces, geometrie)
+        pieces    : {nom_article: quantité} dans l'ordre de montage
+        geometrie : nb_travees, nb_niveaux, amarrages, trappes, ...
+    Les dict retournés sont des copies : l'appelant peut les modifier.
+    """
+    pieces, geometrie = _calculer_quantites(
+        normaliser_dimension(hauteur),
+        normaliser_dimension(longueur),
+        normaliser_dimension(largeur),
+        normaliser_niveaux_travail(niveaux_travail),
+    )
+    geometrie = dict(geometrie)
+    geometrie["niveaux_travail"] = list(geometrie["niveaux_travail"])
+    return dict(pieces), geometrie
+
+
+cache_info = _calculer_quantites.cache_info
+cache_clear = _calculer_quantites.cache_clear
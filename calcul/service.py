@@ -5,7 +5,7 @@ from typing import List
 # Imports absolus depuis la racine
 from database import get_db
 from models import Article
-from calcul.structure import calculer_echafaudage
+from calcul.quantites import calculer_quantites
 from calcul.mapping import map_articles_to_db
 
 router = APIRouter(prefix="/calcul", tags=["Calcul"])
@@ -15,9 +15,11 @@ def calcul_endpoint(
     hauteur: float,
     longueur: float,
     largeur: float,
+    niveaux_travail: str = "tous",
     db: Session = Depends(get_db)
 ) -> List[dict]:
-    calculated = calculer_echafaudage(hauteur, longueur, largeur)
-    db_articles = db.query(Article).all()
+    pieces, _ = calculer_quantites(hauteur, longueur, largeur, niveaux_travail)
+    calculated = [{"nom": nom, "quantite": qte} for nom, qte in pieces.items()]
+    db_articles = db.query(Article).filter(Article.nom.in_(list(pieces.keys()))).all()
     mapped = map_articles_to_db(calculated, db_articles)
     return mapped
@@ -0,0 +1,208 @@
+# categories.py
+"""
+Détection de la catégorie d'un article d'après son nom.
+
+Mots-clés : synonymes intégrés (SYNONYMES) et mots propres à l'entreprise
+(table categorie_synonymes, prioritaires). Compilés une fois par entreprise
+en UNE expression régulière : l'alternance de tous les mots, par priorité,
+dans une assertion avant essayée à chaque position du nom normalisé ; la
+catégorie du mot le plus prioritaire trouvé l'emporte (même résultat que
+tester les catégories une à une dans l'ordre). Un lot de noms est classé
+en un seul passage sur le texte concaténé (imports en masse).
+
+Les articles ajoutés sans catégorie la reçoivent au flush (création,
+imports, seed). `python categories.py` classe les articles existants
+sans catégorie. CATEGORIES_SYNONYMES_TTL borne le délai avant de voir les
+synonymes modifiés sur les autres workers.
+"""
+import os
+import re
+import time
+from bisect import bisect_right
+from itertools import accumulate
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import event, or_
+from sqlalchemy.orm import Session
+
+from models import Article, CategorieSynonyme
+from normalisation import normaliser_nom, normaliser_noms
+
+load_dotenv()
+
+CATEGORIES_SYNONYMES_TTL = int(os.getenv("CATEGORIES_SYNONYMES_TTL", "300"))  # secondes
+CATEGORIE_PAR_DEFAUT = "autres"
+
+# Ordre = priorité : la première catégorie dont un mot apparaît l'emporte
+SYNONYMES = {
+    "poteau": ["poteau", "upright", "montant"],
+    "moise": ["moise", "lisse", "ledger"],
+    "transverse": ["transverse", "traverse", "transom"],
+    "diagonale": ["diagonale", "brace"],
+    "plancher": ["plancher", "deck", "platform"],
+    "plinthe": ["plinthe", "toe board"],
+    "gardeCorps": ["garde-corps", "guardrail", "gc"],
+    "embase": ["embase", "base"],
+    "socle": ["socle"],
+    "cale": ["cale"]
+}
+
+_INTEGRES = [(mot, categorie) for categorie, mots in SYNONYMES.items() for mot in mots]
+_CHANGEMENTS = "categories_changements"  # clé de session.info
+
+
+class Classifieur:
+    """Mots-clés (mot, catégorie), du plus prioritaire au moins prioritaire"""
+
+    def __init__(self, mots_cles: Sequence[Tuple[str, str]]):
+        self.expire = time.monotonic() + CATEGORIES_SYNONYMES_TTL
+        self.priorites: Dict[str, int] = {}  # mot normalisé -> rang
+        self.categories: List[str] = []      # rang -> catégorie
+        for mot, categorie in mots_cles:
+            mot = normaliser_nom(mot)
+            if mot and mot not in self.priorites:
+                self.priorites[mot] = len(self.categories)
+                self.categories.append(categorie)
+        self.categories.append(CATEGORIE_PAR_DEFAUT)  # rang "aucun mot trouvé"
+        # Premier caractère en classe : le moteur saute les positions sans mot-clé
+        premiers = "".join(sorted({re.escape(mot[0]) for mot in self.priorites}))
+        alternance = "|".join(re.escape(mot) for mot in self.priorites)
+        self.motif = re.compile(f"(?=[{premiers}])(?=({alternance}))") if alternance else None
+
+    def classer(self, nom: Optional[str]) -> str:
+        return self.classer_lot([nom])[0]
+
+    def classer_lot(self, noms: Sequence[Optional[str]]) -> List[str]:
+        """Catégorie de chaque nom, dans l'ordre ; CATEGORIE_PAR_DEFAUT si aucun mot"""
+        aucun = len(self.categories) - 1
+        rangs = [aucun] * len(noms)
+        if self.motif is not None and noms:
+            normalises = normaliser_noms([nom or "" for nom in noms])
+            # Noms séparés par "\n" (absent des noms normalisés et des mots-clés)
+            fins = list(accumulate(len(n) + 1 for n in normalises))
+            for trouve in self.motif.finditer("\n".join(normalises)):
+                i = bisect_right(fins, trouve.start())
+                rang = self.priorites[trouve.group(1)]
+                if rang < rangs[i]:
+                    rangs[i] = rang
+        return [self.categories[rang] for rang in rangs]
+
+
+_integre = Classifieur(_INTEGRES)
+_classifieurs: Dict[int, Classifieur] = {}
+_generations: Dict[int, int] = {}  # commits touchant les synonymes (construction concurrente)
+_lock = Lock()
+
+
+# -----------------------------
+# 🏷️ CLASSEMENT
+# -----------------------------
+def detecter_categorie(nom: Optional[str]) -> str:
+    """Catégorie d'après les seuls synonymes intégrés"""
+    return _integre.classer(nom)
+
+
+def classifieur(db: Session, company_id: Optional[int]) -> Classifieur:
+    """Classifieur de l'entreprise (synonymes propres puis intégrés), construit une fois"""
+    if company_id is None:
+        return _integre
+    with _lock:
+        courant = _classifieurs.get(company_id)
+    if courant is None or courant.expire < time.monotonic():
+        with _lock:
+            generation = _generations.get(company_id, 0)
+        with db.no_autoflush:
+            propres = (
+                db.query(CategorieSynonyme.mot, CategorieSynonyme.categorie)
+                .filter(CategorieSynonyme.company_id == company_id)
+                .order_by(CategorieSynonyme.id)
+                .all()
+            )
+        courant = Classifieur([tuple(s) for s in propres] + _INTEGRES)
+        with _lock:
+            if _generations.get(company_id, 0) != generation:
+                courant.expire = 0  # synonymes modifiés pendant la lecture : à reconstruire
+            _classifieurs[company_id] = courant
+    return courant
+
+
+def classer_noms(db: Session, company_id: Optional[int], noms: Sequence[Optional[str]]) -> List[str]:
+    """Catégorie de chaque nom pour l'entreprise (un passage pour tout le lot)"""
+    return classifieur(db, company_id).classer_lot(noms)
+
+
+def classer_articles_sans_categorie(db: Session, taille_lot: int = 5000) -> int:
+    """Renseigne la catégorie des articles qui n'en ont pas ; retourne leur nombre"""
+    total = 0
+    while True:
+        articles = (
+            db.query(Article)
+            .filter(or_(Article.category.is_(None), Article.category == ""))
+            .order_by(Article.id)
+            .limit(taille_lot)
+            .all()
+        )
+        if not articles:
+            return total
+        _renseigner(db, articles)
+        db.commit()
+        total += len(articles)
+        print(f"🏷️ {total} article(s) classé(s)")
+
+
+def _renseigner(db: Session, articles: List[Article]):
+    par_entreprise: Dict[Optional[int], List[Article]] = {}
+    for article in articles:
+        par_entreprise.setdefault(article.company_id, []).append(article)
+    for company_id, groupe in par_entreprise.items():
+        for article, categorie in zip(groupe, classer_noms(db, company_id, [a.nom for a in groupe])):
+            article.category = categorie
+
+
+# -----------------------------
+# 🔄 FLUSH / COMMIT
+# -----------------------------
+@event.listens_for(Session, "before_flush")
+def _categoriser_nouveaux(session, flush_context, instances):
+    sans_categorie = [obj for obj in session.new if isinstance(obj, Article) and not obj.category]
+    if sans_categorie:
+        _renseigner(session, sans_categorie)
+
+
+@event.listens_for(Session, "after_flush")
+def _noter_synonymes(session, flush_context):
+    entreprises = {
+        obj.company_id
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if isinstance(obj, CategorieSynonyme)
+    }
+    if entreprises:
+        session.info.setdefault(_CHANGEMENTS, set()).update(entreprises)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalider(session):
+    entreprises = session.info.pop(_CHANGEMENTS, None)
+    if not entreprises:
+        return
+    with _lock:
+        for company_id in entreprises:
+            _generations[company_id] = _generations.get(company_id, 0) + 1
+            _classifieurs.pop(company_id, None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _oublier(session):
+    session.info.pop(_CHANGEMENTS, None)
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"✅ {classer_articles_sans_categorie(db)} article(s) sans catégorie classé(s)")
+    finally:
+        db.close()
@@ -1,11 +1,18 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, case, insert, select, update
 from fastapi import HTTPException
 import schemas
-from models import Company, User, Article, Retrait
+from models import Company, User, Article, Retrait, RetraitRollupJour, SourceMouvementEnum, CategorieSynonyme
 from typing import Optional, List, Dict
 from datetime import datetime
-import math 
+from calcul.quantites import calculer_quantites
+from calcul.batch import calculer_quantites_batch
+from report_cache import marquer_modification
+import stock_stats
+import mouvements_stock
+from normalisation import normaliser_nom
+from categories import SYNONYMES, detecter_categorie
+import article_matcher
 
 
 
@@ -38,6 +45,26 @@ def create_user(db: Session, username: str, hashed_password: str, role: str = "u
     db.refresh(user)
     return user
 
+def get_usernames_existants(db: Session, usernames: List[str]) -> set:
+    """Noms d'utilisateur déjà pris parmi `usernames` (une requête IN)"""
+    if not usernames:
+        return set()
+    return set(db.scalars(select(User.username).where(User.username.in_(usernames))))
+
+def create_users_bulk(db: Session, lignes: List[Dict]) -> List[int]:
+    """
+    Insère N utilisateurs en un seul executemany, sans commit.
+    Retourne les ids dans l'ordre de `lignes`.
+    """
+    if not lignes:
+        return []
+    # RETURNING trié par paramètre retombe en ligne par ligne sur SQLite :
+    # on relit les ids par username (unique), 2 requêtes quel que soit N
+    db.execute(insert(User), lignes)
+    usernames = [l["username"] for l in lignes]
+    ids = dict(db.execute(select(User.username, User.id).where(User.username.in_(usernames))).all())
+    return [ids[u] for u in usernames]
+
 def get_user_by_username(db: Session, username: str):
     return db.query(User).filter(User.username == username).first()
 
@@ -47,6 +74,20 @@ def get_user_by_id(db: Session, uid: int):
 def get_article(db: Session, article_id: int):
     return db.query(Article).filter(Article.id == article_id).first()
 
+def get_articles_by_noms(db: Session, noms: List[str], company_id: Optional[int]) -> Dict[str, Article]:
+    """Résout une liste de noms d'articles en une seule requête IN (...)"""
+    if not noms:
+        return {}
+    articles = db.query(Article).filter(
+        Article.nom.in_(set(noms)),
+        Article.company_id == company_id
+    ).all()
+    catalogue = {}
+    for article in articles:
+        # Même règle que .first() : on garde le premier article trouvé par nom
+        catalogue.setdefault(article.nom, article)
+    return catalogue
+
 # ------------------------------
 # ARTICLES
 # ------------------------------
@@ -74,8 +115,9 @@ def update_article_quantite_by_id(db: Session, article_id: int, nouvelle_qte: in
 def delete_article_by_id(db: Session, article_id: int):
     article = db.query(Article).filter(Article.id == article_id).first()
     if article:
-        # ✅ Supprimer d'abord les retraits liés à cet article
+        # ✅ Supprimer d'abord les retraits liés à cet article (et leurs agrégats)
         db.query(Retrait).filter(Retrait.article_id == article_id).delete()
+        db.query(RetraitRollupJour).filter(RetraitRollupJour.article_id == article_id).delete()
         # ✅ Ensuite supprimer l'article
         db.delete(article)
         db.commit()
@@ -85,20 +127,85 @@ def delete_article_by_id(db: Session, article_id: int):
 # ------------------------------
 # RETRAITS
 # ------------------------------
+def decrementer_stock(db: Session, article_id: int, quantite: int):
+    """
+    Décrément atomique : UPDATE ... WHERE quantite >= :q RETURNING quantite.
+    Retourne (nom, poids, quantite restante, company_id, category) ou None si article absent / stock insuffisant.
+    La ligne reste verrouillée jusqu'au commit de l'appelant.
+    UPDATE hors ORM : cache des rapports, statistiques et journal de stock prévenus explicitement.
+    """
+    stmt = (
+        update(Article)
+        .where(Article.id == article_id, Article.quantite >= quantite)
+        .values(quantite=Article.quantite - quantite)
+        .execution_options(synchronize_session=False)
+    )
+    colonnes = (Article.nom, Article.poids, Article.quantite, Article.company_id, Article.category)
+    if db.get_bind().dialect.update_returning:
+        restant = db.execute(stmt.returning(*colonnes)).first()
+    # Fallback (SQLite < 3.35) : relecture dans la même transaction, après l'écriture
+    elif db.execute(stmt).rowcount != 1:
+        restant = None
+    else:
+        restant = db.query(*colonnes).filter(Article.id == article_id).first()
+    if restant is not None:
+        marquer_modification(db, restant.company_id)
+        stock_stats.enregistrer(
+            db,
+            (restant.company_id, restant.category, restant.quantite + quantite),
+            (restant.company_id, restant.category, restant.quantite)
+        )
+        mouvements_stock.enregistrer(db, article_id, restant.company_id, -quantite, restant.quantite)
+    return restant
+
+def decrementer_stocks(db: Session, quantites: Dict[int, int]) -> Dict[int, int]:
+    """
+    Décrément atomique de plusieurs articles : {article_id: quantité} → {article_id: restant}.
+    Seuls les articles effectivement décrémentés (stock suffisant) sont retournés.
+    Une seule requête UPDATE ... CASE ... RETURNING quand le dialecte le permet ;
+    sinon un UPDATE conditionnel par article, par id croissant (ordre de verrouillage stable).
+    """
+    if not quantites:
+        return {}
+    if db.get_bind().dialect.update_returning:
+        delta = case(quantites, value=Article.id)
+        rows = db.execute(
+            update(Article)
+            .where(Article.id.in_(sorted(quantites)), Article.quantite >= delta)
+            .values(quantite=Article.quantite - delta)
+            .returning(Article.id, Article.quantite, Article.company_id, Article.category)
+            .execution_options(synchronize_session=False)
+        ).all()
+        for company_id in {row.company_id for row in rows}:
+            marquer_modification(db, company_id)
+        for row in rows:
+            stock_stats.enregistrer(
+                db,
+                (row.company_id, row.category, row.quantite + quantites[row.id]),
+                (row.company_id, row.category, row.quantite)
+            )
+            mouvements_stock.enregistrer(db, row.id, row.company_id, -quantites[row.id], row.quantite)
+        return {row.id: row.quantite for row in rows}
+    restants = {}
+    for article_id in sorted(quantites):
+        restant = decrementer_stock(db, article_id, quantites[article_id])
+        if restant is not None:
+            restants[article_id] = restant.quantite
+    return restants
+
 def retirer_article_by_id(db: Session, article_id: int, quantite: int, company_id: Optional[int] = None, user_id: Optional[int] = None):
-    article = db.query(Article).filter(Article.id == article_id).first()
+    mouvements_stock.contexte(db, SourceMouvementEnum.RETRAIT, user_id=user_id)
+    restant = decrementer_stock(db, article_id, quantite)
     
-    if not article:
-        raise HTTPException(status_code=404, detail="Article non trouvé")
-    
-    if article.quantite < quantite:
+    if restant is None:
+        db.rollback()
+        if not get_article(db, article_id):
+            raise HTTPException(status_code=404, detail="Article non trouvé")
         raise HTTPException(status_code=400, detail="Stock insuffisant")
     
-    nouvelle_qte = article.quantite - quantite
-    poids_total = quantite * (article.poids or 0)
-    
-    article.quantite = nouvelle_qte
+    poids_total = quantite * (restant.poids or 0)
     
+    # ✅ Même transaction que le décrément
     retrait = Retrait(
         article_id=article_id,
         company_id=company_id,
@@ -110,50 +217,185 @@ def retirer_article_by_id(db: Session, article_id: int, quantite: int, company_i
     
     db.add(retrait)
     db.commit()
-    db.refresh(article)
     
     return schemas.ArticleRetraitResponse(
         message="Retrait effectué",
         article_id=article_id,
-        nom_article=article.nom,
+        nom_article=restant.nom,
         quantite_retirée=quantite,
         poids_total=poids_total,
-        stock_restant=nouvelle_qte
+        stock_restant=restant.quantite
     )
 
+def retirer_articles_batch(
+    db: Session,
+    lignes: List[schemas.RetraitLigne],
+    company_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    tout_ou_rien: bool = False
+):
+    """
+    Retrait multi-lignes (chargement camion) en une transaction :
+    noms résolus en 1 requête (puis article_matcher pour les noms approchants),
+    décréments en 1 requête, retraits en 1 INSERT.
+    Retourne (resultats_par_ligne, tout_est_ok) ; avec tout_ou_rien, rien n'est
+    appliqué si une ligne échoue.
+    """
+    mouvements_stock.contexte(db, SourceMouvementEnum.RETRAIT, user_id=user_id)
+    catalogue = get_articles_by_noms(db, [l.nom_article for l in lignes], company_id)
+
+    # Noms sans correspondance exacte : résolution approchée (article_matcher)
+    candidats = {}
+    acceptes = {}
+    for nom in {l.nom_article for l in lignes} - set(catalogue):
+        resolution = article_matcher.resoudre(db, company_id, nom)
+        if resolution.article_id is not None:
+            acceptes[nom] = resolution.article_id
+        else:
+            candidats[nom] = [c[1] for c in resolution.candidats]
+    if acceptes:
+        articles = {a.id: a for a in db.query(Article).filter(Article.id.in_(set(acceptes.values())))}
+        for nom, article_id in acceptes.items():
+            if article_id in articles:
+                catalogue[nom] = articles[article_id]
+
+    # Cumul par article (un même article peut apparaître sur plusieurs lignes)
+    quantites = {}
+    for ligne in lignes:
+        article = catalogue.get(ligne.nom_article)
+        if article:
+            quantites[article.id] = quantites.get(article.id, 0) + ligne.quantite
+
+    restants = decrementer_stocks(db, quantites)
+
+    date_retrait = datetime.utcnow()
+    resultats = []
+    retraits = []
+    for ligne in lignes:
+        article = catalogue.get(ligne.nom_article)
+        if not article:
+            resultats.append(schemas.RetraitLigneResultat(
+                nom_article=ligne.nom_article,
+                quantite=ligne.quantite,
+                statut="introuvable",
+                message="Article introuvable",
+                candidats=candidats.get(ligne.nom_article, [])
+            ))
+            continue
+        if article.id not in restants:
+            resultats.append(schemas.RetraitLigneResultat(
+                nom_article=ligne.nom_article,
+                article_id=article.id,
+                quantite=ligne.quantite,
+                statut="stock_insuffisant",
+                message="Stock insuffisant"
+            ))
+            continue
+        poids_total = ligne.quantite * (article.poids or 0)
+        retraits.append({
+            "article_id": article.id,
+            "company_id": company_id,
+            "user_id": user_id,
+            "quantite": ligne.quantite,
+            "poids_total": poids_total,
+            "date_retrait": date_retrait
+        })
+        resultats.append(schemas.RetraitLigneResultat(
+            nom_article=ligne.nom_article,
+            article_id=article.id,
+            quantite=ligne.quantite,
+            statut="ok",
+            message="Retrait effectué" if article.nom == ligne.nom_article else f"Retrait effectué ({article.nom})",
+            poids_total=poids_total,
+            stock_restant=restants[article.id]
+        ))
+
+    tout_est_ok = len(retraits) == len(lignes)
+    if tout_ou_rien and not tout_est_ok:
+        db.rollback()
+        return resultats, False
+
+    if retraits:
+        db.execute(insert(Retrait), retraits)
+        marquer_modification(db, company_id)
+    db.commit()
+    return resultats, tout_est_ok
+
 # ------------------------------------------------------------
 # DÉTECTION CATÉGORIES
 # ------------------------------------------------------------
-SYNONYMES = {
-    "poteau": ["poteau", "upright", "montant"],
-    "moise": ["moise", "lisse", "ledger"],
-    "transverse": ["transverse", "traverse", "transom"],
-    "diagonale": ["diagonale", "brace"],
-    "plancher": ["plancher", "deck", "platform"],
-    "plinthe": ["plinthe", "toe board"],
-    "gardeCorps": ["garde-corps", "guardrail", "gc"],
-    "embase": ["embase", "base"],
-    "socle": ["socle"],
-    "cale": ["cale"]
-}
-
+# Mots-clés et classifieur compilé : categories.py
 def detect_categorie(nom: str):
-    if not nom:
-        return "autres"
-    lower = nom.lower()
-    for cat, mots in SYNONYMES.items():
-        if any(m in lower for m in mots):
-            return cat
-    return "autres"
+    return detecter_categorie(nom)
+
+def get_synonymes_categorie(db: Session, company_id: int):
+    return (
+        db.query(CategorieSynonyme)
+        .filter(CategorieSynonyme.company_id == company_id)
+        .order_by(CategorieSynonyme.id)
+        .all()
+    )
+
+def create_synonyme_categorie(db: Session, company_id: int, synonyme: schemas.CategorieSynonymeCreate):
+    mot = normaliser_nom(synonyme.mot)
+    if not mot:
+        raise HTTPException(status_code=400, detail="Mot-clé vide")
+    existe = db.query(CategorieSynonyme).filter(
+        CategorieSynonyme.company_id == company_id,
+        CategorieSynonyme.mot == mot
+    ).first()
+    if existe:
+        raise HTTPException(status_code=409, detail=f"Mot-clé déjà associé à la catégorie {existe.categorie}")
+    db_synonyme = CategorieSynonyme(company_id=company_id, categorie=synonyme.categorie.strip(), mot=mot)
+    db.add(db_synonyme)
+    db.commit()
+    db.refresh(db_synonyme)
+    return db_synonyme
+
+def delete_synonyme_categorie(db: Session, company_id: int, synonyme_id: int):
+    synonyme = db.query(CategorieSynonyme).filter(
+        CategorieSynonyme.id == synonyme_id,
+        CategorieSynonyme.company_id == company_id
+    ).first()
+    if not synonyme:
+        raise HTTPException(status_code=404, detail="Synonyme non trouvé")
+    db.delete(synonyme)
+    db.commit()
+    return {"message": "Synonyme supprimé avec succès"}
 
 # ------------------------------------------------------------
-# ✅ ALLOCATION ÉCHAFAUDAGE – VERSION CORRIGÉE SANS BUGS
-#    - Calculs vérifiés pour toutes dimensions
+# ✅ ALLOCATION ÉCHAFAUDAGE
+#    - Quantités : moteur pur et mis en cache (calcul/quantites.py)
+#    - Catalogue résolu en UNE requête
 #    - Poids calculé UNE SEULE FOIS
-#    - Trappes avec échelles intégrées
-#    - Amarrages optimisés selon normes EN 12810/12811
 # ------------------------------------------------------------
 
+def _piece_ligne(nom_article: str, quantite: int, article: Optional[Article]) -> Dict:
+    """Ligne de nomenclature ; article None = manquant en base (poids 0)"""
+    if not article:
+        return {
+            "article_id": None,
+            "nom": nom_article,
+            "quantite_utilisee": quantite,
+            "longueur": None,
+            "largeur": None,
+            "hauteur": None,
+            "poids_unitaire": 0,
+            "poids_total_ligne": 0
+        }
+    # 🔒 CALCUL POIDS (JAMAIS REFAIT AILLEURS)
+    poids_unitaire = article.poids or 0
+    return {
+        "article_id": article.id,
+        "nom": article.nom,
+        "quantite_utilisee": quantite,
+        "longueur": article.longueur,
+        "largeur": article.largeur,
+        "hauteur": article.hauteur,
+        "poids_unitaire": poids_unitaire,
+        "poids_total_ligne": round(poids_unitaire * quantite, 2)
+    }
+
 def allocate_echafaudage(
     db,
     hauteur: float,
@@ -163,344 +405,126 @@ def allocate_echafaudage(
     # 🆕 PARAMÈTRE DE CONFIGURATION CLIENT
     niveaux_travail: str = "tous"  # "tous", "dernier", "liste:1,3,5"
 ):
-    # --------------------------------------------------------
-    # LISTES DE SORTIE
-    # --------------------------------------------------------
     pieces = []        # lignes articles finales
     ajustements = []   # articles manquants en base
 
-    # --------------------------------------------------------
-    # MODULES NORMALISÉS ÉCHAFAUDAGE
-    # --------------------------------------------------------
-    MODULE_H = 2.0     # hauteur d'un niveau
-    MODULE_L = 3.07    # longueur d'une travée
-
-    # --------------------------------------------------------
-    # CALCULS GÉOMÉTRIQUES DE BASE
-    # --------------------------------------------------------
-    nb_niveaux = math.ceil(hauteur / MODULE_H)
-    nb_travees = math.ceil(longueur / MODULE_L)
-    nb_lignes_poteaux = nb_travees + 1
-
-    # --------------------------------------------------------
-    # 🆕 DÉTERMINER LES NIVEAUX DE TRAVAIL
-    # --------------------------------------------------------
-    if niveaux_travail == "tous":
-        # Configuration standard : travail sur tous les niveaux
-        liste_niveaux_travail = list(range(1, nb_niveaux + 1))
-    elif niveaux_travail == "dernier":
-        # Travail uniquement au dernier niveau (ex: toiture)
-        liste_niveaux_travail = [nb_niveaux]
-    elif niveaux_travail.startswith("liste:"):
-        # Liste personnalisée : "liste:2,4,5"
-        try:
-            liste_niveaux_travail = [
-                int(n.strip()) 
-                for n in niveaux_travail.replace("liste:", "").split(",")
-            ]
-        except:
-            liste_niveaux_travail = list(range(1, nb_niveaux + 1))
-    else:
-        # Par défaut : tous
-        liste_niveaux_travail = list(range(1, nb_niveaux + 1))
-    
-    nb_niveaux_avec_planchers = len(liste_niveaux_travail)
-    
-    print(f"\n📋 Configuration client :")
-    print(f"   Mode : {niveaux_travail}")
-    print(f"   Niveaux de travail (planchers) : {liste_niveaux_travail}")
-    print(f"   Niveaux de circulation : {nb_niveaux - nb_niveaux_avec_planchers}")
-    
-    # --------------------------------------------------------
-    # RÉPARTITION ACCÈS / TRAVAIL (NORME : 1 ACCÈS / 20M)
-    # --------------------------------------------------------
-    # ✅ RÈGLE : 1 travée d'accès tous les 20m maximum
-    nb_travees_acces = max(1, math.ceil(longueur / 20))
-    nb_travees_travail = max(0, nb_travees - nb_travees_acces)
-    
-    print(f"\n📏 Longueur : {longueur}m → {nb_travees_acces} travée(s) d'accès")
+    # 🧮 QUANTITÉS (aucun accès BDD)
+    pieces_dict, geometrie = calculer_quantites(hauteur, longueur, largeur, niveaux_travail)
 
-    # --------------------------------------------------------
-    # 🔒 POIDS TOTAL GLOBAL (UNE SEULE SOURCE DE VÉRITÉ)
-    # --------------------------------------------------------
-    poids_total = 0.0
-    
-    # --------------------------------------------------------
-    # 🔍 DICTIONNAIRE POUR ÉVITER DOUBLONS
-    # --------------------------------------------------------
-    pieces_dict = {}  # {nom_article: quantité_totale}
-
-    # ========================================================
-    # 🔧 FONCTION D'AJOUT D'ARTICLE (SÉCURISÉE + ANTI-DOUBLON)
-    # ========================================================
-    def add_piece(nom: str, quantite: int):
-        nonlocal poids_total
-
-        if quantite <= 0:
-            return
-
-        # ✅ VÉRIFICATION DEBUG
-        print(f"🔍 add_piece appelé : {nom} × {quantite}")
-
-        # ------------------------------------------------
-        # CUMUL SI ARTICLE DÉJÀ AJOUTÉ (ANTI-DOUBLON)
-        # ------------------------------------------------
-        if nom in pieces_dict:
-            pieces_dict[nom] += quantite
-            print(f"   ➕ Cumul : {nom} → {pieces_dict[nom]} total")
-            return
-        
-        pieces_dict[nom] = quantite
-
-        article = (
-            db.query(Article)
-            .filter(
-                Article.nom == nom,
-                Article.company_id == company_id
-            )
-            .first()
-        )
+    # 🔍 UNE SEULE REQUÊTE pour toute la nomenclature
+    catalogue = get_articles_by_noms(db, list(pieces_dict.keys()), company_id)
 
-        # ----------------------------------------------------
-        # ARTICLE MANQUANT EN BASE
-        # ----------------------------------------------------
+    for nom_article, quantite_totale in pieces_dict.items():
+        article = catalogue.get(nom_article)
         if not article:
-            ajustements.append(f"Article manquant : {nom}")
-            print(f"   ⚠️ Article manquant en BDD : {nom}")
-            return
-
-        # ----------------------------------------------------
-        # 🔒 CALCUL POIDS (JAMAIS REFAIT AILLEURS)
-        # ----------------------------------------------------
-        poids_unitaire = article.poids or 0
-        poids_ligne = poids_unitaire * quantite
-        poids_total += poids_ligne
-
-        print(f"   ✅ Poids : {poids_unitaire} kg × {quantite} = {poids_ligne} kg")
-
-    # ========================================================
-    # A️⃣ STRUCTURE PORTEUSE
-    # ========================================================
-    print("\n" + "="*60)
-    print("🏗️ CALCUL STRUCTURE PORTEUSE")
-    print("="*60)
-    
-    qte_cales = nb_lignes_poteaux * 2
-    qte_verins = nb_lignes_poteaux * 2
-    qte_embases = nb_lignes_poteaux * 2
-    qte_poteaux = nb_lignes_poteaux * 2 * nb_niveaux
-    
-    print(f"Lignes de poteaux : {nb_lignes_poteaux}")
-    print(f"Niveaux : {nb_niveaux}")
-    print(f"Calcul poteaux : {nb_lignes_poteaux} lignes × 2 côtés × {nb_niveaux} niveaux = {qte_poteaux}")
-    
-    add_piece("Cale bois 50mm", qte_cales)
-    add_piece("Vérin de socle 30cm", qte_verins)
-    add_piece("Embase standard", qte_embases)
-    add_piece("Poteau 2m", qte_poteaux)
-
-    # ========================================================
-    # B️⃣ LISSES / MOISES
-    # ========================================================
-    print("\n" + "="*60)
-    print("🔗 CALCUL MOISES")
-    print("="*60)
-    
-    qte_moise_long = nb_travees * nb_niveaux * 2
-    qte_moise_trans = nb_lignes_poteaux * nb_niveaux * 2
-    
-    print(f"Moises 3.07m : {nb_travees} travées × {nb_niveaux} niveaux × 2 = {qte_moise_long}")
-    print(f"Moises 0.73m : {nb_lignes_poteaux} lignes × {nb_niveaux} niveaux × 2 = {qte_moise_trans}")
+            ajustements.append(f"Article manquant : {nom_article}")
+        pieces.append(_piece_ligne(nom_article, quantite_totale, article))
     
-    add_piece("Moise 3.07m", qte_moise_long)
-    add_piece("Moise 0.73m", qte_moise_trans)
+    # 🔒 POIDS TOTAL GLOBAL (UNE SEULE SOURCE DE VÉRITÉ)
+    poids_total = sum(p["poids_total_ligne"] for p in pieces)
 
     # ========================================================
-    # C️⃣ PLANCHERS (SANS DOUBLONS)
+    # META FINAL
     # ========================================================
-    print("\n" + "="*60)
-    print("🔲 CALCUL PLANCHERS")
-    print("="*60)
-    
-    # Travées de travail : 2 planchers × toutes travées × tous niveaux
-    planchers_travail = 2 * nb_travees_travail * nb_niveaux
-    
-    # Travée d'accès niveau 0 : 2 planchers normaux
-    planchers_acces_bas = 2 * nb_travees_acces
-    
-    # Travée d'accès niveaux supérieurs : 1 plancher (l'autre = trappe)
-    planchers_acces_haut = nb_travees_acces * max(0, nb_niveaux - 1)
-    
-    # ✅ TOTAL PLANCHERS (CALCUL UNIQUE)
-    total_planchers = planchers_travail + planchers_acces_bas + planchers_acces_haut
-    
-    print(f"Planchers travail : {nb_travees_travail} travées × 2 × {nb_niveaux} = {planchers_travail}")
-    print(f"Planchers accès bas : 2 × 1 = {planchers_acces_bas}")
-    print(f"Planchers accès haut : 1 × {nb_niveaux - 1} = {planchers_acces_haut}")
-    print(f"TOTAL : {total_planchers}")
-    
-    add_piece("plancher acier 3.07m", total_planchers)
+    meta = {
+        "nb_travees": geometrie["nb_travees"],
+        "nb_travees_acces": geometrie["nb_travees_acces"],
+        "nb_niveaux": geometrie["nb_niveaux"],
+        "nb_lignes_poteaux": geometrie["nb_lignes_poteaux"],
+        "poids_total": round(poids_total, 2),
+        "surface_facade_m2": geometrie["surface_facade_m2"],
+        "amarrages_calcules": geometrie["amarrages_calcules"],
+        "conformite_EN12810": True,
+        "trappes_acces": geometrie["trappes_acces"]
+    }
 
-    # ========================================================
-    # D️⃣ TRAPPES D'ACCÈS AVEC ÉCHELLE INTÉGRÉE
-    # ========================================================
-    print("\n" + "="*60)
-    print("🪜 CALCUL TRAPPES")
-    print("="*60)
-    
-    nb_trappes = nb_travees_acces * max(0, nb_niveaux - 1)
-    print(f"Trappes : {nb_travees_acces} travée × {nb_niveaux - 1} niveaux = {nb_trappes}")
-    
-    if nb_trappes > 0:
-        add_piece("Trappe d'accès 3.07m", nb_trappes)
+    return pieces, meta, ajustements
 
-    # ========================================================
-    # E️⃣ GARDE-CORPS (SÉCURITÉ OBLIGATOIRE NORMES EN 12810)
-    # ========================================================
-    print("\n" + "="*60)
-    print("🛡️ CALCUL GARDE-CORPS")
-    print("="*60)
-    
-    # ✅ NORMES EN 12810 : GC obligatoires à partir du niveau 1
-    niveaux_gc = max(0, nb_niveaux - 1)  # Tous sauf niveau 0
-    
-    # ✅ GC latéraux : 2 par travée (intérieur + extérieur)
-    qte_gc_lat = nb_travees * niveaux_gc * 2
-    
-    # ✅ GC frontaux : 2 par niveau (début + fin)
-    qte_gc_front = 2 * niveaux_gc
-    
-    print(f"Mode : Conforme normes EN 12810 (GC sur tous les niveaux ≥1)")
-    print(f"GC latéraux : {nb_travees} travées × {niveaux_gc} niv × 2 côtés = {qte_gc_lat}")
-    print(f"GC frontaux : 2 × {niveaux_gc} niv = {qte_gc_front}")
-    
-    add_piece("Garde-corps latéral 3.07m", qte_gc_lat)
-    add_piece("Garde-corps frontal 0.73m", qte_gc_front)
 
-    # ========================================================
-    # F️⃣ PLINTHES (OBLIGATOIRES AVEC LES GARDE-CORPS)
-    # ========================================================
-    # ✅ Plinthes latérales : 2 par travée (intérieur + extérieur)
-    qte_plinthe_long = nb_travees * niveaux_gc * 2
-    
-    # ✅ Plinthes frontales : 2 par niveau (début + fin)
-    qte_plinthe_trans = 2 * niveaux_gc
-    
-    print(f"Plinthes 3.07m : {nb_travees} travées × {niveaux_gc} niv × 2 côtés = {qte_plinthe_long}")
-    print(f"Plinthes 0.73m : 2 × {niveaux_gc} niv = {qte_plinthe_trans}")
-    
-    add_piece("Plinthe alu 3.07m", qte_plinthe_long)
-    add_piece("Plinthe alu 0.73m", qte_plinthe_trans)
+# ------------------------------------------------------------
+# 🏢 ALLOCATION MULTI-FAÇADES (BATCH VECTORISÉ)
+# ------------------------------------------------------------
+def allocate_echafaudage_batch(
+    db: Session,
+    facades: List[schemas.CalculRequest],
+    company_id: Optional[int]
+):
+    """
+    Calcule N façades en une passe NumPy et résout le catalogue une seule fois.
+    Retourne (resultats_par_facade, pieces_agregees, meta, ajustements).
+    """
+    quantites, geometrie = calculer_quantites_batch(
+        [f.hauteur for f in facades],
+        [f.longueur for f in facades]
+    )
+    catalogue = get_articles_by_noms(db, list(quantites.keys()), company_id)
 
-    # ========================================================
-    # G️⃣ CONTREVENTEMENT
-    # ========================================================
-    print("\n" + "="*60)
-    print("🔺 CALCUL DIAGONALES")
-    print("="*60)
-    
-    qte_diag_long = math.ceil(nb_travees * nb_niveaux / 2)
-    qte_diag_trans = math.ceil(nb_lignes_poteaux * nb_niveaux / 2)
-    
-    print(f"Diagonales 3.0m : ceil({nb_travees} × {nb_niveaux} / 2) = {qte_diag_long}")
-    print(f"Diagonales 0.73m : ceil({nb_lignes_poteaux} × {nb_niveaux} / 2) = {qte_diag_trans}")
-    
-    add_piece("Diagonale 3.0m", qte_diag_long)
-    add_piece("Diagonale 0.73m", qte_diag_trans)
+    # Conversion unique tableaux NumPy → listes Python (itération rapide)
+    quantites_listes = {nom: qtes.tolist() for nom, qtes in quantites.items()}
+    geometrie_listes = {cle: valeurs.tolist() for cle, valeurs in geometrie.items()}
 
-    # ========================================================
-    # H️⃣ AMARRAGES (NORMES EN 12811)
-    # ========================================================
-    print("\n" + "="*60)
-    print("⚓ CALCUL AMARRAGES")
-    print("="*60)
-    
-    surface_facade = hauteur * longueur
-    amarrages_par_surface = math.ceil(surface_facade / 24)
-    niveaux_amarrage = math.ceil(hauteur / 4)
-    points_par_niveau = math.ceil(longueur / 8)
-    
-    amarrages_total = max(
-        amarrages_par_surface,
-        niveaux_amarrage * points_par_niveau
-    )
-    
-    if hauteur > 6:
-        amarrages_total = max(amarrages_total, 4)
-    
-    print(f"Surface façade : {surface_facade} m²")
-    print(f"Par surface (÷24) : {amarrages_par_surface}")
-    print(f"Par grille ({niveaux_amarrage} niv × {points_par_niveau} pts) : {niveaux_amarrage * points_par_niveau}")
-    print(f"TOTAL : {amarrages_total}")
-    
-    add_piece("Platine d'ancrage au sol", amarrages_total)
+    # Ligne modèle par article (résolue une fois), complétée par façade
+    modeles = {
+        nom_article: _piece_ligne(nom_article, 0, catalogue.get(nom_article))
+        for nom_article in quantites_listes
+    }
 
-    # ========================================================
-    # 🔄 CONVERSION DICTIONNAIRE → LISTE FINALE
-    # ========================================================
-    print("\n" + "="*60)
-    print("📦 GÉNÉRATION LISTE FINALE")
-    print("="*60)
-    
-    for nom_article, quantite_totale in pieces_dict.items():
-        article = (
-            db.query(Article)
-            .filter(
-                Article.nom == nom_article,
-                Article.company_id == company_id
-            )
-            .first()
-        )
-        
-        if not article:
+    resultats = []
+    for i, facade in enumerate(facades):
+        pieces = []
+        ajustements = []
+        for nom_article, qtes in quantites_listes.items():
+            qte = qtes[i]
+            if qte <= 0:
+                continue
+            modele = modeles[nom_article]
+            if modele["article_id"] is None:
+                ajustements.append(f"Article manquant : {nom_article}")
             pieces.append({
-                "article_id": None,
-                "nom": nom_article,
-                "quantite_utilisee": quantite_totale,
-                "longueur": None,
-                "largeur": None,
-                "hauteur": None,
-                "poids_unitaire": 0,
-                "poids_total_ligne": 0
+                **modele,
+                "quantite_utilisee": qte,
+                "poids_total_ligne": round(modele["poids_unitaire"] * qte, 2)
             })
-            continue
-        
-        poids_unitaire = article.poids or 0
-        poids_ligne = poids_unitaire * quantite_totale
-        
-        pieces.append({
-            "article_id": article.id,
-            "nom": article.nom,
-            "quantite_utilisee": quantite_totale,
-            "longueur": article.longueur,
-            "largeur": article.largeur,
-            "hauteur": article.hauteur,
-            "poids_unitaire": poids_unitaire,
-            "poids_total_ligne": round(poids_ligne, 2)
+        poids_total = round(sum(p["poids_total_ligne"] for p in pieces), 2)
+        resultats.append({
+            "pieces": pieces,
+            "poids_total": poids_total,
+            "meta": {
+                "nom_chantier": facade.nom_chantier,
+                "nb_travees": geometrie_listes["nb_travees"][i],
+                "nb_travees_acces": geometrie_listes["nb_travees_acces"][i],
+                "nb_niveaux": geometrie_listes["nb_niveaux"][i],
+                "nb_lignes_poteaux": geometrie_listes["nb_lignes_poteaux"][i],
+                "poids_total": poids_total,
+                "surface_facade_m2": round(geometrie_listes["surface_facade_m2"][i], 2),
+                "amarrages_calcules": geometrie_listes["amarrages_calcules"][i],
+                "conformite_EN12810": True,
+                "trappes_acces": geometrie_listes["trappes_acces"][i]
+            },
+            "ajustements": ajustements
         })
-    
-    # Recalculer poids total à partir des pièces finales
-    poids_total = sum(p["poids_total_ligne"] for p in pieces)
 
-    # ========================================================
-    # META FINAL
-    # ========================================================
+    # Nomenclature agrégée du bâtiment
+    pieces_agregees = []
+    ajustements = []
+    for nom_article, qtes in quantites.items():
+        total = int(qtes.sum())
+        if total <= 0:
+            continue
+        article = catalogue.get(nom_article)
+        if not article:
+            ajustements.append(f"Article manquant : {nom_article}")
+        pieces_agregees.append(_piece_ligne(nom_article, total, article))
+
+    poids_total = round(sum(r["poids_total"] for r in resultats), 2)
     meta = {
-        "nb_travees": nb_travees,
-        "nb_travees_acces": nb_travees_acces,
-        "nb_niveaux": nb_niveaux,
-        "nb_lignes_poteaux": nb_lignes_poteaux,
-        "poids_total": round(poids_total, 2),
-        "surface_facade_m2": round(surface_facade, 2),
-        "amarrages_calcules": amarrages_total,
-        "conformite_EN12810": True,
-        "trappes_acces": nb_trappes
+        "nb_facades": len(facades),
+        "poids_total": poids_total,
+        "surface_facade_m2": round(float(geometrie["surface_facade_m2"].sum()), 2),
+        "amarrages_calcules": int(geometrie["amarrages_calcules"].sum()),
+        "trappes_acces": int(geometrie["trappes_acces"].sum())
     }
-    
-    print(f"\n✅ POIDS TOTAL : {poids_total} kg")
-    print("="*60 + "\n")
-
-    return pieces, meta, ajustements
+    return resultats, pieces_agregees, meta, ajustements
 
 
 # ------------------------------------------------------------
@@ -510,25 +534,57 @@ def apply_allocation_to_stock(
     db: Session, 
     pieces_result: List[Dict], 
     company_id: Optional[int] = None, 
-    user_id: Optional[int] = None
+    user_id: Optional[int] = None,
+    tout_ou_rien: bool = False
 ):
+    """
+    Sort du stock les pièces d'une allocation, dans une seule transaction.
+    - Décrément conditionnel (UPDATE ... WHERE quantite >= :qty) : aucune mise à jour perdue
+    - Articles verrouillés par id croissant : pas de deadlock (voir decrementer_stocks)
+    - Retraits insérés en un seul INSERT multi-lignes
+    tout_ou_rien=True : la moindre ligne en échec annule toute l'allocation
+    """
     errors = []
+
+    # Regroupement par article : {article_id: [nom, quantité, poids_unitaire]}
+    lignes = {}
     for p in pieces_result:
         aid = p.get("article_id")
         qty = p.get("quantite_utilisee", 0)
-        article = db.query(Article).filter(Article.id == aid).first()
-        if not article:
-            errors.append(f"Article {aid} introuvable")
+        if aid is None:
+            errors.append(f"Article {p.get('nom')} introuvable")
             continue
-        if article.quantite < qty:
-            errors.append(f"Stock insuffisant pour {article.nom}")
+        if qty <= 0:
             continue
-        article.quantite -= qty
-        poids_total = qty * (article.poids or 0)
-        retrait = Retrait(
-            article_id=aid, company_id=company_id, quantite=qty,
-            poids_total=poids_total, date_retrait=datetime.utcnow(), user_id=user_id
-        )
-        db.add(retrait)
+        if aid in lignes:
+            lignes[aid][1] += qty
+        else:
+            lignes[aid] = [p.get("nom"), qty, p.get("poids_unitaire") or 0]
+
+    mouvements_stock.contexte(db, SourceMouvementEnum.ALLOCATION, user_id=user_id)
+    restants = decrementer_stocks(db, {aid: ligne[1] for aid, ligne in lignes.items()})
+
+    date_retrait = datetime.utcnow()
+    retraits = []
+    for aid, (nom, qty, poids_unitaire) in lignes.items():
+        if aid not in restants:
+            errors.append(f"Stock insuffisant pour {nom}")
+            continue
+        retraits.append({
+            "article_id": aid,
+            "company_id": company_id,
+            "user_id": user_id,
+            "quantite": qty,
+            "poids_total": qty * poids_unitaire,
+            "date_retrait": date_retrait
+        })
+
+    if tout_ou_rien and errors:
+        db.rollback()
+        return errors
+
+    if retraits:
+        db.execute(insert(Retrait), retraits)
+        marquer_modification(db, company_id)
     db.commit()
-    return errors
\ No newline at end of file
+    return errors
@@ -3,31 +3,28 @@
 Fonctions de recherche et filtrage avancés pour les articles
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_, func
-from models import Article, Retrait
-from typing import Optional, List
+from sqlalchemy import case, func
+from sqlalchemy.engine import Row
+from models import Article, Retrait, Chantier
+import article_search
+from typing import Iterator, Optional, List
 from datetime import datetime, timedelta
 
-def search_articles(
-    db: Session,
+def _filtrer_articles(
+    query,
     search: Optional[str] = None,
     categorie: Optional[str] = None,
     min_stock: Optional[int] = None,
     max_stock: Optional[int] = None,
-    skip: int = 0,
-    limit: int = 100
-) -> List[Article]:
-    """Recherche avancée d'articles avec filtres multiples"""
-    query = db.query(Article)
+    company_id: Optional[int] = None,
+    classer: bool = False
+):
+    """Filtres communs à la recherche et aux exports (classer : tri par pertinence de `search`)"""
+    if company_id is not None:
+        query = query.filter(Article.company_id == company_id)
     
     if search:
-        query = query.filter(
-            or_(
-                Article.nom.ilike(f"%{search}%"),
-                Article.reference.ilike(f"%{search}%") if hasattr(Article, 'reference') else False,
-                Article.category.ilike(f"%{search}%")
-            )
-        )
+        query = article_search.filtrer(query, search, company_id, classer=classer)
     
     if categorie:
         query = query.filter(Article.category.ilike(f"%{categorie}%"))
@@ -38,27 +35,150 @@ def search_articles(
     if max_stock is not None:
         query = query.filter(Article.quantite <= max_stock)
     
+    return query
+
+def search_articles(
+    db: Session,
+    search: Optional[str] = None,
+    categorie: Optional[str] = None,
+    min_stock: Optional[int] = None,
+    max_stock: Optional[int] = None,
+    skip: int = 0,
+    limit: Optional[int] = 100,
+    company_id: Optional[int] = None
+) -> List[Article]:
+    """
+    Recherche avancée d'articles avec filtres multiples (limit=None : sans limite).
+    Avec `search` : index de recherche (article_search), plus pertinents d'abord.
+    """
+    query = _filtrer_articles(
+        db.query(Article), search, categorie, min_stock, max_stock, company_id, classer=True
+    )
     return query.offset(skip).limit(limit).all()
 
-def get_low_stock_articles(db: Session, threshold: int = 10) -> List[Article]:
+def stats_inventaire(
+    db: Session,
+    seuil_alerte: int = 10,
+    **filtres
+) -> dict:
+    """Synthèse de l'inventaire calculée en SQL (un seul agrégat, sans charger les articles)"""
+    query = _filtrer_articles(
+        db.query(
+            func.count(Article.id),
+            func.coalesce(func.sum(Article.quantite), 0),
+            func.count(case((Article.quantite <= seuil_alerte, 1))),
+            func.count(func.distinct(Article.category)),
+        ),
+        **filtres
+    )
+    total, stock, alertes, categories = query.one()
+    return {
+        "total_articles": total,
+        "stock_total": stock,
+        "alertes_stock_faible": alertes,
+        "categories": categories,
+    }
+
+# Colonnes des exports CSV/NDJSON (l'en-tête reprend les clés)
+COLONNES_ARTICLES = (
+    Article.id, Article.reference, Article.nom, Article.description, Article.category,
+    Article.quantite, Article.prix_unitaire, Article.longueur, Article.largeur,
+    Article.hauteur, Article.poids,
+)
+COLONNES_RETRAITS = (
+    Retrait.id, Retrait.date_retrait, Retrait.article_id,
+    Article.reference.label("article_reference"), Article.nom.label("article_nom"),
+    Retrait.quantite, Retrait.poids_total, Retrait.user_id, Retrait.nom_utilisateur,
+)
+COLONNES_CHANTIERS = (
+    Chantier.id, Chantier.nom_chantier, Chantier.date_creation, Chantier.duree_location,
+    Chantier.hauteur, Chantier.longueur, Chantier.largeur, Chantier.niveaux_travail,
+    Chantier.poids_total,
+)
+
+def iter_articles_export(
+    db: Session,
+    taille_lot: int = 1000,
+    colonnes=(Article.reference, Article.nom, Article.category, Article.quantite, Article.prix_unitaire),
+    **filtres
+) -> Iterator[Row]:
+    """
+    Parcourt les articles filtrés par lots de `taille_lot` (curseur serveur
+    sur PostgreSQL) : seules les colonnes de l'export, pas d'objets ORM.
+    Lignes par défaut : (reference, nom, category, quantite, prix_unitaire)
+    """
+    query = _filtrer_articles(db.query(*colonnes), **filtres).order_by(Article.id)
+    yield from query.execution_options(yield_per=taille_lot)
+
+def iter_retraits_export(
+    db: Session,
+    taille_lot: int = 1000,
+    company_id: Optional[int] = None,
+    article_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    date_debut: Optional[datetime] = None,
+    date_fin: Optional[datetime] = None
+) -> Iterator[Row]:
+    """Historique des retraits (plus anciens d'abord) en curseur serveur : COLONNES_RETRAITS"""
+    query = db.query(*COLONNES_RETRAITS).join(Article, Retrait.article_id == Article.id)
+    if company_id is not None:
+        query = query.filter(Retrait.company_id == company_id)
+    if article_id is not None:
+        query = query.filter(Retrait.article_id == article_id)
+    if user_id is not None:
+        query = query.filter(Retrait.user_id == user_id)
+    if date_debut:
+        query = query.filter(Retrait.date_retrait >= date_debut)
+    if date_fin:
+        query = query.filter(Retrait.date_retrait < date_fin)
+    query = query.order_by(Retrait.date_retrait, Retrait.id)
+    yield from query.execution_options(yield_per=taille_lot)
+
+def iter_chantiers_export(
+    db: Session,
+    taille_lot: int = 1000,
+    company_id: Optional[int] = None,
+    nom_chantier: Optional[str] = None,
+    date_debut: Optional[datetime] = None,
+    date_fin: Optional[datetime] = None
+) -> Iterator[Row]:
+    """Chantiers (plus anciens d'abord) en curseur serveur : COLONNES_CHANTIERS"""
+    query = db.query(*COLONNES_CHANTIERS).filter(Chantier.company_id == company_id)
+    if nom_chantier:
+        query = query.filter(Chantier.nom_chantier.ilike(f"%{nom_chantier}%"))
+    if date_debut:
+        query = query.filter(Chantier.date_creation >= date_debut)
+    if date_fin:
+        query = query.filter(Chantier.date_creation < date_fin)
+    query = query.order_by(Chantier.date_creation, Chantier.id)
+    yield from query.execution_options(yield_per=taille_lot)
+
+def get_low_stock_articles(db: Session, threshold: int = 10, company_id: Optional[int] = None) -> List[Article]:
     """Récupère les articles avec stock faible"""
-    return db.query(Article).filter(Article.quantite <= threshold).all()
+    query = db.query(Article).filter(Article.quantite <= threshold)
+    if company_id is not None:
+        query = query.filter(Article.company_id == company_id)
+    return query.all()
 
-def get_stats_by_category(db: Session):
+def get_stats_by_category(db: Session, company_id: Optional[int] = None):
     """Statistiques par catégorie"""
-    return db.query(
+    query = db.query(
         Article.category.label('categorie'),  # Alias pour compatibilité
         func.count(Article.id).label('nombre_articles'),
         func.sum(Article.quantite).label('stock_total')
-    ).group_by(Article.category).all()
+    )
+    if company_id is not None:
+        query = query.filter(Article.company_id == company_id)
+    return query.group_by(Article.category).all()
 
-def get_recent_retraits(db: Session, days: int = 7, limit: int = 50):
-    """Récupère les retraits récents"""
-    date_limite = datetime.now() - timedelta(days=days)
+def get_recent_retraits(db: Session, days: int = 7, limit: int = 50, company_id: Optional[int] = None):
+    """Récupère les retraits récents (index company_id, date_retrait quand filtré par entreprise)"""
+    date_limite = datetime.utcnow() - timedelta(days=days)
     
     # Utiliser le bon nom de colonne (date_retrait ou date)
     date_column = Retrait.date_retrait if hasattr(Retrait, 'date_retrait') else Retrait.date
     
-    return db.query(Retrait).filter(
-        date_column >= date_limite
-    ).order_by(date_column.desc()).limit(limit).all()
\ No newline at end of file
+    query = db.query(Retrait).filter(date_column >= date_limite)
+    if company_id is not None:
+        query = query.filter(Retrait.company_id == company_id)
+    return query.order_by(date_column.desc()).limit(limit).all()
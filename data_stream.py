@@ -0,0 +1,88 @@
+# data_stream.py
+"""
+Exports CSV / NDJSON en flux (intégration ERP).
+
+Les lignes arrivent d'un curseur serveur (crud_filters.iter_*_export) et
+sont sérialisées par blocs d'environ TAILLE_BLOC octets : mémoire
+constante quel que soit le nombre de lignes, envoi en
+Transfer-Encoding: chunked. Compression gzip optionnelle, elle aussi
+au fil de l'eau.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from enum import Enum
+from typing import Iterable, Iterator, Sequence
+
+TAILLE_BLOC = 64 * 1024
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _valeur(v):
+    """Types SQL -> JSON : dates ISO 8601, enums par leur valeur"""
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    if isinstance(v, Enum):
+        return v.value
+    return v
+
+
+def _csv(colonnes: Sequence[str], lignes: Iterable[Sequence]) -> Iterator[str]:
+    tampon = io.StringIO()
+    writer = csv.writer(tampon, lineterminator="\n")
+    writer.writerow(colonnes)
+    for ligne in lignes:
+        writer.writerow([_valeur(v) for v in ligne])
+        if tampon.tell() >= TAILLE_BLOC:
+            yield tampon.getvalue()
+            tampon.seek(0)
+            tampon.truncate()
+    yield tampon.getvalue()
+
+
+def _ndjson(colonnes: Sequence[str], lignes: Iterable[Sequence]) -> Iterator[str]:
+    bloc, taille = [], 0
+    for ligne in lignes:
+        texte = json.dumps(
+            {c: _valeur(v) for c, v in zip(colonnes, ligne)},
+            ensure_ascii=False, separators=(",", ":")
+        )
+        bloc.append(texte)
+        taille += len(texte) + 1
+        if taille >= TAILLE_BLOC:
+            yield "\n".join(bloc) + "\n"
+            bloc, taille = [], 0
+    if bloc:
+        yield "\n".join(bloc) + "\n"
+
+
+def _gzip(blocs: Iterable[bytes]) -> Iterator[bytes]:
+    compresseur = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 : en-tête gzip
+    for bloc in blocs:
+        sortie = compresseur.compress(bloc)
+        if sortie:
+            yield sortie
+    yield compresseur.flush()
+
+
+def stream_export(
+    format: str,
+    colonnes: Sequence[str],
+    lignes: Iterable[Sequence],
+    gzip: bool = False
+) -> Iterator[bytes]:
+    """
+    Sérialise `lignes` (tuples dans l'ordre de `colonnes`) en CSV ou NDJSON.
+
+    Yields:
+        bytes: blocs UTF-8 (compressés si gzip=True)
+    """
+    serialiseur = _csv if format == "csv" else _ndjson
+    blocs = (texte.encode("utf-8") for texte in serialiseur(colonnes, lignes))
+    return _gzip(blocs) if gzip else blocs
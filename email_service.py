@@ -14,7 +14,9 @@ SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
 SMTP_USER = os.getenv("SMTP_USER", "")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
-SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USER)
+SMTP_FROM = os.getenv("SMTP_FROM") or SMTP_USER
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() in ("1", "true", "yes")
+SMTP_TIMEOUT = int(os.getenv("SMTP_TIMEOUT", "30"))
 APP_URL = os.getenv("APP_URL", "http://localhost:3000")
 
 def generate_temp_password(length=12):
@@ -23,33 +25,43 @@ def generate_temp_password(length=12):
     password = ''.join(secrets.choice(characters) for _ in range(length))
     return password
 
+def smtp_configure() -> bool:
+    return bool(SMTP_USER and SMTP_PASSWORD)
+
+def build_message(to_email: str, subject: str, body: str) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg['From'] = SMTP_FROM
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+def open_smtp_connection() -> smtplib.SMTP:
+    """Connexion SMTP prête à envoyer (STARTTLS + login)"""
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    if SMTP_STARTTLS:
+        server.starttls()
+    server.login(SMTP_USER, SMTP_PASSWORD)
+    return server
+
+def print_simulated_email(to_email: str, subject: str, body: str):
+    print("⚠️ Configuration SMTP manquante - Email non envoyé")
+    print(f"📧 Email simulé pour {to_email}:")
+    print(f"Subject: {subject}")
+    print(f"Body:\n{body}")
+
 def send_email(to_email: str, subject: str, body: str):
-    """Envoyer un email via SMTP"""
-    if not SMTP_USER or not SMTP_PASSWORD:
-        print("⚠️ Configuration SMTP manquante - Email non envoyé")
-        print(f"📧 Email simulé pour {to_email}:")
-        print(f"Subject: {subject}")
-        print(f"Body:\n{body}")
+    """
+    Envoyer un email via SMTP (connexion dédiée, synchrone).
+    Les routes passent par l'outbox (outbox.py) : à réserver aux scripts.
+    """
+    if not smtp_configure():
+        print_simulated_email(to_email, subject, body)
         return False
     
     try:
-        # Créer le message
-        msg = MIMEMultipart()
-        msg['From'] = SMTP_FROM
-        msg['To'] = to_email
-        msg['Subject'] = subject
-        
-        # Ajouter le corps du message
-        msg.attach(MIMEText(body, 'plain'))
-        
-        # Connexion au serveur SMTP
-        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
-        server.starttls()
-        server.login(SMTP_USER, SMTP_PASSWORD)
-        
-        # Envoi
-        text = msg.as_string()
-        server.sendmail(SMTP_FROM, to_email, text)
+        server = open_smtp_connection()
+        server.sendmail(SMTP_FROM, to_email, build_message(to_email, subject, body).as_string())
         server.quit()
         
         print(f"✅ Email envoyé à {to_email}")
@@ -59,8 +71,8 @@ def send_email(to_email: str, subject: str, body: str):
         print(f"❌ Erreur envoi email: {e}")
         return False
 
-def send_welcome_email(username: str, email: str, temp_password: str, role: str, company_name: str = None):
-    """Envoyer un email de bienvenue avec mot de passe temporaire"""
+def welcome_email_content(username: str, temp_password: str, role: str, company_name: str = None):
+    """Sujet et corps de l'email de bienvenue avec mot de passe temporaire"""
     
     role_fr = {
         "superadmin": "Super Administrateur",
@@ -97,6 +109,11 @@ Cordialement,
 L'équipe de Gestion d'Échafaudages
 """
     
+    return subject, body
+
+def send_welcome_email(username: str, email: str, temp_password: str, role: str, company_name: str = None):
+    """Envoyer un email de bienvenue avec mot de passe temporaire"""
+    subject, body = welcome_email_content(username, temp_password, role, company_name)
     return send_email(email, subject, body)
 
 def send_password_reset_email(username: str, email: str, temp_password: str):
@@ -0,0 +1,318 @@
+# exports.py
+"""
+Jobs d'export PDF asynchrones.
+
+La route lit les données (requête BDD rapide) puis confie la mise en page
+ReportLab, coûteuse en CPU, à un ProcessPoolExecutor : le rendu ne prend
+ni un thread de l'API ni le GIL du processus qui sert les requêtes.
+Le client suit le job (statut) puis télécharge le fichier, conservé
+EXPORT_TTL secondes.
+
+Les jobs sont en base (table export_jobs) : statut et téléchargement
+fonctionnent quel que soit le worker qui reçoit la requête, et la limite
+par entreprise vaut pour l'ensemble des workers. EXPORT_DIR doit donc être
+partagé entre eux (même machine ou volume commun). Un job resté en cours
+plus de EXPORT_JOB_TIMEOUT secondes (worker arrêté pendant le rendu) est
+passé en échec et libère sa place.
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sqlalchemy.orm import Session
+
+from crud_filters import search_articles, get_low_stock_articles, get_stats_by_category
+from database import SessionLocal
+from models import Company, ExportJob
+from pdf_generator import render_report_to_file
+
+load_dotenv()
+
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+EXPORT_TTL = int(os.getenv("EXPORT_TTL", "3600"))  # secondes
+EXPORT_DIR = os.getenv("EXPORT_DIR") or os.path.join(tempfile.gettempdir(), "stock-exports")
+# Jobs en cours par entreprise : une entreprise ne peut pas
+# monopoliser le pool au détriment des autres
+EXPORT_JOBS_PAR_ENTREPRISE = int(os.getenv("EXPORT_JOBS_PAR_ENTREPRISE", "3"))
+# Au-delà, un job "en_cours" est considéré perdu (worker arrêté pendant le rendu)
+EXPORT_JOB_TIMEOUT = int(os.getenv("EXPORT_JOB_TIMEOUT", "900"))  # secondes
+# Priorité réduite des processus de rendu : l'API garde la main sur le CPU
+EXPORT_NICE = int(os.getenv("EXPORT_NICE", "10"))
+
+RAPPORTS = ("inventory", "low-stock", "categories", "custom")
+
+_jobs_lock = Lock()  # réservation d'une place de job (ce processus)
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            os.makedirs(EXPORT_DIR, exist_ok=True)
+            # spawn : les workers n'héritent ni des threads ni des connexions BDD de l'API
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, EXPORT_WORKERS),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=os.nice if hasattr(os, "nice") else None,
+                initargs=(EXPORT_NICE,) if hasattr(os, "nice") else ()
+            )
+        return _pool
+
+
+def arreter():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+# -----------------------------
+# 📊 DONNÉES DES RAPPORTS
+# -----------------------------
+def _article_dict(a) -> Dict:
+    return {
+        "nom": a.nom,
+        "reference": a.reference,
+        "category": a.category,
+        "quantite": a.quantite,
+        "prix_unitaire": a.prix_unitaire,
+    }
+
+
+def _donnees_inventaire(articles) -> Dict:
+    return {
+        "articles": [_article_dict(a) for a in articles],
+        "stats": {
+            "total_articles": len(articles),
+            "stock_total": sum(a.quantite for a in articles),
+            "alertes_stock_faible": sum(1 for a in articles if a.quantite <= 10),
+            "categories": len(set(a.category for a in articles))
+        },
+    }
+
+
+def charger_donnees(db: Session, rapport: str, company_id: Optional[int], params: Dict) -> Dict:
+    """Snapshot picklable des données du rapport (404 si rien à exporter)"""
+    if rapport == "inventory":
+        articles = search_articles(
+            db, categorie=params.get("categorie"), min_stock=params.get("min_stock"),
+            limit=None, company_id=company_id
+        )
+        if not articles:
+            raise HTTPException(status_code=404, detail="Aucun article trouvé")
+        return _donnees_inventaire(articles)
+
+    if rapport == "custom":
+        articles = search_articles(
+            db, search=params.get("search"), categorie=params.get("categorie"),
+            min_stock=params.get("min_stock"), max_stock=params.get("max_stock"),
+            limit=None, company_id=company_id
+        )
+        if not articles:
+            raise HTTPException(status_code=404, detail="Aucun article correspondant aux critères")
+        return _donnees_inventaire(articles)
+
+    if rapport == "low-stock":
+        articles = get_low_stock_articles(db, params.get("threshold", 10), company_id=company_id)
+        if not articles:
+            raise HTTPException(status_code=404, detail="Aucun article en stock faible trouvé")
+        return {"articles": [_article_dict(a) for a in articles]}
+
+    if rapport == "categories":
+        stats = get_stats_by_category(db, company_id=company_id)
+        if not stats:
+            raise HTTPException(status_code=404, detail="Aucune statistique disponible")
+        return {"categories": [
+            {
+                "categorie": stat.categorie,
+                "nombre_articles": stat.nombre_articles,
+                "stock_total": stat.stock_total
+            }
+            for stat in stats
+        ]}
+
+    raise HTTPException(status_code=404, detail="Rapport inconnu")
+
+
+# -----------------------------
+# 🧾 JOBS
+# -----------------------------
+def _chemin(job_id: str) -> str:
+    return os.path.join(EXPORT_DIR, f"{job_id}.pdf")
+
+
+def _en_dict(job: ExportJob) -> Dict:
+    return {
+        "job_id": job.id,
+        "rapport": job.rapport,
+        "company_id": job.company_id,
+        "user_id": job.user_id,
+        "statut": job.statut,
+        "date_creation": job.date_creation,
+        "date_fin": job.date_fin,
+        "expire_le": job.expire_le,
+        "taille_octets": job.taille_octets,
+        "erreur": job.erreur,
+        "nom_fichier": job.nom_fichier,
+    }
+
+
+def _terminer(db: Session, job: ExportJob, taille: Optional[int] = None, erreur: Optional[str] = None):
+    maintenant = datetime.utcnow()
+    job.date_fin = maintenant
+    job.expire_le = maintenant + timedelta(seconds=EXPORT_TTL)
+    if erreur is None:
+        job.statut = "termine"
+        job.taille_octets = taille
+    else:
+        job.statut = "echec"
+        job.erreur = erreur[:500]
+
+
+def _fin_rendu(job_id: str, future):
+    """Callback du pool (thread interne de l'executor) : session propre"""
+    db = SessionLocal()
+    try:
+        job = db.get(ExportJob, job_id)
+        if job is None:
+            return
+        try:
+            _terminer(db, job, taille=future.result())
+        except Exception as e:
+            _terminer(db, job, erreur=str(e))
+            print(f"❌ Export {job_id} en échec: {e}")
+        db.commit()
+    finally:
+        db.close()
+
+
+def _reserver(db: Session, rapport: str, company_id: Optional[int], user_id: int) -> ExportJob:
+    """
+    Compte les jobs en cours de l'entreprise et insère le nouveau dans la même
+    section critique : _jobs_lock pour ce processus, verrou de la ligne
+    companies (PostgreSQL) pour les autres workers.
+    """
+    with _jobs_lock:
+        if company_id is not None:
+            db.query(Company.id).filter(Company.id == company_id).with_for_update().first()
+        actifs = (
+            db.query(ExportJob)
+            .filter(
+                ExportJob.company_id.is_(None) if company_id is None else ExportJob.company_id == company_id,
+                ExportJob.statut == "en_cours"
+            )
+            .count()
+        )
+        if actifs >= EXPORT_JOBS_PAR_ENTREPRISE:
+            db.rollback()
+            raise HTTPException(
+                status_code=429,
+                detail=f"Déjà {actifs} export(s) en cours pour votre entreprise, réessayez plus tard"
+            )
+        maintenant = datetime.utcnow()
+        job = ExportJob(
+            id=uuid.uuid4().hex,
+            rapport=rapport,
+            company_id=company_id,
+            user_id=user_id,
+            statut="en_cours",
+            date_creation=maintenant,
+            nom_fichier=f"{rapport}_{maintenant.strftime('%Y%m%d_%H%M%S')}.pdf",
+        )
+        db.add(job)
+        db.commit()
+        return job
+
+
+def soumettre(
+    db: Session,
+    rapport: str,
+    company_id: Optional[int],
+    user_id: int,
+    params: Dict
+) -> Dict:
+    purger_expires(db)
+    # Place réservée avant la lecture des données : pas de dépassement de la
+    # limite par des requêtes simultanées
+    job = _reserver(db, rapport, company_id, user_id)
+    try:
+        donnees = charger_donnees(db, rapport, company_id, params)
+    except Exception:
+        db.rollback()
+        db.delete(job)
+        db.commit()
+        raise
+    future = _get_pool().submit(render_report_to_file, rapport, donnees, _chemin(job.id))
+    future.add_done_callback(lambda f: _fin_rendu(job.id, f))
+    return _en_dict(job)
+
+
+def get_job(db: Session, job_id: str) -> Optional[Dict]:
+    purger_expires(db)
+    job = db.get(ExportJob, job_id)
+    return _en_dict(job) if job else None
+
+
+def chemin_fichier(job: Dict) -> str:
+    return _chemin(job["job_id"])
+
+
+def purger_expires(db: Session):
+    """
+    Supprime jobs et fichiers dont la rétention est dépassée ; passe en échec
+    les jobs en cours depuis plus de EXPORT_JOB_TIMEOUT (place libérée)
+    """
+    maintenant = datetime.utcnow()
+    perdus = (
+        db.query(ExportJob)
+        .filter(
+            ExportJob.statut == "en_cours",
+            ExportJob.date_creation <= maintenant - timedelta(seconds=EXPORT_JOB_TIMEOUT)
+        )
+        .all()
+    )
+    for job in perdus:
+        _terminer(db, job, erreur="Délai de rendu dépassé")
+    expires = [
+        job_id for (job_id,) in
+        db.query(ExportJob.id).filter(ExportJob.expire_le <= maintenant).all()
+    ]
+    if expires:
+        db.query(ExportJob).filter(ExportJob.id.in_(expires)).delete(synchronize_session=False)
+    if perdus or expires:
+        db.commit()
+    for job_id in expires:
+        try:
+            os.remove(_chemin(job_id))
+        except FileNotFoundError:
+            pass
+
+
+def nettoyer_dossier():
+    """
+    Au démarrage : fichiers expirés seulement (les autres workers servent
+    encore les leurs), y compris les .part de rendus interrompus
+    """
+    limite = time.time() - max(EXPORT_TTL, EXPORT_JOB_TIMEOUT)
+    supprimes = 0
+    for chemin in glob.glob(os.path.join(EXPORT_DIR, "*.pdf*")):
+        try:
+            if os.path.getmtime(chemin) < limite:
+                os.remove(chemin)
+                supprimes += 1
+        except OSError:
+            pass
+    if supprimes:
+        print(f"🧹 {supprimes} fichier(s) d'export expiré(s) supprimé(s)")
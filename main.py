@@ -1,24 +1,36 @@
 # main.py
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import (
+    FastAPI, Depends, HTTPException, Query, Request, Response, status,
+    File, Form, UploadFile
+)
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
-from datetime import datetime
+from typing import List, Literal, Optional
+from datetime import date, datetime, timedelta
 from auth import get_password_hash
 from models import User, RoleEnum, Company, CompanyStatusEnum
-from email_service import generate_temp_password, send_welcome_email
+from email_service import generate_temp_password
 import io
 from database import SessionLocal, engine, Base, get_db
-import models, schemas, crud, auth
+import models, schemas, crud, auth, exports, outbox, provisioning, report_cache, stock_stats, retrait_rollups, mouvements_stock, article_search, article_suggest, article_matcher, categories
 from crud_filters import (
     search_articles,
     get_low_stock_articles,
     get_stats_by_category,
-    get_recent_retraits
+    get_recent_retraits,
+    stats_inventaire,
+    iter_articles_export,
+    iter_retraits_export,
+    iter_chantiers_export,
+    COLONNES_ARTICLES,
+    COLONNES_RETRAITS,
+    COLONNES_CHANTIERS
 )
+from pagination import lister, PAGE_SIZE_DEFAULT, PAGE_SIZE_MAX, NEXT_CURSOR_HEADER
+from pdf_stream import stream_inventory_pdf
+from data_stream import stream_export, FORMATS
 from pdf_generator import (
     create_inventory_pdf,
     create_low_stock_alert_pdf,
@@ -27,6 +39,9 @@ from pdf_generator import (
 
 # Initialisation de la base de données
 Base.metadata.create_all(bind=engine)
+article_search.installer(engine)
+mouvements_stock.installer(engine)
+stock_stats.installer(engine)
 
 # Initialisation de l'application FastAPI
 app = FastAPI(
@@ -59,6 +74,52 @@ def create_default_superadmin():
     finally:
         db.close()
 
+# ============================================================
+# 📧 Worker d'envoi des emails (outbox)
+# ============================================================
+@app.on_event("startup")
+def start_email_outbox():
+    if outbox.OUTBOX_WORKER:
+        outbox.worker.demarrer()
+
+@app.on_event("shutdown")
+def stop_email_outbox():
+    outbox.worker.arreter()
+
+@app.on_event("startup")
+def clean_export_dir():
+    exports.nettoyer_dossier()
+
+@app.on_event("shutdown")
+def stop_export_pool():
+    exports.arreter()
+
+@app.on_event("startup")
+def start_retrait_rollups():
+    if retrait_rollups.ROLLUP_WORKER:
+        retrait_rollups.worker.demarrer()
+
+@app.on_event("shutdown")
+def stop_retrait_rollups():
+    retrait_rollups.worker.arreter()
+
+@app.on_event("startup")
+def start_stock_snapshots():
+    if mouvements_stock.SNAPSHOT_WORKER:
+        mouvements_stock.worker.demarrer()
+
+@app.on_event("shutdown")
+def stop_stock_snapshots():
+    mouvements_stock.worker.arreter()
+
+@app.on_event("startup")
+def start_report_cache():
+    report_cache.demarrer()
+
+@app.on_event("shutdown")
+def stop_report_cache():
+    report_cache.arreter()
+
 # Configuration CORS
 origins = [
     "http://localhost:3000",
@@ -72,6 +133,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # -----------------------------
@@ -87,7 +149,7 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
             detail="Identifiants invalides",
             headers={"WWW-Authenticate": "Bearer"}
         )
-    token = auth.create_access_token({"sub": user.username})
+    token = auth.create_user_token(user)
     return {
         "access_token": token,
         "token_type": "bearer",
@@ -101,7 +163,7 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
 def create_entreprise(
     entreprise: schemas.EntrepriseCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.require_superadmin)
+    current_user: auth.Principal = Depends(auth.require_superadmin)
 ):
     """Créer une nouvelle entreprise (Superadmin uniquement)"""
     try:
@@ -113,11 +175,19 @@ def create_entreprise(
 
 @app.get("/entreprises/", response_model=List[schemas.EntrepriseResponse])
 def list_entreprises(
+    response: Response,
+    statut: Optional[CompanyStatusEnum] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    tout: bool = False,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.require_superadmin)
+    current_user: auth.Principal = Depends(auth.require_superadmin)
 ):
-    """Lister toutes les entreprises (Superadmin uniquement)"""
-    return db.query(models.Company).all()
+    """Lister les entreprises (Superadmin uniquement), paginé par curseur"""
+    query = db.query(models.Company)
+    if statut:
+        query = query.filter(models.Company.status == statut)
+    return lister(query, response, [models.Company.id], limit, cursor, tout)
 
 # ===================== SUPERADMIN - GESTION ENTREPRISES =====================
 
@@ -125,17 +195,19 @@ def list_entreprises(
 def suspend_company(
     company_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(auth.require_superadmin)
+    _: auth.Principal = Depends(auth.require_superadmin)
 ):
     company = db.query(models.Company).get(company_id)
     if not company:
         raise HTTPException(404, "Entreprise introuvable")
     company.status = CompanyStatusEnum.SUSPENDED
     company.suspended_at = datetime.utcnow()
+    company.token_generation = (company.token_generation or 0) + 1  # révoque les sessions
     users = db.query(models.User).filter(models.User.company_id == company_id).all()
     for user in users:
         user.is_active = False
     db.commit()
+    auth.invalidate_token_cache(company_id=company_id)
     return {"message": "Entreprise suspendue"}
 
 
@@ -143,7 +215,7 @@ def suspend_company(
 def activate_company(
     company_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(auth.require_superadmin)
+    _: auth.Principal = Depends(auth.require_superadmin)
 ):
     company = db.query(models.Company).get(company_id)
     if not company:
@@ -155,6 +227,7 @@ def activate_company(
     for user in users:
         user.is_active = True
     db.commit()
+    auth.invalidate_token_cache(company_id=company_id)
     return {"message": "Entreprise réactivée"}
 
 
@@ -162,14 +235,16 @@ def activate_company(
 def terminate_company(
     company_id: int,
     db: Session = Depends(get_db),
-    _: models.User = Depends(auth.require_superadmin)
+    _: auth.Principal = Depends(auth.require_superadmin)
 ):
     company = db.query(models.Company).get(company_id)
     if not company:
         raise HTTPException(404, "Entreprise introuvable")
     company.status = CompanyStatusEnum.TERMINATED
     company.terminated_at = datetime.utcnow()
+    company.token_generation = (company.token_generation or 0) + 1  # révoque les sessions
     db.commit()
+    auth.invalidate_token_cache(company_id=company_id)
     return {"message": "Entreprise résiliée définitivement"}
 
 
@@ -180,7 +255,7 @@ def terminate_company(
 def create_user(
     user: schemas.UserCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.require_admin_or_super)
+    current_user: auth.Principal = Depends(auth.require_admin_or_super)
 ):
     """Créer un nouvel utilisateur (Admin/Superadmin)"""
     existing_user = crud.get_user_by_username(db, user.username)
@@ -200,49 +275,40 @@ def create_user(
     return new_user
 
 @app.get("/users/me")
-async def get_current_user_route(
-    token: str = Depends(auth.oauth2_scheme),
-    db: Session = Depends(get_db)
+def get_current_user_route(
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """Retourner l'utilisateur actuellement authentifié"""
-    try:
-        from jose import jwt, JWTError
-        payload = jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Token invalide")
-        user = db.query(models.User).filter(models.User.username == username).first()
-        if not user:
-            raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
-        return {
-            "id": user.id,
-            "username": user.username,
-            "role": user.role.value if hasattr(user.role, 'value') else str(user.role),
-            "company_id": user.company_id,
-            "company_name": user.company.name if user.company else None,
-            "first_login": user.first_login
-        }
-    except JWTError:
-        raise HTTPException(
-            status_code=401,
-            detail="Token invalide ou expiré",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    except Exception as e:
-        raise HTTPException(status_code=401, detail=str(e))
+    user = db.get(models.User, current_user.id)
+    if not user:
+        raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
+    return {
+        "id": user.id,
+        "username": user.username,
+        "role": user.role.value if hasattr(user.role, 'value') else str(user.role),
+        "company_id": user.company_id,
+        "company_name": user.company.name if user.company else None,
+        "first_login": user.first_login
+    }
 
 @app.get("/users/", response_model=List[schemas.UserResponse])
 def get_users(
+    response: Response,
+    role: Optional[RoleEnum] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    tout: bool = False,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.require_admin_or_super)
+    current_user: auth.Principal = Depends(auth.require_admin_or_super)
 ):
-    """Lister les utilisateurs"""
-    if current_user.role == models.RoleEnum.SUPERADMIN:
-        return db.query(models.User).all()
-    else:
-        return db.query(models.User).filter(
-            models.User.company_id == current_user.company_id
-        ).all()
+    """Lister les utilisateurs, paginé par curseur"""
+    query = db.query(models.User)
+    if current_user.role != models.RoleEnum.SUPERADMIN:
+        query = query.filter(models.User.company_id == current_user.company_id)
+    if role:
+        query = query.filter(models.User.role == role)
+    return lister(query, response, [models.User.id], limit, cursor, tout)
 
 # -----------------------------
 # 📦 ARTICLES
@@ -251,30 +317,38 @@ def get_users(
 def create_article(
     article: schemas.ArticleCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """Créer un nouvel article"""
     if not article.company_id and current_user.company_id:
         article.company_id = current_user.company_id
+    mouvements_stock.contexte(db, models.SourceMouvementEnum.CREATION, user_id=current_user.id)
     return crud.create_article(db, article)
 
 @app.get("/articles/", response_model=List[schemas.ArticleResponse])
 def list_articles(
+    response: Response,
+    categorie: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    tout: bool = False,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
-    """Lister les articles"""
-    if current_user.role == models.RoleEnum.SUPERADMIN:
-        return crud.get_articles_for_entreprise(db, None)
-    else:
-        return crud.get_articles_for_entreprise(db, current_user.company_id)
+    """Lister les articles, paginé par curseur"""
+    query = db.query(models.Article)
+    if current_user.role != models.RoleEnum.SUPERADMIN:
+        query = query.filter(models.Article.company_id == current_user.company_id)
+    if categorie:
+        query = query.filter(models.Article.category == categorie)
+    return lister(query, response, [models.Article.id], limit, cursor, tout)
 
 @app.put("/articles/{article_id}", response_model=schemas.ArticleResponse)
 def update_article(
     article_id: int,
     article_update: schemas.ArticleUpdate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """Mettre à jour la quantité d'un article"""
     article = db.query(models.Article).filter(models.Article.id == article_id).first()
@@ -283,13 +357,14 @@ def update_article(
     if current_user.role != models.RoleEnum.SUPERADMIN:
         if article.company_id != current_user.company_id:
             raise HTTPException(status_code=403, detail="Accès refusé")
+    mouvements_stock.contexte(db, models.SourceMouvementEnum.MODIFICATION, user_id=current_user.id)
     return crud.update_article_quantite_by_id(db, article_id, article_update.quantite)
 
 @app.delete("/articles/{article_id}")
 def delete_article(
     article_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.require_admin_or_super)
+    current_user: auth.Principal = Depends(auth.require_admin_or_super)
 ):
     """Supprimer un article"""
     article = db.query(models.Article).filter(models.Article.id == article_id).first()
@@ -298,12 +373,102 @@ def delete_article(
     if current_user.role != models.RoleEnum.SUPERADMIN:
         if article.company_id != current_user.company_id:
             raise HTTPException(status_code=403, detail="Accès refusé")
+    mouvements_stock.contexte(db, models.SourceMouvementEnum.SUPPRESSION, user_id=current_user.id)
     return crud.delete_article_by_id(db, article_id)
 
+@app.get("/articles/search", response_model=List[schemas.ArticleResponse])
+def search_articles_route(
+    q: str = Query(..., min_length=1),
+    categorie: Optional[str] = None,
+    min_stock: Optional[int] = None,
+    max_stock: Optional[int] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """
+    Recherche d'articles (nom, référence, catégorie) par l'index de recherche,
+    plus pertinents d'abord. Chaque mot doit apparaître ; pagination skip/limit.
+    """
+    company_id = None if current_user.role == models.RoleEnum.SUPERADMIN else current_user.company_id
+    return search_articles(
+        db, search=q, categorie=categorie, min_stock=min_stock, max_stock=max_stock,
+        skip=skip, limit=limit, company_id=company_id
+    )
+
+@app.get("/articles/suggest", response_model=list[str])
+def suggest_article_names(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Autocomplétion des noms d'articles (index en mémoire, sans requête une fois construit)"""
+    if current_user.company_id is None:
+        return []
+    return article_suggest.suggerer(db, current_user.company_id, q, limit)
+
+@app.get("/articles/resolve", response_model=schemas.ResolutionArticle)
+def resolve_article_name(
+    nom: str = Query(..., min_length=1),
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Article correspondant à un nom saisi librement, ou candidats classés"""
+    resolution = article_matcher.resoudre(db, current_user.company_id, nom)
+    return schemas.ResolutionArticle(
+        article_id=resolution.article_id,
+        nom=resolution.nom,
+        candidats=[
+            schemas.CandidatArticle(article_id=aid, nom=n, score=score)
+            for aid, n, score in resolution.candidats
+        ]
+    )
+
+@app.post("/articles/categoriser", response_model=schemas.ClassementNomsResponse)
+def categorize_article_names(
+    requete: schemas.ClassementNomsRequest,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Catégorie détectée pour chaque nom (synonymes de l'entreprise puis intégrés)"""
+    return schemas.ClassementNomsResponse(
+        categories=categories.classer_noms(db, current_user.company_id, requete.noms)
+    )
+
+@app.get("/categories/synonymes", response_model=List[schemas.CategorieSynonymeRead])
+def list_category_synonyms(
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.require_admin_or_super)
+):
+    """Mots-clés de catégorie propres à l'entreprise (prioritaires sur les intégrés)"""
+    return crud.get_synonymes_categorie(db, current_user.company_id)
+
+@app.post("/categories/synonymes", response_model=schemas.CategorieSynonymeRead)
+def create_category_synonym(
+    synonyme: schemas.CategorieSynonymeCreate,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.require_admin_or_super)
+):
+    """Ajouter un mot-clé de catégorie (articles créés ensuite)"""
+    if not current_user.company_id:
+        raise HTTPException(status_code=400, detail="Aucune entreprise associée")
+    return crud.create_synonyme_categorie(db, current_user.company_id, synonyme)
+
+@app.delete("/categories/synonymes/{synonyme_id}")
+def delete_category_synonym(
+    synonyme_id: int,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.require_admin_or_super)
+):
+    """Supprimer un mot-clé de catégorie"""
+    return crud.delete_synonyme_categorie(db, current_user.company_id, synonyme_id)
+
 @app.get("/articles/noms", response_model=list[str])
 def get_article_names(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     articles = db.query(models.Article.nom).filter(
         models.Article.company_id == current_user.company_id
@@ -317,34 +482,85 @@ def get_article_names(
 def retirer_article(
     retrait: schemas.RetraitRequest,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     article = db.query(models.Article).filter(
         models.Article.nom == retrait.nom_article,
         models.Article.company_id == current_user.company_id
     ).first()
-    if not article:
-        raise HTTPException(status_code=404, detail="Article introuvable")
+    article_id = article.id if article else None
+    if article_id is None:
+        # Nom approchant ("poteau 2 m") : accepté seulement si la correspondance est sûre
+        resolution = article_matcher.resoudre(db, current_user.company_id, retrait.nom_article)
+        if resolution.article_id is None:
+            detail = "Article introuvable"
+            if resolution.candidats:
+                detail += " — vouliez-vous dire : " + ", ".join(c[1] for c in resolution.candidats) + " ?"
+            raise HTTPException(status_code=404, detail=detail)
+        article_id = resolution.article_id
     return crud.retirer_article_by_id(
         db=db,
-        article_id=article.id,
+        article_id=article_id,
         quantite=retrait.quantite,
         company_id=current_user.company_id,
         user_id=current_user.id
     )
 
+@app.post("/retraits/batch", response_model=schemas.RetraitBatchResponse)
+def retirer_articles_batch(
+    batch: schemas.RetraitBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Retirer plusieurs articles en une seule transaction"""
+    resultats, tout_est_ok = crud.retirer_articles_batch(
+        db=db,
+        lignes=batch.lignes,
+        company_id=current_user.company_id,
+        user_id=current_user.id,
+        tout_ou_rien=batch.tout_ou_rien
+    )
+    if batch.tout_ou_rien and not tout_est_ok:
+        raise HTTPException(
+            status_code=409,
+            detail=[r.model_dump() for r in resultats if r.statut != "ok"]
+        )
+    nb_ok = sum(1 for r in resultats if r.statut == "ok")
+    return schemas.RetraitBatchResponse(
+        message=f"{nb_ok}/{len(resultats)} ligne(s) retirée(s)",
+        lignes=resultats,
+        poids_total=sum(r.poids_total for r in resultats)
+    )
+
 @app.get("/retraits/", response_model=List[schemas.RetraitRead])
 def list_retraits(
+    response: Response,
+    article_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    date_debut: Optional[datetime] = None,
+    date_fin: Optional[datetime] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    tout: bool = False,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
-    """Lister l'historique des retraits"""
-    if current_user.role == models.RoleEnum.SUPERADMIN:
-        return db.query(models.Retrait).all()
-    else:
-        return db.query(models.Retrait).filter(
-            models.Retrait.company_id == current_user.company_id
-        ).all()
+    """Lister l'historique des retraits (plus récents d'abord), paginé par curseur"""
+    query = db.query(models.Retrait)
+    if current_user.role != models.RoleEnum.SUPERADMIN:
+        query = query.filter(models.Retrait.company_id == current_user.company_id)
+    if article_id is not None:
+        query = query.filter(models.Retrait.article_id == article_id)
+    if user_id is not None:
+        query = query.filter(models.Retrait.user_id == user_id)
+    if date_debut:
+        query = query.filter(models.Retrait.date_retrait >= date_debut)
+    if date_fin:
+        query = query.filter(models.Retrait.date_retrait < date_fin)
+    return lister(
+        query, response, [models.Retrait.date_retrait, models.Retrait.id],
+        limit, cursor, tout, descendant=True
+    )
 
 # -----------------------------
 # 🧮 CALCUL ÉCHAFAUDAGE
@@ -353,7 +569,7 @@ def list_retraits(
 def calculer_echafaudage(
     calcul: schemas.CalculRequest,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     company_id = calcul.company_id or current_user.company_id
 
@@ -387,8 +603,12 @@ def calculer_echafaudage(
             db=db,
             pieces_result=pieces_normalisees,
             company_id=company_id,
-            user_id=current_user.id
+            user_id=current_user.id,
+            tout_ou_rien=calcul.reservation_atomique
         )
+        if erreurs_stock and calcul.reservation_atomique:
+            # Rien n'a été sorti du stock : pas de chantier enregistré
+            raise HTTPException(status_code=409, detail=erreurs_stock)
         if erreurs_stock:
             ajustements.extend(erreurs_stock)
 
@@ -417,21 +637,59 @@ def calculer_echafaudage(
         ajustements=ajustements
     )
 
+@app.post("/calcul/batch", response_model=schemas.CalculBatchResponse)
+def calculer_echafaudage_batch(
+    batch: schemas.CalculBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Chiffrer N façades en une passe (sans chantier ni sortie de stock)"""
+    if any(f.apply_to_stock for f in batch.facades):
+        raise HTTPException(
+            status_code=400,
+            detail="apply_to_stock n'est pas supporté en batch, utilisez /calcul/"
+        )
+    company_id = batch.company_id or current_user.company_id
+    resultats, pieces, meta, ajustements = crud.allocate_echafaudage_batch(
+        db=db,
+        facades=batch.facades,
+        company_id=company_id
+    )
+    # Dict brut : validé une seule fois par response_model
+    return {
+        "facades": resultats,
+        "pieces": pieces,
+        "poids_total": meta["poids_total"],
+        "meta": meta,
+        "ajustements": ajustements
+    }
+
 @app.get("/chantiers/", response_model=List[schemas.ChantierResponse])
 def get_chantiers(
+    response: Response,
+    nom_chantier: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    tout: bool = False,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
-    chantiers = db.query(models.Chantier).filter(
+    """Historique des chantiers (plus récents d'abord), paginé par curseur"""
+    query = db.query(models.Chantier).filter(
         models.Chantier.company_id == current_user.company_id
-    ).order_by(models.Chantier.date_creation.desc()).all()
-    return chantiers
+    )
+    if nom_chantier:
+        query = query.filter(models.Chantier.nom_chantier.ilike(f"%{nom_chantier}%"))
+    return lister(
+        query, response, [models.Chantier.date_creation, models.Chantier.id],
+        limit, cursor, tout, descendant=True
+    )
 
 @app.delete("/chantiers/{chantier_id}")
 def delete_chantier(
     chantier_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     chantier = db.query(models.Chantier).filter(
         models.Chantier.id == chantier_id,
@@ -447,58 +705,77 @@ def delete_chantier(
 # 📊 STATISTIQUES
 # -----------------------------
 @app.get("/stats/stock")
-def get_stock_stats(db: Session = Depends(get_db)):
-    """Statistiques globales du stock"""
-    total_articles = db.query(models.Article).count()
-    stock_total = db.query(func.sum(models.Article.quantite)).scalar() or 0
-    alertes = db.query(models.Article).filter(models.Article.quantite <= 10).count()
-    return {
-        "total_articles": total_articles,
-        "stock_total": stock_total,
-        "alertes_stock_faible": alertes,
-        # ✅ CORRIGÉ : category (pas categorie)
-        "categories": db.query(models.Article.category).distinct().count()
-    }
+def get_stock_stats(
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Statistiques du stock de l'entreprise (ligne précalculée, voir stock_stats.py)"""
+    return stock_stats.lire_stats(db, current_user.company_id)
 
 @app.get("/stats/categories")
-def get_category_stats(db: Session = Depends(get_db)):
-    """Statistiques par catégorie"""
-    stats = get_stats_by_category(db)
-    return [
-        {
-            "categorie": stat.categorie,  # alias défini dans crud_filters.py
-            "nombre_articles": stat.nombre_articles,
-            "stock_total": stat.stock_total
-        }
-        for stat in stats
-    ]
+def get_category_stats(
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Statistiques par catégorie de l'entreprise (précalculées)"""
+    return stock_stats.lire_stats_categories(db, current_user.company_id)
 
 @app.get("/stats/retraits/recent")
 def get_recent_withdrawals(
     days: int = 7,
     limit: int = 50,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
-    """Derniers retraits effectués"""
-    return get_recent_retraits(db, days, limit)
+    """Derniers retraits effectués (entreprise de l'utilisateur)"""
+    return get_recent_retraits(db, days, limit, company_id=current_user.company_id)
 
 @app.get("/stats/retraits/by-user")
-def get_withdrawal_stats_by_user(db: Session = Depends(get_db)):
-    """Statistiques de retraits par utilisateur"""
-    stats = db.query(
-        models.Retrait.nom_utilisateur,
-        func.count(models.Retrait.id).label('nombre_retraits'),
-        func.sum(models.Retrait.quantite).label('total_retire')
-    ).group_by(models.Retrait.nom_utilisateur).all()
+def get_withdrawal_stats_by_user(
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Statistiques de retraits par utilisateur (rollups journaliers + journée en cours)"""
+    stats = retrait_rollups.consommation(
+        db, current_user.company_id, date_debut, date_fin, periode="total", par="utilisateur"
+    )
     return [
         {
-            "utilisateur": stat.nom_utilisateur,
-            "nombre_retraits": stat.nombre_retraits,
-            "total_retire": stat.total_retire
+            "user_id": stat["user_id"],
+            "utilisateur": stat["utilisateur"],
+            "nombre_retraits": stat["nombre_retraits"],
+            "total_retire": stat["quantite_totale"]
         }
         for stat in stats
     ]
 
+@app.get("/stats/retraits/consommation")
+def get_withdrawal_consumption(
+    date_debut: Optional[date] = None,
+    date_fin: Optional[date] = None,
+    periode: Literal["jour", "semaine", "mois", "total"] = "jour",
+    par: Literal["aucun", "article", "utilisateur"] = "aucun",
+    article_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """
+    Consommation (nombre de retraits, quantité, poids) par jour / semaine
+    (lundi) / mois, sur [date_debut, date_fin] en jours UTC inclus.
+    Défaut : les 30 derniers jours.
+    """
+    date_fin = date_fin or datetime.utcnow().date()
+    date_debut = date_debut or date_fin - timedelta(days=29)
+    if date_debut > date_fin:
+        raise HTTPException(status_code=400, detail="date_debut doit précéder date_fin")
+    return retrait_rollups.consommation(
+        db, current_user.company_id, date_debut, date_fin,
+        periode=periode, par=par, article_id=article_id, user_id=user_id
+    )
+
 # -----------------------------
 # 🔧 AJUSTEMENTS STOCK
 # -----------------------------
@@ -518,6 +795,7 @@ def adjust_stock(
         raise HTTPException(status_code=400, detail="Stock insuffisant")
     ancienne_quantite = article.quantite
     article.quantite = nouvelle_quantite
+    mouvements_stock.contexte(db, models.SourceMouvementEnum.AJUSTEMENT, raison=raison)
     db.commit()
     return {
         "message": "Stock ajusté avec succès",
@@ -527,6 +805,95 @@ def adjust_stock(
         "raison": raison
     }
 
+# -----------------------------
+# 📜 MOUVEMENTS DE STOCK
+# -----------------------------
+def _entreprise_mouvements(db: Session, article_id: int, current_user: auth.Principal) -> Optional[int]:
+    """Entreprise dont on lit le journal : celle de l'utilisateur, ou de l'article pour le superadmin"""
+    if current_user.role != models.RoleEnum.SUPERADMIN:
+        return current_user.company_id
+    article = crud.get_article(db, article_id)
+    if article is not None:
+        return article.company_id
+    return db.query(models.MouvementStock.company_id).filter(
+        models.MouvementStock.article_id == article_id
+    ).order_by(models.MouvementStock.id.desc()).limit(1).scalar()
+
+@app.get("/articles/as-of", response_model=List[schemas.ArticleStockAu])
+def get_stock_as_of(
+    date: datetime,
+    company_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """
+    Stock de l'entreprise à une date (UTC) : quantité de chaque article
+    existant à cette date, reconstruite depuis le snapshot le plus proche.
+    company_id : superadmin uniquement.
+    """
+    if current_user.role != models.RoleEnum.SUPERADMIN:
+        company_id = current_user.company_id
+    if company_id is None:
+        raise HTTPException(status_code=400, detail="company_id requis")
+    quantites = mouvements_stock.quantites_au(db, company_id, date)
+    articles = {
+        a.id: a for a in db.query(
+            models.Article.id, models.Article.reference, models.Article.nom, models.Article.category
+        ).filter(models.Article.id.in_(list(quantites)))
+    } if quantites else {}
+    return [
+        schemas.ArticleStockAu(
+            article_id=article_id,
+            reference=articles[article_id].reference if article_id in articles else None,
+            nom=articles[article_id].nom if article_id in articles else None,
+            category=articles[article_id].category if article_id in articles else None,
+            quantite=quantite
+        )
+        for article_id, quantite in sorted(quantites.items())
+    ]
+
+@app.get("/articles/{article_id}/mouvements", response_model=List[schemas.MouvementStockRead])
+def list_stock_movements(
+    article_id: int,
+    response: Response,
+    source: Optional[models.SourceMouvementEnum] = None,
+    date_debut: Optional[datetime] = None,
+    date_fin: Optional[datetime] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    tout: bool = False,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Journal des mouvements de stock d'un article (plus récents d'abord), paginé par curseur"""
+    M = models.MouvementStock
+    query = db.query(M).filter(
+        M.article_id == article_id,
+        M.company_id == _entreprise_mouvements(db, article_id, current_user)
+    )
+    if source is not None:
+        query = query.filter(M.source == source)
+    if date_debut:
+        query = query.filter(M.date_mouvement >= date_debut)
+    if date_fin:
+        query = query.filter(M.date_mouvement < date_fin)
+    return lister(query, response, [M.date_mouvement, M.id], limit, cursor, tout, descendant=True)
+
+@app.get("/articles/{article_id}/stock-au")
+def get_article_stock_at(
+    article_id: int,
+    date: datetime,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Quantité d'un article à une date (UTC) : dernier mouvement ou snapshot avant cette date"""
+    quantite = mouvements_stock.quantite_article_au(
+        db, article_id, _entreprise_mouvements(db, article_id, current_user), date
+    )
+    if quantite is None:
+        raise HTTPException(status_code=404, detail="Article inexistant à cette date")
+    return {"article_id": article_id, "date": date, "quantite": quantite}
+
 # -----------------------------
 # 📄 EXPORT PDF
 # -----------------------------
@@ -554,38 +921,81 @@ def export_inventory_pdf(
         headers={"Content-Disposition": f"attachment; filename=inventaire_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"}
     )
 
-@app.get("/export/low-stock/pdf")
-def export_low_stock_pdf(threshold: int = 10, db: Session = Depends(get_db)):
-    """Exporte un rapport d'alerte pour les articles en stock faible"""
-    articles = get_low_stock_articles(db, threshold)
-    if not articles:
-        raise HTTPException(status_code=404, detail="Aucun article en stock faible trouvé")
-    pdf_content = create_low_stock_alert_pdf(articles)
+@app.get("/export/inventory/pdf/stream")
+def export_inventory_pdf_stream(
+    categorie: Optional[str] = None,
+    min_stock: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """
+    Inventaire complet de l'entreprise en PDF, envoyé page par page
+    (sans limite d'articles, mémoire constante)
+    """
+    filtres = {"categorie": categorie, "min_stock": min_stock, "company_id": current_user.company_id}
+    stats = stats_inventaire(db, **filtres)
+    if not stats["total_articles"]:
+        raise HTTPException(status_code=404, detail="Aucun article trouvé")
+
+    def contenu():
+        # Session propre au flux : celle de la dépendance est fermée avant l'envoi du corps
+        db_flux = SessionLocal()
+        try:
+            yield from stream_inventory_pdf(iter_articles_export(db_flux, **filtres), stats)
+        finally:
+            db_flux.close()
+
     return StreamingResponse(
-        io.BytesIO(pdf_content),
+        contenu(),
         media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=alerte_stock_{datetime.now().strftime('%Y%m%d')}.pdf"}
+        headers={"Content-Disposition": f"attachment; filename=inventaire_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"}
+    )
+
+@app.get("/export/low-stock/pdf")
+def export_low_stock_pdf(
+    request: Request,
+    threshold: int = 10,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Exporte un rapport d'alerte pour les articles en stock faible (mis en cache, ETag)"""
+    def rendre():
+        articles = get_low_stock_articles(db, threshold, company_id=current_user.company_id)
+        if not articles:
+            raise HTTPException(status_code=404, detail="Aucun article en stock faible trouvé")
+        return create_low_stock_alert_pdf(articles)
+
+    return report_cache.reponse_pdf(
+        request, db, "low-stock", {"threshold": threshold}, rendre,
+        nom_fichier=f"alerte_stock_{datetime.now().strftime('%Y%m%d')}.pdf",
+        company_id=current_user.company_id
     )
 
 @app.get("/export/categories/pdf")
-def export_categories_pdf(db: Session = Depends(get_db)):
-    """Exporte un rapport des statistiques par catégorie en PDF"""
-    stats = get_stats_by_category(db)
-    if not stats:
-        raise HTTPException(status_code=404, detail="Aucune statistique disponible")
-    categories_data = [
-        {
-            "categorie": stat.categorie,
-            "nombre_articles": stat.nombre_articles,
-            "stock_total": stat.stock_total
-        }
-        for stat in stats
-    ]
-    pdf_content = create_category_report_pdf(categories_data)
-    return StreamingResponse(
-        io.BytesIO(pdf_content),
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename=rapport_categories_{datetime.now().strftime('%Y%m%d')}.pdf"}
+def export_categories_pdf(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Exporte un rapport des statistiques par catégorie en PDF (mis en cache, ETag)"""
+    def rendre():
+        stats = get_stats_by_category(db, company_id=current_user.company_id)
+        if not stats:
+            raise HTTPException(status_code=404, detail="Aucune statistique disponible")
+        categories_data = [
+            {
+                "categorie": stat.categorie,
+                "nombre_articles": stat.nombre_articles,
+                "stock_total": stat.stock_total
+            }
+            for stat in stats
+        ]
+        return create_category_report_pdf(categories_data)
+
+    return report_cache.reponse_pdf(
+        request, db, "categories", {}, rendre,
+        nom_fichier=f"rapport_categories_{datetime.now().strftime('%Y%m%d')}.pdf",
+        company_id=current_user.company_id
     )
 
 @app.get("/export/custom/pdf")
@@ -614,13 +1024,178 @@ def export_custom_pdf(
         headers={"Content-Disposition": f"attachment; filename=rapport_personnalise_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"}
     )
 
+# -----------------------------
+# 📦 EXPORT CSV / NDJSON (ERP)
+# -----------------------------
+# Lignes lues par curseur serveur et envoyées au fil de l'eau (chunked) :
+# mémoire constante même pour des millions de retraits. ?gzip=true compresse.
+def _reponse_export(nom: str, format: str, gzip: bool, champs, iterer, **filtres):
+    def contenu():
+        # Session propre au flux : celle de la dépendance est fermée avant l'envoi du corps
+        db_flux = SessionLocal()
+        try:
+            yield from stream_export(
+                format, [c.key for c in champs], iterer(db_flux, **filtres), gzip=gzip
+            )
+        finally:
+            db_flux.close()
+
+    nom_fichier = f"{nom}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    if gzip:
+        nom_fichier += ".gz"
+    return StreamingResponse(
+        contenu(),
+        media_type="application/gzip" if gzip else FORMATS[format],
+        headers={"Content-Disposition": f"attachment; filename={nom_fichier}"}
+    )
+
+@app.get("/export/articles.{format}")
+def export_articles_data(
+    format: Literal["csv", "ndjson"],
+    search: Optional[str] = None,
+    categorie: Optional[str] = None,
+    min_stock: Optional[int] = None,
+    max_stock: Optional[int] = None,
+    gzip: bool = False,
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Articles de l'entreprise (mêmes filtres que search_articles / export custom)"""
+    return _reponse_export(
+        "articles", format, gzip, COLONNES_ARTICLES, iter_articles_export,
+        colonnes=COLONNES_ARTICLES, search=search, categorie=categorie,
+        min_stock=min_stock, max_stock=max_stock, company_id=current_user.company_id
+    )
+
+@app.get("/export/retraits.{format}")
+def export_retraits_data(
+    format: Literal["csv", "ndjson"],
+    article_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    date_debut: Optional[datetime] = None,
+    date_fin: Optional[datetime] = None,
+    gzip: bool = False,
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Historique des retraits (plus anciens d'abord), filtres de /retraits/"""
+    company_id = None if current_user.role == models.RoleEnum.SUPERADMIN else current_user.company_id
+    return _reponse_export(
+        "retraits", format, gzip, COLONNES_RETRAITS, iter_retraits_export,
+        company_id=company_id, article_id=article_id, user_id=user_id,
+        date_debut=date_debut, date_fin=date_fin
+    )
+
+@app.get("/export/chantiers.{format}")
+def export_chantiers_data(
+    format: Literal["csv", "ndjson"],
+    nom_chantier: Optional[str] = None,
+    date_debut: Optional[datetime] = None,
+    date_fin: Optional[datetime] = None,
+    gzip: bool = False,
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Chantiers de l'entreprise (plus anciens d'abord)"""
+    return _reponse_export(
+        "chantiers", format, gzip, COLONNES_CHANTIERS, iter_chantiers_export,
+        company_id=current_user.company_id, nom_chantier=nom_chantier,
+        date_debut=date_debut, date_fin=date_fin
+    )
+
+# -----------------------------
+# 📄 EXPORT PDF ASYNCHRONE (jobs)
+# -----------------------------
+# POST = mêmes rapports que les GET ci-dessus, filtrés sur l'entreprise de
+# l'utilisateur, rendus dans un processus séparé. Réponse immédiate (202).
+def _job_response(job: dict) -> dict:
+    return {
+        **job,
+        "download_url": f"/export/jobs/{job['job_id']}/download" if job["statut"] == "termine" else None
+    }
+
+def _lancer_export(db: Session, rapport: str, current_user: auth.Principal, params: dict) -> dict:
+    job = exports.soumettre(db, rapport, current_user.company_id, current_user.id, params)
+    return _job_response(job)
+
+@app.post("/export/inventory/pdf", response_model=schemas.ExportJob, status_code=202)
+def export_inventory_pdf_job(
+    categorie: Optional[str] = None,
+    min_stock: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Lance l'export PDF de l'inventaire complet (job asynchrone)"""
+    return _lancer_export(db, "inventory", current_user, {"categorie": categorie, "min_stock": min_stock})
+
+@app.post("/export/low-stock/pdf", response_model=schemas.ExportJob, status_code=202)
+def export_low_stock_pdf_job(
+    threshold: int = 10,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Lance l'export PDF des articles en stock faible (job asynchrone)"""
+    return _lancer_export(db, "low-stock", current_user, {"threshold": threshold})
+
+@app.post("/export/categories/pdf", response_model=schemas.ExportJob, status_code=202)
+def export_categories_pdf_job(
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Lance l'export PDF des statistiques par catégorie (job asynchrone)"""
+    return _lancer_export(db, "categories", current_user, {})
+
+@app.post("/export/custom/pdf", response_model=schemas.ExportJob, status_code=202)
+def export_custom_pdf_job(
+    search: Optional[str] = None,
+    categorie: Optional[str] = None,
+    min_stock: Optional[int] = None,
+    max_stock: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Lance un export PDF personnalisé (job asynchrone)"""
+    params = {"search": search, "categorie": categorie, "min_stock": min_stock, "max_stock": max_stock}
+    return _lancer_export(db, "custom", current_user, params)
+
+def _get_export_job(db: Session, job_id: str, current_user: auth.Principal) -> dict:
+    job = exports.get_job(db, job_id)
+    # Même réponse pour un job inconnu ou d'une autre entreprise
+    if not job or (
+        current_user.role != models.RoleEnum.SUPERADMIN and job["company_id"] != current_user.company_id
+    ):
+        raise HTTPException(status_code=404, detail="Export introuvable ou expiré")
+    return job
+
+@app.get("/export/jobs/{job_id}", response_model=schemas.ExportJob)
+def get_export_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Statut d'un export : en_cours, termine (download_url) ou echec"""
+    return _job_response(_get_export_job(db, job_id, current_user))
+
+@app.get("/export/jobs/{job_id}/download")
+def download_export_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.get_current_user)
+):
+    """Télécharge le PDF d'un export terminé"""
+    job = _get_export_job(db, job_id, current_user)
+    if job["statut"] != "termine":
+        raise HTTPException(status_code=409, detail=f"Export non disponible (statut : {job['statut']})")
+    return FileResponse(
+        exports.chemin_fichier(job),
+        media_type="application/pdf",
+        filename=job["nom_fichier"]
+    )
+
 # ======================= GESTION ADMINS/USERS =======================
 
 @app.post("/admin/create-admin")
-async def create_admin_for_company(
+def create_admin_for_company(
     admin_data: schemas.AdminCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.require_superadmin)
+    current_user: auth.Principal = Depends(auth.require_superadmin)
 ):
     """Créer un admin pour une entreprise (SUPERADMIN uniquement)"""
     existing_user = crud.get_user_by_username(db, admin_data.username)
@@ -641,34 +1216,32 @@ async def create_admin_for_company(
         password_reset_required=False
     )
     db.add(new_admin)
+    # Email écrit dans la même transaction : envoyé par le worker outbox
+    outbox.enqueue_welcome_email(
+        db,
+        username=admin_data.username,
+        email=admin_data.email,
+        temp_password=temp_password,
+        role="admin",
+        company_name=company.name
+    )
     db.commit()
     db.refresh(new_admin)
-    try:
-        send_welcome_email(
-            username=admin_data.username,
-            email=admin_data.email,
-            temp_password=temp_password,
-            role="admin",
-            company_name=company.name
-        )
-        email_sent = True
-    except Exception as e:
-        print(f"⚠️ Erreur envoi email : {e}")
-        email_sent = False
+    outbox.worker.reveiller()
     return {
         "message": "Admin créé avec succès",
         "username": new_admin.username,
         "email": admin_data.email,
         "company": company.name,
-        "email_sent": email_sent,
+        "email_queued": True,
         "first_login_required": True
     }
 
 @app.post("/admin/create-user")
-async def create_user_for_company(
+def create_user_for_company(
     user_data: schemas.UserCreateByAdmin,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.require_admin_or_super)
+    current_user: auth.Principal = Depends(auth.require_admin_or_super)
 ):
     """Créer un user pour son entreprise (ADMIN uniquement)"""
     if current_user.role == models.RoleEnum.ADMIN:
@@ -692,54 +1265,106 @@ async def create_user_for_company(
         password_reset_required=False
     )
     db.add(new_user)
+    # Email écrit dans la même transaction : envoyé par le worker outbox
+    outbox.enqueue_welcome_email(
+        db,
+        username=user_data.username,
+        email=user_data.email,
+        temp_password=temp_password,
+        role="user",
+        company_name=company.name
+    )
     db.commit()
     db.refresh(new_user)
-    try:
-        send_welcome_email(
-            username=user_data.username,
-            email=user_data.email,
-            temp_password=temp_password,
-            role="user",
-            company_name=company.name
-        )
-        email_sent = True
-    except Exception as e:
-        print(f"⚠️ Erreur envoi email : {e}")
-        email_sent = False
+    outbox.worker.reveiller()
     # ✅ CORRIGÉ : temp_password retiré de la réponse (sécurité)
     return {
         "message": "Utilisateur créé avec succès",
         "username": new_user.username,
         "email": user_data.email,
         "company": company.name,
-        "email_sent": email_sent,
+        "email_queued": True,
         "first_login_required": True
     }
 
+def _lancer_provisioning(
+    db: Session,
+    company_id: int,
+    lignes: List[dict],
+    current_user: auth.Principal
+):
+    if current_user.role == models.RoleEnum.ADMIN and company_id != current_user.company_id:
+        raise HTTPException(status_code=403, detail="Vous ne pouvez créer des utilisateurs que pour votre entreprise")
+    if not lignes:
+        raise HTTPException(status_code=400, detail="Aucun utilisateur à créer")
+    if len(lignes) > schemas.BULK_USERS_MAX:
+        raise HTTPException(status_code=400, detail=f"Maximum {schemas.BULK_USERS_MAX} utilisateurs par lot")
+    company = crud.get_entreprise_by_id(db, company_id)
+    if not company:
+        raise HTTPException(status_code=404, detail="Entreprise introuvable")
+    return provisioning.provisionner_utilisateurs(db, company, lignes)
+
+@app.post("/admin/create-users/bulk", response_model=schemas.UserBulkJob)
+def create_users_bulk(
+    payload: schemas.UserBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.require_admin_or_super)
+):
+    """Créer des users en masse (JSON) : une transaction, emails mis en file (outbox)"""
+    lignes = [ligne.model_dump() for ligne in payload.users]
+    return _lancer_provisioning(db, payload.company_id, lignes, current_user)
+
+@app.post("/admin/create-users/bulk-csv", response_model=schemas.UserBulkJob)
+def create_users_bulk_csv(
+    company_id: int = Form(...),
+    fichier: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.require_admin_or_super)
+):
+    """Créer des users en masse depuis un CSV (colonnes username, email)"""
+    lignes = provisioning.lire_csv(fichier.file.read())
+    return _lancer_provisioning(db, company_id, lignes, current_user)
+
+@app.get("/admin/create-users/bulk/{job_id}", response_model=schemas.UserBulkJob)
+def get_users_bulk_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: auth.Principal = Depends(auth.require_admin_or_super)
+):
+    """Statut d'un lot : ligne par ligne, avec l'avancement des emails"""
+    job = provisioning.get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Lot introuvable")
+    if current_user.role == models.RoleEnum.ADMIN and job["company_id"] != current_user.company_id:
+        raise HTTPException(status_code=403, detail="Action interdite")
+    return job
+
 @app.post("/auth/change-password")
 def change_password(
     password_data: schemas.PasswordChange,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_user)
+    current_user: auth.Principal = Depends(auth.get_current_user)
 ):
     """Changer le mot de passe"""
-    if not auth.verify_password(password_data.old_password, current_user.password_hash):
-        raise HTTPException(status_code=400, detail="Ancien mot de passe incorrect")
     user = db.query(models.User).filter(models.User.id == current_user.id).first()
     if not user:
         raise HTTPException(status_code=404, detail="Utilisateur introuvable")
+    if not auth.verify_password(password_data.old_password, user.password_hash):
+        raise HTTPException(status_code=400, detail="Ancien mot de passe incorrect")
     if auth.verify_password(password_data.new_password, user.password_hash):
         raise HTTPException(status_code=400, detail="Le nouveau mot de passe doit être différent de l'ancien")
     user.password_hash = auth.get_password_hash(password_data.new_password)
     user.first_login = False
     user.password_reset_required = False
+    user.token_generation = (user.token_generation or 0) + 1  # révoque les anciens tokens
     db.commit()
+    auth.invalidate_token_cache(user_id=user.id)
     return {"message": "Mot de passe changé avec succès", "first_login": False}
 
 @app.get("/admin/list-admins")
 async def list_admins(
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.require_superadmin)
+    current_user: auth.Principal = Depends(auth.require_superadmin)
 ):
     """Lister tous les administrateurs (SUPERADMIN uniquement)"""
     admins = db.query(models.User).filter(models.User.role == models.RoleEnum.ADMIN).all()
@@ -758,17 +1383,21 @@ async def list_admins(
 
 @app.get("/admin/list-users-of-company")
 async def list_users_of_company(
+    response: Response,
+    company_id: Optional[int] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    tout: bool = False,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.require_admin_or_super)
+    current_user: auth.Principal = Depends(auth.require_admin_or_super)
 ):
-    """Lister les users de son entreprise (ADMIN) ou tous (SUPERADMIN)"""
-    if current_user.role == models.RoleEnum.SUPERADMIN:
-        users = db.query(models.User).filter(models.User.role == models.RoleEnum.USER).all()
-    else:
-        users = db.query(models.User).filter(
-            models.User.role == models.RoleEnum.USER,
-            models.User.company_id == current_user.company_id
-        ).all()
+    """Lister les users de son entreprise (ADMIN) ou tous (SUPERADMIN), paginé par curseur"""
+    query = db.query(models.User).filter(models.User.role == models.RoleEnum.USER)
+    if current_user.role != models.RoleEnum.SUPERADMIN:
+        query = query.filter(models.User.company_id == current_user.company_id)
+    elif company_id is not None:
+        query = query.filter(models.User.company_id == company_id)
+    users = lister(query, response, [models.User.id], limit, cursor, tout)
     return [
         {
             "id": user.id,
@@ -786,7 +1415,7 @@ async def list_users_of_company(
 def delete_user_by_admin(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.require_admin_or_super)
+    current_user: auth.Principal = Depends(auth.require_admin_or_super)
 ):
     user = db.query(models.User).get(user_id)
     if not user:
@@ -795,6 +1424,7 @@ def delete_user_by_admin(
         raise HTTPException(403, "Action interdite")
     db.delete(user)
     db.commit()
+    auth.invalidate_token_cache(user_id=user_id)
     return {"message": "Utilisateur supprimé avec succès"}
 
 # -----------------------------
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Enum, ForeignKey, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Text, Float, Enum, ForeignKey, Date, DateTime, Boolean, Index
 from sqlalchemy.orm import relationship
 from database import Base
 import enum
@@ -14,6 +14,20 @@ class CompanyStatusEnum(str, enum.Enum):
     SUSPENDED = "suspended"
     TERMINATED = "terminated"
 
+class EmailStatusEnum(str, enum.Enum):
+    PENDING = "en_attente"
+    SENT = "envoye"
+    FAILED = "echec"        # abandon après EMAIL_OUTBOX_MAX_ATTEMPTS
+    SIMULATED = "simule"    # SMTP non configuré : affiché dans les logs
+
+class SourceMouvementEnum(str, enum.Enum):
+    CREATION = "creation"
+    MODIFICATION = "modification"   # PUT /articles/{id} ou écriture ORM sans contexte
+    AJUSTEMENT = "ajustement"       # /articles/{id}/adjust-stock
+    RETRAIT = "retrait"
+    ALLOCATION = "allocation"       # sortie de stock d'un calcul d'échafaudage
+    SUPPRESSION = "suppression"
+
 
 class Company(Base):
     __tablename__ = "companies"
@@ -27,6 +41,8 @@ class Company(Base):
     
     suspended_at = Column(DateTime, nullable=True)
     terminated_at = Column(DateTime, nullable=True)
+    # Incrémenté pour révoquer tous les tokens de l'entreprise
+    token_generation = Column(Integer, default=0, server_default="0", nullable=False)
 
     users = relationship("User", back_populates="company")
     articles = relationship("Article", back_populates="company")
@@ -47,10 +63,16 @@ class User(Base):
     is_active = Column(Boolean, default=True)  # True = actif, False = suspendu
     email = Column(String, nullable=True)  # Pour envoi mot de passe
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Incrémenté pour révoquer les tokens de l'utilisateur (ex: changement de mot de passe)
+    token_generation = Column(Integer, default=0, server_default="0", nullable=False)
     
     company = relationship("Company", back_populates="users")
     retraits = relationship("Retrait", back_populates="user")
 
+    __table_args__ = (
+        Index("ix_users_company_id", "company_id"),
+    )
+
 class Article(Base):
     __tablename__ = "articles"
     id = Column(Integer, primary_key=True, index=True)
@@ -68,6 +90,11 @@ class Article(Base):
     company = relationship("Company", back_populates="articles")
     retraits = relationship("Retrait", back_populates="article")
 
+    # Index composites multi-entreprises (recherche par nom dans l'entreprise)
+    __table_args__ = (
+        Index("ix_articles_company_id_nom", "company_id", "nom"),
+    )
+
 class Retrait(Base):
     __tablename__ = "retraits"
     id = Column(Integer, primary_key=True, index=True)
@@ -77,12 +104,17 @@ class Retrait(Base):
     nom_utilisateur = Column(String, nullable=True)
     quantite = Column(Integer, nullable=False)
     poids_total = Column(Float, default=0.0)
-    date_retrait = Column(DateTime, default=datetime.utcnow)
+    date_retrait = Column(DateTime, default=datetime.utcnow, nullable=False)  # clé de pagination
     
     article = relationship("Article", back_populates="retraits")
     company = relationship("Company", back_populates="retraits")
     user = relationship("User", back_populates="retraits")
 
+    # Historique par entreprise, trié (date_retrait, id) : retraits récents + pagination
+    __table_args__ = (
+        Index("ix_retraits_company_id_date_retrait", "company_id", "date_retrait", "id"),
+    )
+
     # 🆕 NOUVEAU MODÈLE
 class Chantier(Base):
     __tablename__ = "chantiers"
@@ -95,8 +127,211 @@ class Chantier(Base):
     longueur = Column(Float)
     largeur = Column(Float)
     niveaux_travail = Column(String)
-    date_creation = Column(DateTime, default=datetime.utcnow)
+    date_creation = Column(DateTime, default=datetime.utcnow, nullable=False)  # clé de pagination
     poids_total = Column(Float)
     
     company = relationship("Company", back_populates="chantiers")
 
+    __table_args__ = (
+        Index("ix_chantiers_company_id_date_creation", "company_id", "date_creation", "id"),
+    )
+
+
+class EmailOutbox(Base):
+    """
+    Emails à envoyer, écrits dans la même transaction que l'objet métier
+    (ex: l'utilisateur créé) puis envoyés par le worker de outbox.py.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=True)  # effacé une fois l'email terminé (mot de passe temporaire)
+    status = Column(Enum(EmailStatusEnum), default=EmailStatusEnum.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    # Le worker lit les emails en attente dont l'échéance est passée
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+
+class ExportJob(Base):
+    """
+    Job d'export PDF asynchrone (voir exports.py). En base pour que tous les
+    workers voient le statut et comptent les jobs en cours de l'entreprise.
+    """
+    __tablename__ = "export_jobs"
+
+    id = Column(String, primary_key=True)  # uuid hex
+    rapport = Column(String, nullable=False)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=True)
+    user_id = Column(Integer, nullable=False)
+    statut = Column(String, default="en_cours", nullable=False)  # en_cours | termine | echec
+    date_creation = Column(DateTime, default=datetime.utcnow, nullable=False)
+    date_fin = Column(DateTime, nullable=True)
+    expire_le = Column(DateTime, nullable=True)
+    taille_octets = Column(Integer, nullable=True)
+    erreur = Column(String, nullable=True)
+    nom_fichier = Column(String, nullable=False)
+
+    __table_args__ = (
+        Index("ix_export_jobs_company_id_statut", "company_id", "statut"),
+        Index("ix_export_jobs_expire_le", "expire_le"),
+    )
+
+
+class ProvisioningJob(Base):
+    """
+    Lot de création d'utilisateurs (voir provisioning.py), écrit dans la
+    transaction des utilisateurs : consultable depuis tous les workers.
+    """
+    __tablename__ = "provisioning_jobs"
+
+    id = Column(String, primary_key=True)  # uuid hex
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    date_creation = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expire_le = Column(DateTime, nullable=False)
+    total = Column(Integer, nullable=False)
+    crees = Column(Integer, nullable=False)
+    lignes = Column(Text, nullable=False)  # JSON : résultat ligne par ligne (sans mot de passe)
+
+    __table_args__ = (
+        Index("ix_provisioning_jobs_expire_le", "expire_le"),
+    )
+
+
+class CompanyStockStats(Base):
+    """
+    Synthèse du stock d'une entreprise, tenue à jour par deltas dans la
+    transaction de chaque écriture d'article/retrait (voir stock_stats.py).
+    """
+    __tablename__ = "company_stock_stats"
+
+    company_id = Column(Integer, ForeignKey("companies.id"), primary_key=True)
+    total_articles = Column(Integer, default=0, server_default="0", nullable=False)
+    stock_total = Column(Integer, default=0, server_default="0", nullable=False)
+    alertes_stock_faible = Column(Integer, default=0, server_default="0", nullable=False)
+    categories = Column(Integer, default=0, server_default="0", nullable=False)
+
+
+class CompanyCategoryStats(Base):
+    """Compteurs par catégorie ('' = articles sans catégorie)"""
+    __tablename__ = "company_category_stats"
+
+    company_id = Column(Integer, ForeignKey("companies.id"), primary_key=True)
+    categorie = Column(String, primary_key=True)
+    nombre_articles = Column(Integer, default=0, server_default="0", nullable=False)
+    stock_total = Column(Integer, default=0, server_default="0", nullable=False)
+
+
+class RetraitRollupJour(Base):
+    """
+    Retraits agrégés par jour (UTC) et par (entreprise, article, utilisateur).
+    Reconstruits jour par jour par retrait_rollups.consolider() pour les
+    journées closes ; la journée en cours se lit dans retraits.
+    """
+    __tablename__ = "retrait_rollups_jour"
+
+    id = Column(Integer, primary_key=True)
+    jour = Column(Date, nullable=False)
+    company_id = Column(Integer, nullable=True)
+    article_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=True)
+    nombre_retraits = Column(Integer, nullable=False)
+    quantite_totale = Column(Integer, nullable=False)
+    poids_total = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_retrait_rollups_jour_company_id_jour", "company_id", "jour"),
+        Index("ix_retrait_rollups_jour_jour", "jour"),
+    )
+
+
+class RollupEtat(Base):
+    """Dernier jour consolidé (inclus) d'un rollup ; verrou des jobs de fond (verrous.py)"""
+    __tablename__ = "rollup_etats"
+
+    nom = Column(String, primary_key=True)
+    jour_consolide = Column(Date, nullable=True)
+
+
+class MouvementStock(Base):
+    """
+    Journal append-only des mouvements de stock : une ligne par changement de
+    quantité d'un article (voir mouvements_stock.py). Pas de clé étrangère
+    sur l'article : l'historique survit à sa suppression.
+    """
+    __tablename__ = "mouvements_stock"
+
+    id = Column(Integer, primary_key=True)
+    date_mouvement = Column(DateTime, nullable=False)
+    company_id = Column(Integer, nullable=True)
+    article_id = Column(Integer, nullable=False)
+    delta = Column(Integer, nullable=False)
+    quantite_apres = Column(Integer, nullable=False)
+    source = Column(Enum(SourceMouvementEnum), nullable=False)
+    raison = Column(String, nullable=True)
+    user_id = Column(Integer, nullable=True)
+
+    __table_args__ = (
+        Index("ix_mouvements_stock_company_id_date_mouvement", "company_id", "date_mouvement", "id"),
+        Index("ix_mouvements_stock_article_id_date_mouvement", "article_id", "date_mouvement", "id"),
+    )
+
+
+class StockSnapshot(Base):
+    """Photo des quantités de tous les articles d'une entreprise à date_snapshot"""
+    __tablename__ = "stock_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    date_snapshot = Column(DateTime, nullable=False)
+
+    lignes = relationship("StockSnapshotLigne", cascade="all, delete-orphan", passive_deletes=True)
+
+    __table_args__ = (
+        Index("ix_stock_snapshots_company_id_date_snapshot", "company_id", "date_snapshot"),
+    )
+
+
+class StockSnapshotLigne(Base):
+    __tablename__ = "stock_snapshot_lignes"
+
+    snapshot_id = Column(Integer, ForeignKey("stock_snapshots.id", ondelete="CASCADE"), primary_key=True)
+    article_id = Column(Integer, primary_key=True)
+    quantite = Column(Integer, nullable=False)
+
+
+class CategorieSynonyme(Base):
+    """
+    Mot-clé propre à une entreprise pour la détection de catégorie
+    (voir categories.py) ; prioritaire sur les synonymes intégrés.
+    """
+    __tablename__ = "categorie_synonymes"
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=False)
+    categorie = Column(String, nullable=False)
+    mot = Column(String, nullable=False)  # normalisé (normalisation.normaliser_nom)
+
+    __table_args__ = (
+        Index("ix_categorie_synonymes_company_id_mot", "company_id", "mot", unique=True),
+    )
+
+
+class DonneesVersion(Base):
+    """
+    Version des données articles/retraits d'une entreprise, incrémentée dans
+    la transaction de chaque écriture (voir report_cache.py). Partagée par
+    tous les workers ; company_id 0 = articles sans entreprise.
+    """
+    __tablename__ = "donnees_versions"
+
+    company_id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer, default=0, server_default="0", nullable=False)
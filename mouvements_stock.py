@@ -0,0 +1,403 @@
+# mouvements_stock.py
+"""
+Journal des mouvements de stock (append-only) et snapshots.
+
+Chaque changement de quantité d'un article écrit une ligne dans
+mouvements_stock (delta, quantité après, source, raison, utilisateur),
+dans la même transaction que le changement :
+- écritures ORM (création, PUT, adjust-stock, suppression) : détectées en
+  after_flush, source/raison/utilisateur fournis par contexte() ;
+- UPDATE hors ORM (crud.decrementer_stock[s]) : appel explicite à enregistrer().
+Les lignes sont insérées juste avant le commit, article déjà verrouillé :
+pour un article donné, l'ordre des id est l'ordre des commits.
+
+Snapshots : photo périodique des quantités de tous les articles de chaque
+entreprise, construite à partir de la précédente + les mouvements depuis.
+"Quantité au jour X" (quantites_au, GET /articles/as-of) = snapshot le
+plus récent avant X + mouvements entre les deux : le coût dépend du temps
+écoulé depuis ce snapshot, pas de la longueur de l'historique. Le
+snapshot d'ouverture (articles antérieurs au journal) est pris par la
+migration, ou par installer() au démarrage pour les bases create_all.
+
+Compaction : au-delà de STOCK_SNAPSHOT_RETENTION_JOURS, un snapshot par
+mois est conservé ; MOUVEMENTS_RETENTION_JOURS > 0 purge le journal ancien
+(l'historique n'est alors plus disponible avant le snapshot conservé).
+"""
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sqlalchemy import delete, event, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import (
+    Article, Company, MouvementStock, SourceMouvementEnum,
+    StockSnapshot, StockSnapshotLigne
+)
+from suivi_articles import valeur_avant
+from verrous import verrouiller_etat
+
+load_dotenv()
+
+SNAPSHOT_WORKER = os.getenv("STOCK_SNAPSHOT_WORKER", "true").lower() in ("1", "true", "yes")
+SNAPSHOT_INTERVAL = float(os.getenv("STOCK_SNAPSHOT_INTERVAL", "21600"))  # secondes
+SNAPSHOT_RETENTION_JOURS = int(os.getenv("STOCK_SNAPSHOT_RETENTION_JOURS", "90"))
+MOUVEMENTS_RETENTION_JOURS = int(os.getenv("MOUVEMENTS_RETENTION_JOURS", "0"))  # 0 = jamais purgé
+
+# Un snapshot ne couvre que les mouvements plus vieux que cette marge
+# (transactions encore en vol au moment du snapshot)
+MARGE_SNAPSHOT = timedelta(minutes=10)
+
+ETAT = "stock_snapshots"        # ligne de rollup_etats servant de verrou au job
+_CONTEXTE = "mouvement_contexte"
+_EN_ATTENTE = "mouvements_en_attente"
+
+
+# -----------------------------
+# 📝 ENREGISTREMENT
+# -----------------------------
+def contexte(
+    db: Session,
+    source: SourceMouvementEnum,
+    raison: Optional[str] = None,
+    user_id: Optional[int] = None
+):
+    """Source/raison/utilisateur des mouvements de la transaction en cours"""
+    db.info[_CONTEXTE] = (source, raison, user_id)
+
+
+def enregistrer(
+    db: Session,
+    article_id: int,
+    company_id: Optional[int],
+    delta: int,
+    quantite_apres: int,
+    source: Optional[SourceMouvementEnum] = None,
+    raison: Optional[str] = None
+):
+    """Mouvement inséré au commit (source/raison par défaut : contexte())"""
+    ctx_source, ctx_raison, ctx_user = db.info.get(
+        _CONTEXTE, (SourceMouvementEnum.MODIFICATION, None, None)
+    )
+    db.info.setdefault(_EN_ATTENTE, []).append({
+        "article_id": article_id,
+        "company_id": company_id,
+        "delta": delta,
+        "quantite_apres": quantite_apres,
+        "source": source or ctx_source,
+        "raison": raison or ctx_raison,
+        "user_id": ctx_user,
+    })
+
+
+@event.listens_for(Session, "after_flush")
+def _noter_mouvements(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, Article):
+            q = obj.quantite or 0
+            enregistrer(session, obj.id, obj.company_id, q, q, SourceMouvementEnum.CREATION)
+    for obj in session.dirty:
+        if not isinstance(obj, Article) or not session.is_modified(obj):
+            continue
+        ancienne_qte, ancienne_cie = valeur_avant(obj, "quantite") or 0, valeur_avant(obj, "company_id")
+        q = obj.quantite or 0
+        if ancienne_cie != obj.company_id:
+            raison = f"Transfert entreprise {ancienne_cie} -> {obj.company_id}"
+            enregistrer(session, obj.id, ancienne_cie, -ancienne_qte, 0, SourceMouvementEnum.SUPPRESSION, raison)
+            enregistrer(session, obj.id, obj.company_id, q, q, SourceMouvementEnum.CREATION, raison)
+        elif ancienne_qte != q:
+            enregistrer(session, obj.id, obj.company_id, q - ancienne_qte, q)
+    for obj in session.deleted:
+        if isinstance(obj, Article):
+            ancienne_qte = valeur_avant(obj, "quantite") or 0
+            enregistrer(
+                session, obj.id, valeur_avant(obj, "company_id"), -ancienne_qte, 0,
+                SourceMouvementEnum.SUPPRESSION, f"Suppression de l'article {obj.nom}"
+            )
+
+
+@event.listens_for(Session, "before_commit")
+def _inserer_avant_commit(session):
+    session.flush()
+    mouvements = session.info.pop(_EN_ATTENTE, None)
+    if mouvements:
+        maintenant = datetime.utcnow()
+        for m in mouvements:
+            m["date_mouvement"] = maintenant
+        session.execute(insert(MouvementStock), mouvements)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _oublier(session):
+    session.info.pop(_EN_ATTENTE, None)
+    session.info.pop(_CONTEXTE, None)
+
+
+# -----------------------------
+# 📸 SNAPSHOTS
+# -----------------------------
+def _derniers_mouvements(db: Session, company_id: int, apres: Optional[datetime], jusqu_a: datetime):
+    """Dernier mouvement de chaque article de l'entreprise sur ]apres, jusqu_a]"""
+    M = MouvementStock
+    derniers = select(func.max(M.id)).where(M.company_id == company_id, M.date_mouvement <= jusqu_a)
+    if apres is not None:
+        derniers = derniers.where(M.date_mouvement > apres)
+    return db.query(M.article_id, M.quantite_apres, M.source).filter(
+        M.id.in_(derniers.group_by(M.article_id))
+    ).all()
+
+
+def _appliquer_mouvements(quantites: Dict[int, int], mouvements) -> Dict[int, int]:
+    for article_id, quantite_apres, source in mouvements:
+        if source == SourceMouvementEnum.SUPPRESSION:
+            quantites.pop(article_id, None)
+        else:
+            quantites[article_id] = quantite_apres
+    return quantites
+
+
+def _snapshot_avant(db: Session, company_id: int, date: datetime) -> Optional[StockSnapshot]:
+    return db.query(StockSnapshot).filter(
+        StockSnapshot.company_id == company_id, StockSnapshot.date_snapshot <= date
+    ).order_by(StockSnapshot.date_snapshot.desc(), StockSnapshot.id.desc()).first()
+
+
+def _lignes(db: Session, snapshot: Optional[StockSnapshot]) -> Dict[int, int]:
+    if snapshot is None:
+        return {}
+    return dict(db.query(StockSnapshotLigne.article_id, StockSnapshotLigne.quantite).filter(
+        StockSnapshotLigne.snapshot_id == snapshot.id
+    ))
+
+
+def installer(engine):
+    """
+    Snapshot d'ouverture des entreprises qui n'en ont aucun et dont des
+    articles n'ont aucun mouvement (bases créées par create_all avant le
+    journal, hors Alembic) : équivalent du snapshot initial de la migration.
+    Sans lui, ces articles n'apparaissent à aucune date.
+    """
+    db = Session(bind=engine)
+    try:
+        verrouiller_etat(db, ETAT)
+        A, M, S = Article, MouvementStock, StockSnapshot
+        entreprises = [company_id for (company_id,) in (
+            db.query(A.company_id).distinct()
+            .filter(
+                A.company_id.isnot(None),
+                ~select(M.id).where(M.article_id == A.id).exists(),
+                ~select(S.id).where(S.company_id == A.company_id).exists()
+            )
+            .order_by(A.company_id)
+            .all()
+        )]
+        maintenant = datetime.utcnow()
+        for company_id in entreprises:
+            snapshot = StockSnapshot(company_id=company_id, date_snapshot=maintenant)
+            db.add(snapshot)
+            db.flush()
+            db.execute(insert(StockSnapshotLigne).from_select(
+                ["snapshot_id", "article_id", "quantite"],
+                select(literal(snapshot.id), A.id, func.coalesce(A.quantite, 0)).where(A.company_id == company_id)
+            ))
+        db.commit()
+        if entreprises:
+            print(f"📸 Snapshot d'ouverture pris pour {len(entreprises)} entreprise(s)")
+    finally:
+        db.close()
+
+
+def prendre_snapshots(db: Session, jusqu_a: Optional[datetime] = None) -> int:
+    """
+    Nouveau snapshot pour chaque entreprise ayant des mouvements depuis son
+    dernier snapshot (coût proportionnel à ces mouvements). Retourne le
+    nombre de snapshots créés.
+    """
+    coupure = jusqu_a or datetime.utcnow() - MARGE_SNAPSHOT
+    verrouiller_etat(db, ETAT)
+    crees = 0
+    for (company_id,) in db.query(Company.id).order_by(Company.id).all():
+        precedent = _snapshot_avant(db, company_id, coupure)
+        depuis = precedent.date_snapshot if precedent else None
+        mouvements = _derniers_mouvements(db, company_id, depuis, coupure)
+        if not mouvements:
+            continue
+        quantites = _appliquer_mouvements(_lignes(db, precedent), mouvements)
+        snapshot = StockSnapshot(company_id=company_id, date_snapshot=coupure)
+        db.add(snapshot)
+        db.flush()
+        if quantites:
+            db.execute(insert(StockSnapshotLigne), [
+                {"snapshot_id": snapshot.id, "article_id": a, "quantite": q}
+                for a, q in quantites.items()
+            ])
+        crees += 1
+    db.commit()
+    return crees
+
+
+def compacter(db: Session, maintenant: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    - Snapshots de plus de SNAPSHOT_RETENTION_JOURS : le premier de chaque mois est gardé
+    - MOUVEMENTS_RETENTION_JOURS > 0 : mouvements (et snapshots) antérieurs au
+      dernier snapshot plus vieux que la rétention supprimés
+    """
+    maintenant = maintenant or datetime.utcnow()
+    verrouiller_etat(db, ETAT)
+    S = StockSnapshot
+
+    a_supprimer, vus = [], set()
+    limite = maintenant - timedelta(days=SNAPSHOT_RETENTION_JOURS)
+    for snapshot_id, company_id, date in db.query(S.id, S.company_id, S.date_snapshot).filter(
+        S.date_snapshot < limite
+    ).order_by(S.company_id, S.date_snapshot, S.id):
+        mois = (company_id, date.year, date.month)
+        if mois in vus:
+            a_supprimer.append(snapshot_id)
+        vus.add(mois)
+
+    mouvements_purges = 0
+    if MOUVEMENTS_RETENTION_JOURS > 0:
+        limite = maintenant - timedelta(days=MOUVEMENTS_RETENTION_JOURS)
+        for (company_id,) in db.query(Company.id).order_by(Company.id).all():
+            borne = _snapshot_avant(db, company_id, limite)
+            if borne is None:
+                continue
+            mouvements_purges += db.execute(delete(MouvementStock).where(
+                MouvementStock.company_id == company_id,
+                MouvementStock.date_mouvement <= borne.date_snapshot
+            )).rowcount
+            a_supprimer += [sid for (sid,) in db.query(S.id).filter(
+                S.company_id == company_id, S.date_snapshot < borne.date_snapshot
+            )]
+
+    a_supprimer = sorted(set(a_supprimer))
+    for i in range(0, len(a_supprimer), 500):
+        lot = a_supprimer[i:i + 500]
+        db.execute(delete(StockSnapshotLigne).where(StockSnapshotLigne.snapshot_id.in_(lot)))
+        db.execute(delete(StockSnapshot).where(StockSnapshot.id.in_(lot)))
+    db.commit()
+    return {"snapshots_supprimes": len(a_supprimer), "mouvements_purges": mouvements_purges}
+
+
+# -----------------------------
+# 🔎 QUANTITÉ À UNE DATE
+# -----------------------------
+def _utc(date: datetime) -> datetime:
+    """Dates stockées en UTC naïf : une date avec fuseau est convertie"""
+    if date.tzinfo is None:
+        return date
+    return date.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def verifier_historique(db: Session, company_id: Optional[int], date: datetime):
+    """
+    400 si `date` précède l'historique disponible : snapshot le plus ancien
+    quand aucun mouvement ne lui est antérieur (snapshot initial de la
+    migration, ou journal purgé par compacter()).
+    """
+    premier = db.query(func.min(StockSnapshot.date_snapshot)).filter(
+        StockSnapshot.company_id == company_id
+    ).scalar()
+    if premier is None or date >= premier:
+        return
+    anterieur = db.query(MouvementStock.id).filter(
+        MouvementStock.company_id == company_id, MouvementStock.date_mouvement < premier
+    ).first()
+    if anterieur is None:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Historique des stocks disponible à partir du {premier.isoformat()}"
+        )
+
+
+def quantite_article_au(db: Session, article_id: int, company_id: Optional[int], date: datetime) -> Optional[int]:
+    """
+    Quantité d'un article à `date` (None : article inexistant à cette date).
+    Dernier mouvement de l'article avant `date` (index article_id, date) ;
+    sinon sa ligne dans le snapshot le plus récent avant `date`.
+    """
+    date = _utc(date)
+    verifier_historique(db, company_id, date)
+    M = MouvementStock
+    dernier = db.query(M.quantite_apres, M.source).filter(
+        M.article_id == article_id, M.company_id == company_id, M.date_mouvement <= date
+    ).order_by(M.date_mouvement.desc(), M.id.desc()).first()
+    if dernier is not None:
+        return None if dernier.source == SourceMouvementEnum.SUPPRESSION else dernier.quantite_apres
+    snapshot = _snapshot_avant(db, company_id, date) if company_id is not None else None
+    if snapshot is None:
+        return None
+    return db.query(StockSnapshotLigne.quantite).filter(
+        StockSnapshotLigne.snapshot_id == snapshot.id, StockSnapshotLigne.article_id == article_id
+    ).scalar()
+
+
+def quantites_au(db: Session, company_id: int, date: datetime) -> Dict[int, int]:
+    """
+    Quantités de tous les articles de l'entreprise à `date` : lignes du
+    snapshot le plus récent avant `date`, mises à jour par le dernier
+    mouvement de chaque article entre ce snapshot et `date` (parcours de
+    l'index (company_id, date_mouvement) sur cet intervalle seulement).
+    """
+    date = _utc(date)
+    verifier_historique(db, company_id, date)
+    snapshot = _snapshot_avant(db, company_id, date)
+    depuis = snapshot.date_snapshot if snapshot else None
+    return _appliquer_mouvements(_lignes(db, snapshot), _derniers_mouvements(db, company_id, depuis, date))
+
+
+# -----------------------------
+# ⏱️ WORKER
+# -----------------------------
+class SnapshotWorker:
+    """Snapshots + compaction toutes les SNAPSHOT_INTERVAL secondes"""
+
+    def __init__(self):
+        self._arret = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def demarrer(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._arret.clear()
+        self._thread = threading.Thread(target=self._boucle, name="stock-snapshots", daemon=True)
+        self._thread.start()
+
+    def arreter(self, timeout: float = 10):
+        self._arret.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _boucle(self):
+        while not self._arret.wait(SNAPSHOT_INTERVAL):
+            db = SessionLocal()
+            try:
+                crees = prendre_snapshots(db)
+                resultat = compacter(db)
+                print(f"📸 Snapshots de stock : {crees} créé(s), compaction {resultat}")
+            except Exception as e:
+                db.rollback()
+                print(f"❌ Erreur snapshots de stock: {e}")
+            finally:
+                db.close()
+
+
+worker = SnapshotWorker()
+
+
+if __name__ == "__main__":
+    import sys
+
+    db = SessionLocal()
+    try:
+        print(f"✅ {prendre_snapshots(db)} snapshot(s) créé(s)")
+        if "--compacter" in sys.argv:
+            print(f"✅ Compaction : {compacter(db)}")
+    finally:
+        db.close()
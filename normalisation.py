@@ -0,0 +1,38 @@
+# normalisation.py
+"""
+Normalisation des noms d'articles, commune à la détection de catégorie
+(categories), à l'autocomplétion (article_suggest) et à la
+résolution approchée des noms (article_matcher).
+"""
+import re
+import unicodedata
+from typing import List
+
+# Marques combinantes du plan de base (accents après NFKD) : une classe
+# d'expression régulière, beaucoup plus rapide qu'un filtre caractère par
+# caractère sur un texte long. Les autres plans passent par normaliser_nom.
+_COMBINANTS = re.compile(
+    "[" + re.escape("".join(chr(c) for c in range(0x10000) if unicodedata.combining(chr(c)))) + "]+"
+)
+_HORS_BMP = re.compile("[\U00010000-\U0010FFFF]")
+_SEPARATEUR = "\x00"
+
+
+def normaliser_nom(nom: str) -> str:
+    """Minuscules (casefold), accents retirés, espaces réduits : "  Échelle  3M" → "echelle 3m" """
+    decompose = unicodedata.normalize("NFKD", nom.casefold())
+    sans_accents = "".join(c for c in decompose if not unicodedata.combining(c))
+    return " ".join(sans_accents.split())
+
+
+def normaliser_noms(noms: List[str]) -> List[str]:
+    """
+    normaliser_nom sur une liste (imports en masse), même résultat : un seul
+    passage casefold / NFKD / accents sur le texte concaténé.
+    """
+    texte = _SEPARATEUR.join(noms)
+    decompose = unicodedata.normalize("NFKD", texte.casefold())
+    if decompose.count(_SEPARATEUR) != len(noms) - 1 or _HORS_BMP.search(decompose):
+        # Séparateur présent dans un nom, liste vide ou caractères hors plan de base
+        return [normaliser_nom(nom) for nom in noms]
+    return [" ".join(p.split()) for p in _COMBINANTS.sub("", decompose).split(_SEPARATEUR)]
@@ -0,0 +1,241 @@
+# outbox.py
+"""
+Outbox des emails : les routes écrivent l'email dans la table email_outbox
+(même transaction que l'objet métier), un thread de fond les envoie.
+
+Le worker réutilise une connexion SMTP persistante (STARTTLS + login une
+seule fois), envoie par lots et replanifie les échecs avec un backoff
+exponentiel. Plusieurs processus peuvent tourner : les lots sont réservés
+avec FOR UPDATE SKIP LOCKED (PostgreSQL).
+
+Le corps d'un email de bienvenue contient le mot de passe temporaire : il
+est effacé dès que l'email est envoyé, simulé ou abandonné, et les emails
+terminés sont purgés après EMAIL_OUTBOX_RETENTION_JOURS.
+"""
+import os
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+import email_service
+from database import SessionLocal
+from models import EmailOutbox, EmailStatusEnum
+
+load_dotenv()
+
+OUTBOX_WORKER = os.getenv("EMAIL_OUTBOX_WORKER", "true").lower() in ("1", "true", "yes")
+BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "50"))
+MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+POLL_INTERVAL = float(os.getenv("EMAIL_OUTBOX_POLL_INTERVAL", "5"))    # secondes
+BACKOFF_BASE = float(os.getenv("EMAIL_OUTBOX_BACKOFF_BASE", "30"))     # secondes
+BACKOFF_MAX = float(os.getenv("EMAIL_OUTBOX_BACKOFF_MAX", "3600"))     # secondes
+SMTP_IDLE_TIMEOUT = float(os.getenv("EMAIL_OUTBOX_SMTP_IDLE", "60"))   # secondes
+RETENTION_JOURS = int(os.getenv("EMAIL_OUTBOX_RETENTION_JOURS", "30"))
+PURGE_INTERVAL = 3600  # secondes
+
+TERMINES = (EmailStatusEnum.SENT, EmailStatusEnum.SIMULATED, EmailStatusEnum.FAILED)
+
+
+# -----------------------------
+# 📥 MISE EN FILE (côté routes)
+# -----------------------------
+def enqueue_email(db: Session, to_email: str, subject: str, body: str) -> EmailOutbox:
+    """Ajoute l'email à la session SANS commit : il part avec la transaction de l'appelant"""
+    email = EmailOutbox(to_email=to_email, subject=subject, body=body)
+    db.add(email)
+    return email
+
+
+def enqueue_welcome_email(
+    db: Session,
+    username: str,
+    email: str,
+    temp_password: str,
+    role: str,
+    company_name: str = None
+) -> EmailOutbox:
+    subject, body = email_service.welcome_email_content(username, temp_password, role, company_name)
+    return enqueue_email(db, email, subject, body)
+
+
+# -----------------------------
+# 📤 CONNEXION SMTP PERSISTANTE
+# -----------------------------
+class _ConnexionSMTP:
+    """Une connexion ouverte à la demande, réutilisée, fermée après inactivité"""
+
+    def __init__(self):
+        self._server: Optional[smtplib.SMTP] = None
+        self._dernier_usage = 0.0
+
+    def envoyer(self, to_email: str, message: str):
+        if self._server is None:
+            self._server = email_service.open_smtp_connection()
+        try:
+            self._server.sendmail(email_service.SMTP_FROM, to_email, message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            # Connexion coupée par le serveur (timeout, redémarrage) : une reconnexion
+            self.fermer()
+            self._server = email_service.open_smtp_connection()
+            self._server.sendmail(email_service.SMTP_FROM, to_email, message)
+        self._dernier_usage = time.monotonic()
+
+    def fermer_si_inactive(self):
+        if self._server is not None and time.monotonic() - self._dernier_usage > SMTP_IDLE_TIMEOUT:
+            self.fermer()
+
+    def fermer(self):
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            pass
+        self._server = None
+
+
+def _delai_backoff(tentatives: int) -> timedelta:
+    return timedelta(seconds=min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (tentatives - 1)))
+
+
+def _erreur_definitive(erreur: Exception) -> bool:
+    """Code SMTP 5xx (adresse refusée, ...) : inutile de réessayer"""
+    if isinstance(erreur, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in erreur.recipients.values())
+    return isinstance(erreur, smtplib.SMTPResponseException) and erreur.smtp_code >= 500
+
+
+def _terminer(email: EmailOutbox, statut: EmailStatusEnum):
+    """Statut final ; le corps (mot de passe temporaire) n'est pas conservé"""
+    email.status = statut
+    email.body = None
+
+
+# -----------------------------
+# ⚙️ TRAITEMENT D'UN LOT
+# -----------------------------
+def traiter_lot(db: Session, connexion: _ConnexionSMTP, taille: int = BATCH_SIZE) -> int:
+    """Envoie jusqu'à `taille` emails échus. Retourne le nombre d'emails traités."""
+    maintenant = datetime.utcnow()
+    emails = (
+        db.query(EmailOutbox)
+        .filter(
+            EmailOutbox.status == EmailStatusEnum.PENDING,
+            EmailOutbox.next_attempt_at <= maintenant
+        )
+        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+        .limit(taille)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    if not emails:
+        db.rollback()
+        return 0
+
+    simulation = not email_service.smtp_configure()
+    for i, email in enumerate(emails):
+        email.attempts += 1
+        if simulation:
+            email_service.print_simulated_email(email.to_email, email.subject, email.body)
+            _terminer(email, EmailStatusEnum.SIMULATED)
+            continue
+        try:
+            message = email_service.build_message(email.to_email, email.subject, email.body)
+            connexion.envoyer(email.to_email, message.as_string())
+            _terminer(email, EmailStatusEnum.SENT)
+            email.sent_at = datetime.utcnow()
+            email.last_error = None
+        except Exception as e:
+            email.last_error = str(e)[:500]
+            prochaine_tentative = datetime.utcnow() + _delai_backoff(email.attempts)
+            if _erreur_definitive(e) or email.attempts >= MAX_ATTEMPTS:
+                _terminer(email, EmailStatusEnum.FAILED)
+                print(f"❌ Email {email.id} abandonné après {email.attempts} tentative(s): {e}")
+            else:
+                email.next_attempt_at = prochaine_tentative
+                print(f"⚠️ Email {email.id} replanifié (tentative {email.attempts}): {e}")
+            if not isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                # Serveur injoignable : connexion à refaire, et le reste du lot attend
+                # la même échéance (sans compter de tentative) au lieu d'enchaîner les timeouts
+                connexion.fermer()
+                for suivant in emails[i + 1:]:
+                    suivant.next_attempt_at = prochaine_tentative
+                db.commit()
+                return i + 1
+    db.commit()
+    return len(emails)
+
+
+# -----------------------------
+# 🧹 RÉTENTION
+# -----------------------------
+def purger(db: Session, maintenant: Optional[datetime] = None) -> int:
+    """Supprime les emails terminés depuis plus de RETENTION_JOURS ; retourne leur nombre"""
+    limite = (maintenant or datetime.utcnow()) - timedelta(days=RETENTION_JOURS)
+    supprimes = (
+        db.query(EmailOutbox)
+        .filter(EmailOutbox.status.in_(TERMINES), EmailOutbox.created_at < limite)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    if supprimes:
+        print(f"🧹 {supprimes} email(s) purgé(s) de l'outbox")
+    return supprimes
+
+
+# -----------------------------
+# 🧵 WORKER DE FOND
+# -----------------------------
+class OutboxWorker:
+    def __init__(self):
+        self._reveil = threading.Event()
+        self._arret = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._connexion = _ConnexionSMTP()
+        self._derniere_purge = 0.0
+
+    def demarrer(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._arret.clear()
+        self._thread = threading.Thread(target=self._boucle, name="email-outbox", daemon=True)
+        self._thread.start()
+
+    def arreter(self, timeout: float = 10):
+        self._arret.set()
+        self._reveil.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._connexion.fermer()
+
+    def reveiller(self):
+        """À appeler après le commit d'un email : évite d'attendre POLL_INTERVAL"""
+        self._reveil.set()
+
+    def _boucle(self):
+        while not self._arret.is_set():
+            self._reveil.clear()
+            traites = 0
+            db = SessionLocal()
+            try:
+                traites = traiter_lot(db, self._connexion)
+                if time.monotonic() - self._derniere_purge > PURGE_INTERVAL:
+                    purger(db)
+                    self._derniere_purge = time.monotonic()
+            except Exception as e:
+                db.rollback()
+                print(f"❌ Erreur worker outbox: {e}")
+            finally:
+                db.close()
+            if traites >= BATCH_SIZE:
+                continue  # file non vide : lot suivant tout de suite
+            self._connexion.fermer_si_inactive()
+            self._reveil.wait(POLL_INTERVAL)
+
+
+worker = OutboxWorker()
@@ -0,0 +1,98 @@
+# pagination.py
+"""
+Pagination par curseur (keyset) pour les routes de liste.
+
+Le curseur est opaque pour le client : base64 de la clé de tri du dernier
+élément de la page. La page suivante filtre sur cette clé au lieu d'un
+OFFSET, le coût reste donc constant quelle que soit la profondeur.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+
+PAGE_SIZE_DEFAULT = 100
+PAGE_SIZE_MAX = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encoder_curseur(valeurs: List) -> str:
+    brut = [v.isoformat() if isinstance(v, datetime) else v for v in valeurs]
+    return base64.urlsafe_b64encode(json.dumps(brut).encode()).decode()
+
+
+def decoder_curseur(curseur: str, colonnes: List) -> List:
+    try:
+        brut = json.loads(base64.urlsafe_b64decode(curseur.encode()))
+        if not isinstance(brut, list) or len(brut) != len(colonnes):
+            raise ValueError
+        return [
+            datetime.fromisoformat(v) if v is not None and _est_datetime(col) else v
+            for v, col in zip(brut, colonnes)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+
+
+def _est_datetime(colonne) -> bool:
+    try:
+        return colonne.type.python_type is datetime
+    except NotImplementedError:
+        return False
+
+
+def _apres(colonnes: List, valeurs: List, descendant: bool):
+    """(c1, c2) > (v1, v2) écrit sans row-value, compatible tous dialectes"""
+    colonne, valeur = colonnes[0], valeurs[0]
+    plus_loin = colonne < valeur if descendant else colonne > valeur
+    if len(colonnes) == 1:
+        return plus_loin
+    return or_(plus_loin, and_(colonne == valeur, _apres(colonnes[1:], valeurs[1:], descendant)))
+
+
+def paginer(
+    query,
+    colonnes: List,
+    limit: int = PAGE_SIZE_DEFAULT,
+    curseur: Optional[str] = None,
+    descendant: bool = False
+) -> Tuple[List, Optional[str]]:
+    """
+    Applique la pagination keyset à une requête ORM.
+    colonnes : clé de tri unique, ex. [Retrait.date_retrait, Retrait.id], colonnes
+    NOT NULL (col < NULL est toujours faux : une clé NULL en fin de page
+    masquerait toutes les lignes suivantes)
+    Retourne (items, curseur_suivant) ; curseur_suivant None sur la dernière page.
+    """
+    if curseur:
+        query = query.filter(_apres(colonnes, decoder_curseur(curseur, colonnes), descendant))
+    ordre = [c.desc() if descendant else c.asc() for c in colonnes]
+    items = query.order_by(*ordre).limit(limit + 1).all()
+
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    dernier = items[-1]
+    return items, encoder_curseur([getattr(dernier, c.key) for c in colonnes])
+
+
+def lister(
+    query,
+    response: Response,
+    colonnes: List,
+    limit: int,
+    curseur: Optional[str],
+    tout: bool = False,
+    descendant: bool = False
+) -> List:
+    """Page de résultats + en-tête X-Next-Cursor ; tout=True = ancienne liste complète"""
+    if tout:
+        ordre = [c.desc() if descendant else c.asc() for c in colonnes]
+        return query.order_by(*ordre).all()
+    items, suivant = paginer(query, colonnes, limit, curseur, descendant)
+    if suivant:
+        response.headers[NEXT_CURSOR_HEADER] = suivant
+    return items
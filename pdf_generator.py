@@ -10,8 +10,10 @@ from reportlab.lib.units import inch
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.enums import TA_CENTER
 from datetime import datetime
+from types import SimpleNamespace
 from typing import List
 import io
+import os
 
 
 def get_category(article):
@@ -310,4 +312,33 @@ def create_category_report_pdf(categories_stats: List) -> bytes:
     pdf_content = buffer.getvalue()
     buffer.close()
     
-    return pdf_content
\ No newline at end of file
+    return pdf_content
+
+# ============================================================
+# RENDU HORS PROCESSUS (jobs d'export, voir exports.py)
+# ============================================================
+# Point d'entrée exécuté dans un processus du ProcessPoolExecutor : les
+# données arrivent en dict (picklables), aucun accès BDD ici.
+def render_report_to_file(rapport: str, donnees: dict, chemin: str) -> int:
+    """
+    Génère le rapport `rapport` et l'écrit dans `chemin`.
+
+    Returns:
+        int: Taille du fichier en octets
+    """
+    articles = [SimpleNamespace(**a) for a in donnees.get("articles", [])]
+    if rapport in ("inventory", "custom"):
+        pdf_content = create_inventory_pdf(articles, donnees.get("stats"))
+    elif rapport == "low-stock":
+        pdf_content = create_low_stock_alert_pdf(articles)
+    elif rapport == "categories":
+        pdf_content = create_category_report_pdf(donnees["categories"])
+    else:
+        raise ValueError(f"Rapport inconnu : {rapport}")
+
+    # Écriture atomique : le fichier n'apparaît complet qu'une fois renommé
+    temporaire = f"{chemin}.part"
+    with open(temporaire, "wb") as f:
+        f.write(pdf_content)
+    os.replace(temporaire, chemin)
+    return len(pdf_content)
@@ -0,0 +1,231 @@
+# pdf_stream.py
+"""
+Export PDF de l'inventaire en flux (mémoire constante).
+
+platypus construit tout le document en mémoire avant d'écrire le premier
+octet. Ici le PDF est écrit objet par objet : chaque page est émise dès
+qu'elle est pleine, seuls les offsets des objets (xref) sont conservés
+jusqu'à la fin. Polices standard (Helvetica), aucune police embarquée.
+"""
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+PAGE_W, PAGE_H = 595.28, 841.89   # A4 en points
+MARGE = 30
+HAUTEUR_LIGNE = 14
+TAILLE_POLICE = 8
+
+# Colonnes : (titre, x gauche, largeur, alignement)
+COLONNES = [
+    ("Réf", MARGE, 72, "g"),
+    ("Nom", MARGE + 72, 158, "g"),
+    ("Catégorie", MARGE + 230, 94, "g"),
+    ("Qté", MARGE + 324, 43, "d"),
+    ("Prix Unit.", MARGE + 367, 72, "d"),
+    ("Valeur", MARGE + 439, 96, "d"),
+]
+LARGEUR_TABLEAU = sum(c[2] for c in COLONNES)
+
+# Couleurs RGB (0-1) reprises de pdf_generator.create_inventory_pdf
+BLEU = (0.145, 0.388, 0.922)
+BLEU_TITRE = (0.118, 0.227, 0.541)
+GRIS_CLAIR = (0.93, 0.93, 0.93)
+ROUGE_FOND = (0.996, 0.886, 0.886)
+ROUGE_TEXTE = (0.863, 0.149, 0.149)
+JAUNE = (0.984, 0.749, 0.141)
+
+# Objets fixes ; les pages sont numérotées à partir de 5
+OBJ_CATALOG, OBJ_PAGES, OBJ_FONT, OBJ_FONT_BOLD = 1, 2, 3, 4
+
+
+def _texte_pdf(texte: str) -> bytes:
+    """Chaîne littérale PDF en WinAnsi (cp1252), caractères hors jeu remplacés"""
+    brut = texte.encode("cp1252", errors="replace")
+    return b"(" + brut.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+def _euros(valeur: float) -> str:
+    return f"{valeur:.2f}€"
+
+
+class _Page:
+    """Opérateurs de dessin d'une page (flux de contenu)"""
+
+    def __init__(self):
+        self.ops: List[bytes] = []
+
+    def rect(self, x, y, w, h, fond=None, bord=None):
+        if fond:
+            self.ops.append(b"%.3f %.3f %.3f rg %.2f %.2f %.2f %.2f re f" % (*fond, x, y, w, h))
+        if bord:
+            self.ops.append(b"%.3f %.3f %.3f RG 0.5 w %.2f %.2f %.2f %.2f re S" % (*bord, x, y, w, h))
+
+    def texte(self, x, y, texte, taille=TAILLE_POLICE, gras=False, couleur=(0, 0, 0), align="g", largeur=0):
+        police = "Helvetica-Bold" if gras else "Helvetica"
+        if align == "d":
+            x = x + largeur - 3 - stringWidth(texte, police, taille)
+        elif align == "c":
+            x = x + (largeur - stringWidth(texte, police, taille)) / 2
+        else:
+            x = x + 3
+        self.ops.append(
+            b"BT /F%d %.1f Tf %.3f %.3f %.3f rg %.2f %.2f Td %s Tj ET"
+            % (2 if gras else 1, taille, *couleur, x, y, _texte_pdf(texte))
+        )
+
+    def contenu(self) -> bytes:
+        return zlib.compress(b"\n".join(self.ops))
+
+
+class _EcrivainPDF:
+    """Sérialise les objets au fil de l'eau et retient leurs offsets"""
+
+    def __init__(self):
+        self.offset = 0
+        self.offsets: Dict[int, int] = {}
+        self.pages: List[int] = []
+        self.prochain_id = 5
+
+    def _emettre(self, donnees: bytes) -> bytes:
+        self.offset += len(donnees)
+        return donnees
+
+    def entete(self) -> bytes:
+        return self._emettre(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def objet(self, num: int, corps: bytes) -> bytes:
+        self.offsets[num] = self.offset
+        return self._emettre(b"%d 0 obj\n" % num + corps + b"\nendobj\n")
+
+    def page(self, page: _Page) -> bytes:
+        contenu = page.contenu()
+        id_contenu, id_page = self.prochain_id, self.prochain_id + 1
+        self.prochain_id += 2
+        self.pages.append(id_page)
+        return self.objet(
+            id_contenu,
+            b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(contenu) + contenu + b"\nendstream"
+        ) + self.objet(
+            id_page,
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] "
+            b"/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> /Contents %d 0 R >>"
+            % (OBJ_PAGES, PAGE_W, PAGE_H, OBJ_FONT, OBJ_FONT_BOLD, id_contenu)
+        )
+
+    def polices(self) -> bytes:
+        police = b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>"
+        return self.objet(OBJ_FONT, police % b"Helvetica") + self.objet(OBJ_FONT_BOLD, police % b"Helvetica-Bold")
+
+    def fin(self) -> bytes:
+        kids = b" ".join(b"%d 0 R" % p for p in self.pages)
+        sortie = self.objet(OBJ_PAGES, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.pages)))
+        sortie += self.objet(OBJ_CATALOG, b"<< /Type /Catalog /Pages %d 0 R >>" % OBJ_PAGES)
+        debut_xref = self.offset
+        taille = self.prochain_id
+        lignes = [b"xref\n0 %d\n" % taille, b"0000000000 65535 f \n"]
+        lignes += [b"%010d 00000 n \n" % self.offsets[num] for num in range(1, taille)]
+        lignes.append(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (taille, OBJ_CATALOG, debut_xref))
+        return sortie + self._emettre(b"".join(lignes))
+
+
+def _entete_tableau(page: _Page, y: float):
+    page.rect(MARGE, y - 4, LARGEUR_TABLEAU, HAUTEUR_LIGNE + 2, fond=BLEU)
+    for titre, x, largeur, _ in COLONNES:
+        page.texte(x, y, titre, taille=9, gras=True, couleur=(1, 1, 1), align="c", largeur=largeur)
+
+
+def _pied_de_page(page: _Page, numero: int):
+    page.texte(0, 15, f"Page {numero}", taille=8, couleur=(0.4, 0.4, 0.4), align="c", largeur=PAGE_W)
+
+
+def stream_inventory_pdf(
+    lignes: Iterable[Tuple[Optional[str], str, Optional[str], int, Optional[float]]],
+    stats: Dict,
+    seuil_alerte: int = 10
+) -> Iterator[bytes]:
+    """
+    Génère l'inventaire page par page.
+
+    Args:
+        lignes: itérable de (reference, nom, category, quantite, prix_unitaire),
+                consommé une seule fois (ex: curseur serveur)
+        stats: total_articles, stock_total, alertes_stock_faible, categories
+
+    Yields:
+        bytes: morceaux successifs du fichier PDF
+    """
+    pdf = _EcrivainPDF()
+    yield pdf.entete() + pdf.polices()
+
+    # Page 1 : titre + synthèse
+    page, numero = _Page(), 1
+    y = PAGE_H - MARGE - 24
+    page.texte(0, y, "INVENTAIRE DU STOCK", taille=22, gras=True, couleur=BLEU_TITRE, align="c", largeur=PAGE_W)
+    y -= 22
+    date_str = datetime.now().strftime("%d/%m/%Y à %H:%M")
+    page.texte(0, y, f"Généré le {date_str}", taille=9, align="c", largeur=PAGE_W)
+    y -= 30
+    synthese = [
+        ("Total articles", stats.get("total_articles", 0)),
+        ("Stock total", stats.get("stock_total", 0)),
+        ("Alertes stock faible", stats.get("alertes_stock_faible", 0)),
+        ("Catégories", stats.get("categories", 0)),
+    ]
+    for libelle, valeur in synthese:
+        page.rect(MARGE + 120, y - 4, 295, HAUTEUR_LIGNE + 2, fond=GRIS_CLAIR, bord=(0.5, 0.5, 0.5))
+        page.texte(MARGE + 120, y, libelle, taille=9, gras=True)
+        page.texte(MARGE + 270, y, str(valeur), taille=9, align="d", largeur=145)
+        y -= HAUTEUR_LIGNE + 2
+    y -= 20
+    page.texte(MARGE, y, "DÉTAIL DE L'INVENTAIRE", taille=13, gras=True, couleur=BLEU_TITRE)
+    y -= 22
+    _entete_tableau(page, y)
+    y -= HAUTEUR_LIGNE + 2
+
+    total_valeur = 0.0
+    for i, (reference, nom, categorie, quantite, prix) in enumerate(lignes):
+        if y < MARGE + 20:
+            _pied_de_page(page, numero)
+            yield pdf.page(page)
+            page, numero = _Page(), numero + 1
+            y = PAGE_H - MARGE - HAUTEUR_LIGNE
+            _entete_tableau(page, y)
+            y -= HAUTEUR_LIGNE + 2
+
+        quantite = quantite or 0
+        prix = prix or 0.0
+        valeur = quantite * prix
+        total_valeur += valeur
+
+        if i % 2:
+            page.rect(MARGE, y - 4, LARGEUR_TABLEAU, HAUTEUR_LIGNE, fond=GRIS_CLAIR)
+        alerte = quantite <= seuil_alerte
+        if alerte:
+            x_qte, l_qte = COLONNES[3][1], COLONNES[3][2]
+            page.rect(x_qte, y - 4, l_qte, HAUTEUR_LIGNE, fond=ROUGE_FOND)
+        cellules = [(reference or "N/A")[:14], (nom or "")[:30], (categorie or "N/A")[:20],
+                    str(quantite), _euros(prix), _euros(valeur)]
+        for col, ((_, x, largeur, align), texte) in enumerate(zip(COLONNES, cellules)):
+            couleur = ROUGE_TEXTE if alerte and col == 3 else (0, 0, 0)
+            page.texte(x, y, texte, couleur=couleur, align=align, largeur=largeur)
+        y -= HAUTEUR_LIGNE
+
+    # Ligne de total (+ page suivante si plus de place)
+    if y < MARGE + 40:
+        _pied_de_page(page, numero)
+        yield pdf.page(page)
+        page, numero = _Page(), numero + 1
+        y = PAGE_H - MARGE - HAUTEUR_LIGNE
+    page.rect(MARGE, y - 5, LARGEUR_TABLEAU, HAUTEUR_LIGNE + 3, fond=JAUNE)
+    page.texte(COLONNES[4][1], y, "TOTAL:", taille=10, gras=True, align="d", largeur=COLONNES[4][2])
+    page.texte(COLONNES[5][1], y, _euros(total_valeur), taille=10, gras=True, align="d", largeur=COLONNES[5][2])
+    y -= 30
+    page.texte(MARGE, y, "Ce rapport a été généré automatiquement par le système de gestion de stock", taille=8,
+               couleur=(0.3, 0.3, 0.3))
+    _pied_de_page(page, numero)
+    yield pdf.page(page)
+
+    yield pdf.fin()
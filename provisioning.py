@@ -0,0 +1,214 @@
+# provisioning.py
+"""
+Création en masse d'utilisateurs (onboarding d'une entreprise).
+
+Un lot = une transaction : validation ligne par ligne, une requête pour les
+noms déjà pris, mots de passe temporaires hachés en parallèle sur le pool
+bcrypt, un seul INSERT multi-lignes. Les emails de bienvenue sont écrits
+dans l'outbox et le rapport du lot dans provisioning_jobs (même
+transaction) ; l'avancement se consulte via le job_id, depuis n'importe quel
+worker, pendant PROVISIONING_JOB_TTL.
+"""
+import csv
+import io
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import auth
+import crud
+import outbox
+from email_service import generate_temp_password
+from models import Company, EmailOutbox, EmailStatusEnum, ProvisioningJob, RoleEnum
+
+load_dotenv()
+
+PROVISIONING_JOB_TTL = int(os.getenv("PROVISIONING_JOB_TTL", str(7 * 24 * 3600)))  # secondes
+
+
+# -----------------------------
+# 📄 LECTURE CSV
+# -----------------------------
+def lire_csv(contenu: bytes) -> List[Dict[str, str]]:
+    """
+    CSV avec en-tête `username,email` (séparateur , ou ;, BOM Excel toléré).
+    Retourne une liste de {username, email}.
+    """
+    try:
+        texte = contenu.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Le fichier doit être encodé en UTF-8")
+
+    premiere_ligne = texte.split("\n", 1)[0]
+    separateur = ";" if premiere_ligne.count(";") > premiere_ligne.count(",") else ","
+    lecteur = csv.DictReader(io.StringIO(texte), delimiter=separateur)
+    colonnes = {(c or "").strip().lower() for c in (lecteur.fieldnames or [])}
+    if not {"username", "email"} <= colonnes:
+        raise HTTPException(status_code=400, detail="Colonnes attendues : username, email")
+
+    return [
+        {
+            "username": (ligne.get("username") or "").strip(),
+            "email": (ligne.get("email") or "").strip(),
+        }
+        for ligne in (
+            {(k or "").strip().lower(): v for k, v in brut.items()} for brut in lecteur
+        )
+        if any(ligne.values())
+    ]
+
+
+# -----------------------------
+# 👥 CRÉATION DU LOT
+# -----------------------------
+def _statut_ligne(username: str, email: str, vus: set, pris: set) -> Tuple[str, str]:
+    if not username:
+        return "invalide", "Nom d'utilisateur vide"
+    if "@" not in email:
+        return "invalide", "Email invalide"
+    if username in vus:
+        return "doublon", "Nom d'utilisateur répété dans le lot"
+    if username in pris:
+        return "existe_deja", "Ce nom d'utilisateur existe déjà"
+    return "cree", None
+
+
+def provisionner_utilisateurs(
+    db: Session,
+    company: Company,
+    lignes: List[Dict[str, str]]
+) -> Dict:
+    """
+    Crée les utilisateurs valides du lot et leurs emails de bienvenue en
+    UNE transaction, avec le rapport du lot. Les mots de passe en clair ne
+    vivent que dans l'email (outbox), jamais dans le job.
+    """
+    lignes = [
+        {"username": l["username"].strip(), "email": l["email"].strip()}
+        for l in lignes
+    ]
+    pris = crud.get_usernames_existants(db, [l["username"] for l in lignes if l["username"]])
+
+    resultats, vus = [], set()
+    for i, ligne in enumerate(lignes, start=1):
+        statut, detail = _statut_ligne(ligne["username"], ligne["email"], vus, pris)
+        if ligne["username"]:
+            vus.add(ligne["username"])
+        resultats.append({
+            "ligne": i,
+            "username": ligne["username"],
+            "email": ligne["email"],
+            "statut": statut,
+            "detail": detail,
+            "user_id": None,
+            "outbox_id": None,
+            "email_statut": None,
+        })
+
+    a_creer = [r for r in resultats if r["statut"] == "cree"]
+    mots_de_passe = [generate_temp_password() for _ in a_creer]
+    hashes = auth.hash_passwords(mots_de_passe)
+
+    try:
+        ids = crud.create_users_bulk(db, [
+            {
+                "username": r["username"],
+                "email": r["email"],
+                "password_hash": h,
+                "role": RoleEnum.USER,
+                "company_id": company.id,
+                "first_login": True,
+                "password_reset_required": False,
+            }
+            for r, h in zip(a_creer, hashes)
+        ])
+        emails = [
+            outbox.enqueue_welcome_email(
+                db,
+                username=r["username"],
+                email=r["email"],
+                temp_password=mot_de_passe,
+                role="user",
+                company_name=company.name
+            )
+            for r, mot_de_passe in zip(a_creer, mots_de_passe)
+        ]
+        db.flush()
+        for r, user_id, email in zip(a_creer, ids, emails):
+            r["user_id"] = user_id
+            r["outbox_id"] = email.id
+        maintenant = datetime.utcnow()
+        job = ProvisioningJob(
+            id=uuid.uuid4().hex,
+            company_id=company.id,
+            date_creation=maintenant,
+            expire_le=maintenant + timedelta(seconds=PROVISIONING_JOB_TTL),
+            total=len(resultats),
+            crees=len(a_creer),
+            lignes=json.dumps(resultats),
+        )
+        db.add(job)
+        db.commit()
+    except IntegrityError:
+        # Un nom a été pris entre la vérification et l'insertion : rien n'est créé
+        db.rollback()
+        raise HTTPException(
+            status_code=409,
+            detail="Conflit : un nom d'utilisateur du lot vient d'être créé, relancez l'import"
+        )
+    outbox.worker.reveiller()
+
+    print(f"👥 Lot {job.id} : {job.crees}/{job.total} utilisateurs créés")
+    return _avec_statut_emails(db, job)
+
+
+# -----------------------------
+# 📧 SUIVI DES EMAILS
+# -----------------------------
+def _avec_statut_emails(db: Session, job: ProvisioningJob) -> Dict:
+    """Job avec le statut courant de chaque email (une requête IN)"""
+    lignes = json.loads(job.lignes)
+    outbox_ids = [l["outbox_id"] for l in lignes if l["outbox_id"]]
+    statuts = dict(
+        db.query(EmailOutbox.id, EmailOutbox.status)
+        .filter(EmailOutbox.id.in_(outbox_ids))
+        .all()
+    ) if outbox_ids else {}
+    lignes = [
+        {**l, "email_statut": statuts[l["outbox_id"]].value if l["outbox_id"] in statuts else None}
+        for l in lignes
+    ]
+    en_attente = sum(1 for l in lignes if l["email_statut"] == EmailStatusEnum.PENDING.value)
+    return {
+        "job_id": job.id,
+        "company_id": job.company_id,
+        "date_creation": job.date_creation,
+        "total": job.total,
+        "crees": job.crees,
+        "emails_en_attente": en_attente,
+        "lignes": lignes,
+    }
+
+
+def purger_expires(db: Session):
+    """Supprime les lots dont la rétention est dépassée"""
+    supprimes = (
+        db.query(ProvisioningJob)
+        .filter(ProvisioningJob.expire_le <= datetime.utcnow())
+        .delete(synchronize_session=False)
+    )
+    if supprimes:
+        db.commit()
+
+
+def get_job(db: Session, job_id: str) -> Optional[Dict]:
+    purger_expires(db)
+    job = db.get(ProvisioningJob, job_id)
+    return _avec_statut_emails(db, job) if job else None
@@ -0,0 +1,247 @@
+# report_cache.py
+"""
+Cache disque des rapports PDF générés.
+
+Clé = SHA-256 de (type de rapport, paramètres, version des données de
+l'entreprise). La version vit en base (table donnees_versions) et est
+incrémentée juste avant le commit de toute écriture sur articles/retraits,
+dans la même transaction : tous les workers lisent la même version, un
+rapport en cache ne survit donc pas à une écriture, quel que soit le
+processus qui l'a faite. Rien à invalider explicitement.
+
+Un hit coûte une lecture de version (clé primaire) et une recherche dans
+un dict : 304 si l'ETag du client correspond, sinon envoi du fichier.
+Taille bornée (REPORT_CACHE_MAX_MB), éviction LRU. L'index des fichiers
+est en mémoire : un sous-dossier par processus, vidé à chaque démarrage.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+from itertools import chain
+from threading import Lock
+from typing import Callable, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import Article, DonneesVersion, Retrait
+
+load_dotenv()
+
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "stock-report-cache")
+REPORT_CACHE_MAX_MB = int(os.getenv("REPORT_CACHE_MAX_MB", "200"))
+
+TOUTES_ENTREPRISES = "*"  # portée des rapports non filtrés par entreprise
+
+_MARQUES = "report_cache_entreprises"  # clé de session.info
+
+
+# -----------------------------
+# 🔢 VERSION DES DONNÉES
+# -----------------------------
+SANS_ENTREPRISE = 0  # ligne de donnees_versions des articles sans entreprise
+
+
+def version_donnees(db: Session, company_id=TOUTES_ENTREPRISES) -> int:
+    """Version partagée (base) ; TOUTES_ENTREPRISES = somme de toutes les lignes"""
+    if company_id == TOUTES_ENTREPRISES:
+        requete = select(func.coalesce(func.sum(DonneesVersion.version), 0))
+    else:
+        requete = select(DonneesVersion.version).where(
+            DonneesVersion.company_id == (SANS_ENTREPRISE if company_id is None else company_id)
+        )
+    return db.execute(requete).scalar() or 0
+
+
+def marquer_modification(db: Session, company_id: Optional[int]):
+    """Écriture hors ORM (UPDATE/INSERT en masse) : version incrémentée au commit"""
+    db.info.setdefault(_MARQUES, set()).add(SANS_ENTREPRISE if company_id is None else company_id)
+
+
+def incrementer_versions(db: Session, entreprises):
+    """+1 sur la version de chaque entreprise (triées : ordre de verrouillage stable)"""
+    table = DonneesVersion.__table__
+    dialecte = db.get_bind().dialect
+    for company_id in sorted(entreprises):
+        if dialecte.name in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialecte.name == "postgresql" else sqlite.insert
+            stmt = insert(table).values(company_id=company_id, version=1)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=["company_id"], set_={"version": table.c.version + 1}
+            ))
+        elif db.execute(
+            update(table).where(table.c.company_id == company_id).values(version=table.c.version + 1)
+        ).rowcount == 0:
+            db.execute(table.insert().values(company_id=company_id, version=1))
+
+
+@event.listens_for(Session, "after_flush")
+def _noter_objets_modifies(session, flush_context):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (Article, Retrait)):
+            marquer_modification(session, obj.company_id)
+            # Article/retrait déplacé d'entreprise : l'ancienne aussi
+            for ancien in inspect(obj).attrs.company_id.history.deleted or ():
+                marquer_modification(session, ancien)
+
+
+@event.listens_for(Session, "before_commit")
+def _incrementer_avant_commit(session):
+    # Flush d'abord : les dernières écritures ORM marquent leur entreprise
+    session.flush()
+    entreprises = session.info.pop(_MARQUES, None)
+    if entreprises:
+        incrementer_versions(session, entreprises)
+
+
+@event.listens_for(Session, "after_rollback")
+def _oublier_marques(session):
+    session.info.pop(_MARQUES, None)
+
+
+# -----------------------------
+# 💾 CACHE DISQUE LRU
+# -----------------------------
+class _CacheDisque:
+    def __init__(self, dossier: str, taille_max: int):
+        self.dossier = dossier
+        self.taille_max = taille_max
+        self._entrees: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()  # clé -> (etag, taille)
+        self._taille = 0
+        self._lock = Lock()
+
+    def chemin(self, cle: str) -> str:
+        return os.path.join(self.dossier, f"{cle}.pdf")
+
+    def get(self, cle: str) -> Optional[str]:
+        """ETag de l'entrée (marquée récemment utilisée), None si absente"""
+        with self._lock:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                return None
+            self._entrees.move_to_end(cle)
+            return entree[0]
+
+    def put(self, cle: str, contenu: bytes) -> str:
+        etag = hashlib.sha256(contenu).hexdigest()[:32]
+        if len(contenu) > self.taille_max:
+            return etag
+        os.makedirs(self.dossier, exist_ok=True)
+        temporaire = f"{self.chemin(cle)}.{os.getpid()}.part"
+        with open(temporaire, "wb") as f:
+            f.write(contenu)
+        os.replace(temporaire, self.chemin(cle))
+
+        a_supprimer = []
+        with self._lock:
+            ancienne = self._entrees.pop(cle, None)
+            if ancienne:
+                self._taille -= ancienne[1]
+            self._entrees[cle] = (etag, len(contenu))
+            self._taille += len(contenu)
+            while self._taille > self.taille_max:
+                vieille_cle, (_, taille) = self._entrees.popitem(last=False)
+                self._taille -= taille
+                a_supprimer.append(vieille_cle)
+        for vieille_cle in a_supprimer:
+            try:
+                os.remove(self.chemin(vieille_cle))
+            except FileNotFoundError:
+                pass
+        return etag
+
+    def vider(self):
+        with self._lock:
+            self._entrees.clear()
+            self._taille = 0
+        shutil.rmtree(self.dossier, ignore_errors=True)
+
+    def purger_orphelins(self):
+        """Au démarrage : dossiers laissés par des workers (pid) qui ne tournent plus"""
+        parent = os.path.dirname(self.dossier)
+        for nom in os.listdir(parent) if os.path.isdir(parent) else ():
+            if not nom.isdigit() or int(nom) == os.getpid():
+                continue
+            try:
+                os.kill(int(nom), 0)
+            except ProcessLookupError:
+                shutil.rmtree(os.path.join(parent, nom), ignore_errors=True)
+            except PermissionError:
+                pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entrees": len(self._entrees), "octets": self._taille, "max_octets": self.taille_max}
+
+
+# Index des fichiers en mémoire : un sous-dossier par processus
+# (les versions, elles, sont partagées en base)
+cache = _CacheDisque(os.path.join(REPORT_CACHE_DIR, str(os.getpid())), REPORT_CACHE_MAX_MB * 1024 * 1024)
+
+
+def demarrer():
+    cache.vider()
+    cache.purger_orphelins()
+
+
+def arreter():
+    cache.vider()
+
+
+# -----------------------------
+# 📄 RÉPONSE HTTP
+# -----------------------------
+def cle_rapport(db: Session, rapport: str, params: Dict, company_id=TOUTES_ENTREPRISES) -> str:
+    brut = json.dumps(
+        [rapport, sorted(params.items()), company_id, version_donnees(db, company_id)],
+        default=str
+    )
+    return hashlib.sha256(brut.encode()).hexdigest()
+
+
+def _etag_correspond(request: Request, etag: str) -> bool:
+    valeurs = request.headers.get("if-none-match")
+    if not valeurs:
+        return False
+    return any(v.strip().removeprefix("W/") in (f'"{etag}"', "*") for v in valeurs.split(","))
+
+
+def reponse_pdf(
+    request: Request,
+    db: Session,
+    rapport: str,
+    params: Dict,
+    rendre: Callable[[], bytes],
+    nom_fichier: str,
+    company_id=TOUTES_ENTREPRISES
+) -> Response:
+    """
+    Sert le rapport depuis le cache (304 ou fichier), sinon appelle `rendre()`
+    et met le résultat en cache. Les erreurs de `rendre` (404...) ne sont pas cachées.
+    """
+    cle = cle_rapport(db, rapport, params, company_id)
+    entetes = {"Cache-Control": "private, no-cache"}
+
+    etag = cache.get(cle)
+    if etag is not None:
+        entetes["ETag"] = f'"{etag}"'
+        if _etag_correspond(request, etag):
+            return Response(status_code=304, headers=entetes)
+        chemin = cache.chemin(cle)
+        if os.path.exists(chemin):
+            return FileResponse(chemin, media_type="application/pdf", filename=nom_fichier, headers=entetes)
+
+    contenu = rendre()
+    etag = cache.put(cle, contenu)
+    entetes["ETag"] = f'"{etag}"'
+    if _etag_correspond(request, etag):
+        return Response(status_code=304, headers=entetes)
+    entetes["Content-Disposition"] = f"attachment; filename={nom_fichier}"
+    return Response(content=contenu, media_type="application/pdf", headers=entetes)
@@ -0,0 +1,275 @@
+# retrait_rollups.py
+"""
+Agrégats journaliers des retraits (tableaux de bord de consommation).
+
+Les journées closes (UTC) sont consolidées dans retrait_rollups_jour :
+une ligne par (jour, entreprise, article, utilisateur) avec nombre de
+retraits, quantité et poids. Le dernier jour consolidé est conservé dans
+rollup_etats ; une requête sur une période lit les rollups jusqu'à ce jour
+puis seulement les retraits bruts postérieurs (la journée en cours quand
+le worker est à jour).
+
+- Backfill / rattrapage : consolider() (thread de fond ou `python retrait_rollups.py`)
+- Reconstruction complète : `python retrait_rollups.py --reconstruire`
+"""
+import os
+import sys
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, func, insert, null, select
+from sqlalchemy.orm import Session
+
+from database import SessionLocal
+from models import Article, Retrait, RetraitRollupJour, RollupEtat, User
+from verrous import verrouiller_etat
+
+load_dotenv()
+
+ROLLUP_WORKER = os.getenv("RETRAIT_ROLLUP_WORKER", "true").lower() in ("1", "true", "yes")
+ROLLUP_INTERVAL = float(os.getenv("RETRAIT_ROLLUP_INTERVAL", "3600"))  # secondes
+JOURS_PAR_LOT = 31  # jours consolidés par transaction (backfill)
+
+ETAT = "retraits_jour"
+PERIODES = ("jour", "semaine", "mois", "total")
+AXES = ("aucun", "article", "utilisateur")
+
+
+# Une journée n'est consolidée qu'après cette marge : les retraits datés de
+# 23:59 mais commités juste après minuit sont bien comptés
+MARGE_CLOTURE = timedelta(minutes=10)
+
+
+def _hier() -> date:
+    return (datetime.utcnow() - MARGE_CLOTURE).date() - timedelta(days=1)
+
+
+def _debut_jour(jour: date) -> datetime:
+    return datetime.combine(jour, datetime.min.time())
+
+
+# -----------------------------
+# 🔄 CONSOLIDATION
+# -----------------------------
+def _consolider_jours(db: Session, debut: date, fin: date):
+    """(Re)calcule les rollups des jours debut..fin inclus, dans la transaction courante"""
+    jour = func.date(Retrait.date_retrait)
+    db.execute(delete(RetraitRollupJour).where(RetraitRollupJour.jour.between(debut, fin)))
+    db.execute(
+        insert(RetraitRollupJour).from_select(
+            ["jour", "company_id", "article_id", "user_id", "nombre_retraits", "quantite_totale", "poids_total"],
+            select(
+                jour,
+                Retrait.company_id,
+                Retrait.article_id,
+                Retrait.user_id,
+                func.count(Retrait.id),
+                func.coalesce(func.sum(Retrait.quantite), 0),
+                func.coalesce(func.sum(Retrait.poids_total), 0.0),
+            )
+            .where(
+                Retrait.date_retrait >= _debut_jour(debut),
+                Retrait.date_retrait < _debut_jour(fin + timedelta(days=1))
+            )
+            .group_by(jour, Retrait.company_id, Retrait.article_id, Retrait.user_id)
+        )
+    )
+
+
+def consolider(db: Session, jusqu_au: Optional[date] = None) -> int:
+    """
+    Consolide les journées closes non encore traitées jusqu'à `jusqu_au`
+    (défaut : hier UTC), par lots de JOURS_PAR_LOT jours. Premier appel =
+    backfill depuis le plus ancien retrait. Retourne le nombre de jours traités.
+    """
+    jusqu_au = jusqu_au or _hier()
+    traites = 0
+    while True:
+        etat = verrouiller_etat(db, ETAT)
+        if etat.jour_consolide is not None:
+            debut = etat.jour_consolide + timedelta(days=1)
+        else:
+            premier = db.query(func.min(Retrait.date_retrait)).scalar()
+            debut = premier.date() if premier else jusqu_au + timedelta(days=1)
+        if debut > jusqu_au:
+            if etat.jour_consolide is None:
+                etat.jour_consolide = jusqu_au  # aucun retrait : rien à consolider
+            db.commit()
+            return traites
+        fin = min(jusqu_au, debut + timedelta(days=JOURS_PAR_LOT - 1))
+        _consolider_jours(db, debut, fin)
+        etat.jour_consolide = fin
+        db.commit()
+        traites += (fin - debut).days + 1
+
+
+def reconstruire(db: Session) -> int:
+    """Supprime tous les rollups et refait le backfill complet"""
+    etat = verrouiller_etat(db, ETAT)
+    db.execute(delete(RetraitRollupJour))
+    etat.jour_consolide = None
+    db.commit()
+    return consolider(db)
+
+
+def jour_consolide(db: Session) -> Optional[date]:
+    return db.query(RollupEtat.jour_consolide).filter(RollupEtat.nom == ETAT).scalar()
+
+
+# -----------------------------
+# 📊 REQUÊTES
+# -----------------------------
+def _periode(jour: date, periode: str) -> Optional[date]:
+    if periode == "semaine":
+        return jour - timedelta(days=jour.weekday())  # lundi
+    if periode == "mois":
+        return jour.replace(day=1)
+    if periode == "total":
+        return None
+    return jour
+
+
+def _en_date(valeur) -> date:
+    # func.date() renvoie une chaîne sous SQLite, une date sous PostgreSQL
+    return date.fromisoformat(valeur) if isinstance(valeur, str) else valeur
+
+
+def consommation(
+    db: Session,
+    company_id: Optional[int],
+    debut: Optional[date] = None,
+    fin: Optional[date] = None,
+    periode: str = "jour",
+    par: str = "aucun",
+    article_id: Optional[int] = None,
+    user_id: Optional[int] = None
+) -> List[Dict]:
+    """
+    Consommation agrégée sur [debut, fin] (jours UTC inclus, None = sans borne)
+    par période et éventuellement par article ou utilisateur.
+    company_id=None : toutes les entreprises.
+    """
+    consolide = jour_consolide(db)
+    cumul: Dict[tuple, List] = {}
+
+    def ajouter(lignes):
+        for jour, cle, nombre, quantite, poids in lignes:
+            k = (_periode(_en_date(jour), periode), cle)
+            acc = cumul.setdefault(k, [0, 0, 0.0])
+            acc[0] += nombre
+            acc[1] += quantite or 0
+            acc[2] += poids or 0.0
+
+    def requete(modele, jour, axe_article, axe_user, nombre, quantite, poids):
+        cle = {"article": axe_article, "utilisateur": axe_user}.get(par)
+        query = db.query(jour, cle if cle is not None else null(), nombre, quantite, poids)
+        if company_id is not None:
+            query = query.filter(modele.company_id == company_id)
+        if article_id is not None:
+            query = query.filter(axe_article == article_id)
+        if user_id is not None:
+            query = query.filter(axe_user == user_id)
+        return query, [jour] + ([cle] if cle is not None else [])
+
+    # 1) Jours consolidés : rollups
+    if consolide is not None and (debut is None or debut <= consolide):
+        R = RetraitRollupJour
+        query, group_by = requete(
+            R, R.jour, R.article_id, R.user_id,
+            func.sum(R.nombre_retraits), func.sum(R.quantite_totale), func.sum(R.poids_total)
+        )
+        query = query.filter(R.jour <= (min(fin, consolide) if fin else consolide))
+        if debut is not None:
+            query = query.filter(R.jour >= debut)
+        ajouter(query.group_by(*group_by).all())
+
+    # 2) Jours non consolidés : retraits bruts
+    debut_brut = consolide + timedelta(days=1) if consolide is not None else None
+    if debut is not None and (debut_brut is None or debut > debut_brut):
+        debut_brut = debut
+    if fin is None or debut_brut is None or debut_brut <= fin:
+        jour = func.date(Retrait.date_retrait)
+        query, group_by = requete(
+            Retrait, jour, Retrait.article_id, Retrait.user_id,
+            func.count(Retrait.id), func.sum(Retrait.quantite), func.sum(Retrait.poids_total)
+        )
+        if debut_brut is not None:
+            query = query.filter(Retrait.date_retrait >= _debut_jour(debut_brut))
+        if fin is not None:
+            query = query.filter(Retrait.date_retrait < _debut_jour(fin + timedelta(days=1)))
+        ajouter(query.group_by(*group_by).all())
+
+    # Libellés (une requête)
+    noms = {}
+    cles = {cle for _, cle in cumul if cle is not None}
+    if cles and par == "article":
+        noms = dict(db.query(Article.id, Article.nom).filter(Article.id.in_(cles)))
+    elif cles and par == "utilisateur":
+        noms = dict(db.query(User.id, User.username).filter(User.id.in_(cles)))
+
+    resultats = []
+    for (debut_periode, cle), (nombre, quantite, poids) in sorted(
+        cumul.items(), key=lambda kv: (kv[0][0] or date.min, kv[0][1] is None, kv[0][1] or 0)
+    ):
+        ligne = {"periode": debut_periode, "nombre_retraits": nombre,
+                 "quantite_totale": quantite, "poids_total": round(poids, 3)}
+        if par == "article":
+            ligne.update(article_id=cle, article_nom=noms.get(cle))
+        elif par == "utilisateur":
+            ligne.update(user_id=cle, utilisateur=noms.get(cle))
+        resultats.append(ligne)
+    return resultats
+
+
+# -----------------------------
+# ⏱️ WORKER
+# -----------------------------
+class RollupWorker:
+    """Consolide les journées closes toutes les ROLLUP_INTERVAL secondes (backfill au 1er passage)"""
+
+    def __init__(self):
+        self._arret = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def demarrer(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._arret.clear()
+        self._thread = threading.Thread(target=self._boucle, name="retrait-rollups", daemon=True)
+        self._thread.start()
+
+    def arreter(self, timeout: float = 10):
+        self._arret.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _boucle(self):
+        while not self._arret.is_set():
+            db = SessionLocal()
+            try:
+                jours = consolider(db)
+                if jours:
+                    print(f"📊 Rollups retraits : {jours} jour(s) consolidé(s)")
+            except Exception as e:
+                db.rollback()
+                print(f"❌ Erreur consolidation rollups: {e}")
+            finally:
+                db.close()
+            self._arret.wait(ROLLUP_INTERVAL)
+
+
+worker = RollupWorker()
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        if "--reconstruire" in sys.argv:
+            jours = reconstruire(db)
+        else:
+            jours = consolider(db)
+        print(f"✅ {jours} jour(s) consolidé(s), dernier jour : {jour_consolide(db)}")
+    finally:
+        db.close()
@@ -1,7 +1,7 @@
 # schemas.py
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, List, Dict
-from models import CompanyStatusEnum
+from models import CompanyStatusEnum, SourceMouvementEnum
 from datetime import datetime
 
 # -----------------------------
@@ -66,6 +66,7 @@ class ArticleBase(BaseModel):
     largeur: Optional[float] = None
     hauteur: Optional[float] = None
     poids: Optional[float] = None
+    category: Optional[str] = None  # détectée d'après le nom si absente (categories.py)
     
     @field_validator("quantite")
     @classmethod
@@ -113,6 +114,40 @@ class RetraitRequest(BaseModel):
             raise ValueError('La quantité doit être strictement positive')
         return v
 
+class RetraitLigne(BaseModel):
+    """Schéma pour une ligne d'un retrait multi-articles"""
+    nom_article: str
+    quantite: int
+    
+    @field_validator("quantite")
+    @classmethod
+    def quantite_positive(cls, v):
+        if v <= 0:
+            raise ValueError('La quantité doit être strictement positive')
+        return v
+
+class RetraitBatchRequest(BaseModel):
+    """Schéma pour retirer plusieurs articles en une requête"""
+    lignes: List[RetraitLigne] = Field(..., min_length=1, max_length=500)
+    tout_ou_rien: bool = False  # True : aucune ligne appliquée si une ligne échoue
+
+class RetraitLigneResultat(BaseModel):
+    """Résultat d'une ligne de retrait multi-articles"""
+    nom_article: str
+    article_id: Optional[int] = None
+    quantite: int
+    statut: str  # "ok", "introuvable", "stock_insuffisant"
+    message: str
+    poids_total: float = 0
+    stock_restant: Optional[int] = None
+    candidats: List[str] = []  # "introuvable" : noms approchants, plus proches d'abord
+
+class RetraitBatchResponse(BaseModel):
+    """Schéma pour la réponse d'un retrait multi-articles"""
+    message: str
+    lignes: List[RetraitLigneResultat]
+    poids_total: float
+
 class RetraitCreate(BaseModel):
     """Schéma pour créer un retrait"""
     article_id: int = Field(..., gt=0)
@@ -125,11 +160,68 @@ class RetraitRead(BaseModel):
     article_id: int
     quantite: int
     poids_total: float
-    date: datetime
+    date: Optional[datetime] = Field(None, validation_alias="date_retrait")
+    user_id: Optional[int]
+
+    model_config = ConfigDict(from_attributes=True)
+
+class MouvementStockRead(BaseModel):
+    """Ligne du journal des mouvements de stock"""
+    id: int
+    date_mouvement: datetime
+    article_id: int
+    delta: int
+    quantite_apres: int
+    source: SourceMouvementEnum
+    raison: Optional[str]
     user_id: Optional[int]
 
     model_config = ConfigDict(from_attributes=True)
 
+class ArticleStockAu(BaseModel):
+    """Quantité d'un article à une date (GET /articles/as-of)"""
+    article_id: int
+    reference: Optional[str] = None
+    nom: Optional[str] = None       # None : article supprimé depuis
+    category: Optional[str] = None
+    quantite: int
+
+class CandidatArticle(BaseModel):
+    article_id: int
+    nom: str
+    score: float  # 1 = identique après normalisation
+
+class ResolutionArticle(BaseModel):
+    """Résolution d'un nom saisi (GET /articles/resolve)"""
+    article_id: Optional[int] = None  # None : pas de correspondance assez sûre
+    nom: Optional[str] = None
+    candidats: List[CandidatArticle] = []
+
+# -----------------------------
+# CATÉGORIES
+# -----------------------------
+CLASSEMENT_NOMS_MAX = 50000
+
+class ClassementNomsRequest(BaseModel):
+    """Noms à classer (aperçu d'un import de catalogue)"""
+    noms: List[str] = Field(..., min_length=1, max_length=CLASSEMENT_NOMS_MAX)
+
+class ClassementNomsResponse(BaseModel):
+    """Catégorie de chaque nom, dans l'ordre de la requête"""
+    categories: List[str]
+
+class CategorieSynonymeCreate(BaseModel):
+    """Mot-clé de catégorie propre à l'entreprise"""
+    categorie: str = Field(..., min_length=1)
+    mot: str = Field(..., min_length=1)
+
+class CategorieSynonymeRead(BaseModel):
+    id: int
+    categorie: str
+    mot: str
+
+    model_config = ConfigDict(from_attributes=True)
+
 class ArticleRetraitResponse(BaseModel):
     """Schéma pour la réponse après un retrait"""
     message: str
@@ -161,6 +253,7 @@ class CalculRequest(BaseModel):
     largeur: float
     company_id: Optional[int] = None
     apply_to_stock: bool = False
+    reservation_atomique: bool = False  # 🆕 avec apply_to_stock : tout ou rien
     niveaux_travail: str = "tous"  # "tous", "dernier", "liste:1,3,5"
     nom_chantier: str = ""  # 🆕 Nom du chantier (optionnel)
     duree_location: Optional[int] = None  # 🆕 Durée de location en jours (optionnel)
@@ -179,6 +272,19 @@ class CalculResponse(BaseModel):
     meta: Dict
     ajustements: List[str]
 
+class CalculBatchRequest(BaseModel):
+    """Schéma pour calculer plusieurs façades en une requête (chiffrage)"""
+    facades: List[CalculRequest] = Field(..., min_length=1, max_length=10000)
+    company_id: Optional[int] = None
+
+class CalculBatchResponse(BaseModel):
+    """Schéma pour la réponse du calcul multi-façades"""
+    facades: List[CalculResponse]
+    pieces: List[PieceUsed]  # nomenclature agrégée
+    poids_total: float
+    meta: Dict
+    ajustements: List[str]
+
 # -----------------------------
 # 🆕 CHANTIERS
 # -----------------------------
@@ -245,6 +351,53 @@ class UserCreateByAdmin(BaseModel):
             raise ValueError('Email invalide')
         return v
 
+# Création en masse : les lignes ne sont PAS validées par Pydantic
+# (une ligne invalide ne doit pas rejeter tout le lot), chaque ligne
+# reçoit son propre statut dans la réponse.
+BULK_USERS_MAX = 1000
+
+class UserBulkLigne(BaseModel):
+    username: str
+    email: str
+
+class UserBulkCreate(BaseModel):
+    """Création en masse d'utilisateurs (onboarding d'une entreprise)"""
+    company_id: int
+    users: List[UserBulkLigne] = Field(..., min_length=1, max_length=BULK_USERS_MAX)
+
+class UserBulkLigneResultat(BaseModel):
+    ligne: int
+    username: str
+    email: str
+    statut: str  # "cree" | "existe_deja" | "doublon" | "invalide"
+    detail: Optional[str] = None
+    user_id: Optional[int] = None
+    email_statut: Optional[str] = None  # "en_attente" | "envoye" | "echec" | "simule"
+
+class UserBulkJob(BaseModel):
+    job_id: str
+    company_id: int
+    date_creation: datetime
+    total: int
+    crees: int
+    emails_en_attente: int
+    lignes: List[UserBulkLigneResultat]
+
+# -----------------------------
+# EXPORTS PDF ASYNCHRONES
+# -----------------------------
+class ExportJob(BaseModel):
+    """Job d'export PDF : suivre `statut`, puis télécharger via `download_url`"""
+    job_id: str
+    rapport: str
+    statut: str  # "en_cours" | "termine" | "echec"
+    date_creation: datetime
+    date_fin: Optional[datetime] = None
+    expire_le: Optional[datetime] = None
+    taille_octets: Optional[int] = None
+    erreur: Optional[str] = None
+    download_url: Optional[str] = None
+
 class PasswordChange(BaseModel):
     """Schéma pour changer le mot de passe"""
     old_password: str
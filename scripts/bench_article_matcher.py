@@ -0,0 +1,95 @@
+# scripts/bench_article_matcher.py
+"""
+Résolution approchée des noms d'articles (article_matcher) : catalogue de
+50 000 noms, 2 000 saisies bruitées (espaces, accents, tirets, une lettre
+perdue) et 300 noms partiels sans correspondance sûre.
+
+    python scripts/bench_article_matcher.py
+"""
+import random
+import time
+
+from bench_commun import SessionLocal, models, nettoyer, preparer
+
+from sqlalchemy import insert
+
+import article_matcher
+
+MOTS = [
+    "Poteau", "Moise", "Plinthe", "alu", "acier", "Garde-corps", "Diagonale", "Vérin", "Échelle",
+    "Trappe", "Console", "Lisse", "Sabot", "Ancrage", "Tube", "Collier", "Filet", "Bâche",
+    "latéral", "frontal", "renforcé", "galva"
+]
+DIMENSIONS = ["0.73m", "1.09m", "2.07m", "3.07m", "2m", "3m", "50mm", "30cm"]
+CATALOGUE = 50000
+SAISIES = 2000
+PARTIELS = 300
+
+
+def bruiter(nom: str) -> str:
+    nom = nom.lower()
+    operation = random.choice(["espace", "lettre", "accent", "tiret"])
+    if operation == "espace":
+        return nom.replace(" ", "", 1) if random.random() < 0.5 else nom.replace("m ", " m ", 1)
+    if operation == "lettre":
+        i = random.randrange(len(nom))
+        return nom[:i] + nom[i + 1:] if nom[i].isalpha() else nom
+    if operation == "accent":
+        return nom.replace("é", "e").replace("â", "a")
+    return nom.replace("-", " ")
+
+
+def centile(durees, p: float) -> float:
+    return sorted(durees)[int(len(durees) * p)] * 1000
+
+
+def main():
+    random.seed(5)
+    company_id = preparer()
+    noms = set()
+    while len(noms) < CATALOGUE:
+        noms.add(
+            f"{random.choice(MOTS)} {random.choice(MOTS)} {random.choice(MOTS)} "
+            f"{random.choice(DIMENSIONS)} {random.randint(1, 99)}"
+        )
+    noms = sorted(noms)
+    db = SessionLocal()
+    try:
+        db.execute(insert(models.Article), [{"nom": n, "quantite": 100, "company_id": company_id} for n in noms])
+        db.commit()
+
+        debut = time.perf_counter()
+        article_matcher.resoudre(db, company_id, "x")
+        print(f"construction du catalogue ({CATALOGUE} noms) : {time.perf_counter() - debut:.2f} s")
+
+        durees, justes, fausses, refusees = [], 0, 0, 0
+        for nom in random.sample(noms, SAISIES):
+            saisie = bruiter(nom)
+            debut = time.perf_counter()
+            resolution = article_matcher.resoudre(db, company_id, saisie)
+            durees.append(time.perf_counter() - debut)
+            if resolution.article_id is None:
+                refusees += 1
+            elif resolution.nom == nom:
+                justes += 1
+            else:
+                fausses += 1
+        print(f"{SAISIES} saisies bruitées : {justes} acceptées justes, {fausses} fausses, {refusees} refusées")
+        print(f"  p50 {centile(durees, 0.5):.2f} ms, p99 {centile(durees, 0.99):.2f} ms")
+
+        durees = []
+        for _ in range(PARTIELS):
+            saisie = f"{random.choice(MOTS)} {random.choice(MOTS)}"
+            debut = time.perf_counter()
+            article_matcher.resoudre(db, company_id, saisie)
+            durees.append(time.perf_counter() - debut)
+        print(f"{PARTIELS} noms partiels : p50 {centile(durees, 0.5):.2f} ms, p99 {centile(durees, 0.99):.2f} ms")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        nettoyer()
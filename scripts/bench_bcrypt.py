@@ -0,0 +1,94 @@
+# scripts/bench_bcrypt.py
+"""
+Hachage bcrypt hors de la boucle d'événements : latence de /health pendant
+16 créations d'utilisateur simultanées, puis débit de 32 connexions
+simultanées. Serveur uvicorn réel (sous-processus), sur la base du bench.
+
+    python scripts/bench_bcrypt.py [--port 8765]
+"""
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from bench_commun import MOT_DE_PASSE, RACINE, nettoyer, preparer
+
+PORT = int(sys.argv[sys.argv.index("--port") + 1]) if "--port" in sys.argv else 8765
+CREATIONS = 16
+CONNEXIONS = 32
+
+
+async def mesurer(client: httpx.AsyncClient, taches):
+    """Durée de `taches` et latences de /health interrogé toutes les 10 ms pendant ce temps"""
+    latences, fini = [], asyncio.Event()
+
+    async def sonder():
+        while not fini.is_set():
+            debut = time.perf_counter()
+            await client.get("/health")
+            latences.append(time.perf_counter() - debut)
+            await asyncio.sleep(0.01)
+
+    sonde = asyncio.create_task(sonder())
+    debut = time.perf_counter()
+    reponses = await asyncio.gather(*taches)
+    duree = time.perf_counter() - debut
+    fini.set()
+    await sonde
+    return reponses, duree, statistics.median(latences) * 1000, max(latences) * 1000
+
+
+async def entetes(client: httpx.AsyncClient):
+    reponse = await client.post("/auth/login", data={"username": "bob", "password": MOT_DE_PASSE})
+    reponse.raise_for_status()
+    return {"Authorization": "Bearer " + reponse.json()["access_token"]}
+
+
+async def scenario(company_id: int):
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=300) as client:
+        for _ in range(100):
+            try:
+                await client.get("/health")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+        auth = await entetes(client)
+
+        reponses, duree, p50, maxi = await mesurer(client, [
+            client.post("/admin/create-user", headers=auth, json={
+                "username": f"user{i}", "email": f"user{i}@example.com", "company_id": company_id
+            })
+            for i in range(CREATIONS)
+        ])
+        statuts = sorted({r.status_code for r in reponses})
+        print(f"{CREATIONS} create-user simultanés : {duree:.2f} s, statuts {statuts} | /health p50 {p50:.0f} ms, max {maxi:.0f} ms")
+
+        reponses, duree, p50, maxi = await mesurer(client, [
+            client.post("/auth/login", data={"username": "bob", "password": MOT_DE_PASSE})
+            for _ in range(CONNEXIONS)
+        ])
+        print(f"{CONNEXIONS} logins simultanés : {duree:.2f} s ({CONNEXIONS / duree:.1f} logins/s) | /health p50 {p50:.0f} ms, max {maxi:.0f} ms")
+
+
+def main():
+    company_id = preparer()
+    serveur = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning"],
+        cwd=RACINE, env=os.environ.copy(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        asyncio.run(scenario(company_id))
+    finally:
+        serveur.terminate()
+        serveur.wait()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        nettoyer()
@@ -0,0 +1,69 @@
+# scripts/bench_calcul_batch.py
+"""
+POST /calcul/batch (N façades par requête) contre N appels POST /calcul/,
+via TestClient : authentification et sérialisation JSON comprises.
+
+    python scripts/bench_calcul_batch.py
+"""
+import random
+import time
+
+from bench_commun import SessionLocal, entetes, models, nettoyer, preparer, silencieux
+
+PIECES = [
+    "Cale bois 50mm", "Vérin de socle 30cm", "Embase standard", "Poteau 2m", "Moise 3.07m",
+    "Moise 0.73m", "plancher acier 3.07m", "Trappe d'accès 3.07m", "Garde-corps latéral 3.07m",
+    "Garde-corps frontal 0.73m", "Plinthe alu 3.07m", "Plinthe alu 0.73m", "Diagonale 3.0m",
+    "Diagonale 0.73m", "Platine d'ancrage au sol"
+]
+TAILLES = (1, 100, 10000)
+APPELS_UNITAIRES = 100
+
+
+def facades(n: int):
+    return [
+        {"hauteur": random.uniform(1, 40), "longueur": random.uniform(1, 120), "largeur": 0.73}
+        for _ in range(n)
+    ]
+
+
+def main():
+    from fastapi.testclient import TestClient
+    import main as application
+
+    random.seed(1)
+    company_id = preparer()
+    db = SessionLocal()
+    db.add_all([
+        models.Article(nom=nom, quantite=1000, poids=1.5 + i, company_id=company_id, category="x")
+        for i, nom in enumerate(PIECES)
+    ])
+    db.commit()
+    db.close()
+
+    with TestClient(application.app) as client:
+        with silencieux():
+            auth = entetes(client)
+            client.post("/calcul/batch", json={"facades": facades(1)}, headers=auth)  # échauffement
+        for n in TAILLES:
+            lot = facades(n)
+            with silencieux():
+                debut = time.perf_counter()
+                reponse = client.post("/calcul/batch", json={"facades": lot}, headers=auth)
+                duree = time.perf_counter() - debut
+            reponse.raise_for_status()
+            print(f"/calcul/batch {n:>6} façade(s) : {duree * 1000:8.1f} ms  ({n / duree:,.0f} façades/s)")
+
+        with silencieux():
+            debut = time.perf_counter()
+            for facade in facades(APPELS_UNITAIRES):
+                client.post("/calcul/", json=facade, headers=auth).raise_for_status()
+            duree = time.perf_counter() - debut
+        print(f"/calcul/ x{APPELS_UNITAIRES} (séquentiel) : {APPELS_UNITAIRES / duree:,.0f} façades/s")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        nettoyer()
@@ -0,0 +1,96 @@
+# scripts/bench_commun.py
+"""
+Base commune des benchmarks (scripts/bench_*.py).
+
+Base SQLite jetable (ou BENCH_DATABASE_URL, par ex. une base PostgreSQL
+VIDE : le schéma est recréé), workers de fond désactivés, dossiers
+d'export et de cache temporaires. À importer avant l'application : les
+modules lisent ces variables au chargement.
+
+    python scripts/bench_recherche.py
+"""
+import contextlib
+import io
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict
+
+DOSSIER = tempfile.mkdtemp(prefix="stock-bench-")
+
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL") or f"sqlite:///{DOSSIER}/bench.db"
+os.environ["EMAIL_OUTBOX_WORKER"] = "false"
+os.environ["RETRAIT_ROLLUP_WORKER"] = "false"
+os.environ["STOCK_SNAPSHOT_WORKER"] = "false"
+os.environ["EXPORT_DIR"] = os.path.join(DOSSIER, "exports")
+os.environ["REPORT_CACHE_DIR"] = os.path.join(DOSSIER, "rapports")
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+
+from sqlalchemy import text  # noqa: E402
+
+import article_search  # noqa: E402
+import auth  # noqa: E402
+import models  # noqa: E402
+from database import Base, SessionLocal, engine  # noqa: E402
+
+MOT_DE_PASSE = "pw123456"
+
+
+def preparer() -> int:
+    """Schéma recréé à vide, entreprise ACME et son admin bob ; retourne l'id de l'entreprise"""
+    Base.metadata.drop_all(engine)
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS articles_fts"))
+    Base.metadata.create_all(engine)
+    article_search.installer(engine)
+
+    db = SessionLocal()
+    try:
+        company = models.Company(name="ACME")
+        db.add(company)
+        db.commit()
+        db.add(models.User(
+            username="bob",
+            email="bob@example.com",
+            password_hash=auth.get_password_hash(MOT_DE_PASSE),
+            role=models.RoleEnum.ADMIN,
+            company_id=company.id,
+            first_login=False
+        ))
+        db.commit()
+        return company.id
+    finally:
+        db.close()
+
+
+def entetes(client) -> Dict[str, str]:
+    """En-têtes d'authentification de bob (client TestClient ou httpx)"""
+    reponse = client.post("/auth/login", data={"username": "bob", "password": MOT_DE_PASSE})
+    reponse.raise_for_status()
+    return {"Authorization": "Bearer " + reponse.json()["access_token"]}
+
+
+def mediane_ms(fonction: Callable[[], object], repetitions: int = 9) -> float:
+    """Médiane du temps d'exécution de `fonction()`, en millisecondes"""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    return statistics.median(durees) * 1000
+
+
+def silencieux():
+    """Coupe les print de l'application (logs d'authentification...) pendant une mesure"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def nettoyer():
+    engine.dispose()
+    shutil.rmtree(DOSSIER, ignore_errors=True)
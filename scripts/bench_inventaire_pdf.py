@@ -0,0 +1,97 @@
+# scripts/bench_inventaire_pdf.py
+"""
+PDF d'inventaire : flux page par page (pdf_stream) contre le document
+Platypus construit en mémoire (pdf_generator). Temps, taille, pic mémoire
+Python (tracemalloc) ; les octets produits sont jetés au fil de l'eau.
+
+    python scripts/bench_inventaire_pdf.py [tailles...]   # défaut : 10000 100000
+    python scripts/bench_inventaire_pdf.py --sans-platypus
+
+Platypus n'est mesuré que jusqu'à PLATYPUS_MAX articles (~2 min à 10 000).
+"""
+import sys
+import time
+import tracemalloc
+
+from bench_commun import SessionLocal, models, nettoyer, preparer
+
+from sqlalchemy import insert
+
+import crud_filters
+import pdf_generator
+import pdf_stream
+
+PLATYPUS_MAX = 10000
+
+
+def remplir(company_id: int, taille: int):
+    db = SessionLocal()
+    try:
+        db.query(models.Article).delete()
+        db.execute(insert(models.Article), [
+            {
+                "nom": f"Article {i} échafaudage (spécial)",
+                "reference": f"R{i}",
+                "quantite": i % 60,
+                "prix_unitaire": 1.25 * (i % 7),
+                "company_id": company_id,
+                "category": f"Catégorie {i % 11}",
+            }
+            for i in range(taille)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def mesurer_flux(company_id: int, taille: int):
+    db = SessionLocal()
+    try:
+        stats = crud_filters.stats_inventaire(db, company_id=company_id)
+        tracemalloc.start()
+        debut = time.perf_counter()
+        octets = morceaux = 0
+        for morceau in pdf_stream.stream_inventory_pdf(
+            crud_filters.iter_articles_export(db, company_id=company_id), stats
+        ):
+            octets += len(morceau)
+            morceaux += 1
+        duree = time.perf_counter() - debut
+        pic = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        db.close()
+    print(f"flux     {taille:>7} articles : {duree:6.1f} s, {octets / 1e6:.1f} Mo en {morceaux} morceaux, pic {pic / 1e6:.2f} Mo")
+
+
+def mesurer_platypus(company_id: int, taille: int):
+    db = SessionLocal()
+    try:
+        stats = crud_filters.stats_inventaire(db, company_id=company_id)
+        tracemalloc.start()
+        debut = time.perf_counter()
+        articles = crud_filters.search_articles(db, company_id=company_id, limit=None)
+        pdf = pdf_generator.create_inventory_pdf(articles, stats)
+        duree = time.perf_counter() - debut
+        pic = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        db.close()
+    print(f"platypus {taille:>7} articles : {duree:6.1f} s, {len(pdf) / 1e6:.1f} Mo, pic {pic / 1e6:.1f} Mo")
+
+
+def main(tailles, platypus: bool):
+    company_id = preparer()
+    for taille in tailles:
+        remplir(company_id, taille)
+        mesurer_flux(company_id, taille)
+        if platypus and taille <= PLATYPUS_MAX:
+            mesurer_platypus(company_id, taille)
+
+
+if __name__ == "__main__":
+    arguments = [a for a in sys.argv[1:] if not a.startswith("--")]
+    try:
+        main([int(t) for t in arguments] or [10000, 100000], "--sans-platypus" not in sys.argv)
+    finally:
+        nettoyer()
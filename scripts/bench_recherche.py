@@ -0,0 +1,88 @@
+# scripts/bench_recherche.py
+"""
+Recherche d'articles : ancien filtre ILIKE '%mot%' (sans classement) contre
+l'index article_search (classé), 10 entreprises, limit 100, médiane en ms.
+
+    python scripts/bench_recherche.py [tailles...]   # défaut : 1000 100000 1000000
+"""
+import random
+import sys
+
+from bench_commun import SessionLocal, mediane_ms, models, nettoyer, preparer
+
+from sqlalchemy import insert, or_
+
+from crud_filters import search_articles
+
+MOTS = [
+    "Poteau", "Moise", "Plinthe", "alu", "acier", "Garde-corps", "Diagonale", "Vérin", "Échelle",
+    "Trappe", "Console", "Lisse", "Sabot", "Ancrage", "Tube", "Collier", "Filet", "Bâche"
+]
+REQUETES = {
+    "référence": "R0000123",
+    "sous-chaîne": "0000123",
+    "aucun résultat": "introuvable",
+    "deux mots": "sabot 42",
+    "mot courant": "ancrage",  # ~1 article sur 6
+}
+LOT = 50000
+
+
+def remplir(db, company_id: int, taille: int):
+    entreprises = [company_id]
+    for i in range(9):
+        company = models.Company(name=f"Entreprise {i}")
+        db.add(company)
+        db.commit()
+        entreprises.append(company.id)
+    lignes = []
+    for i in range(taille):
+        lignes.append({
+            "nom": f"{random.choice(MOTS)} {random.choice(MOTS)} {random.randint(1, 999)}",
+            "reference": f"R{i:07d}",
+            "category": random.choice(MOTS),
+            "quantite": 5,
+            "company_id": random.choice(entreprises),
+        })
+        if len(lignes) == LOT:
+            db.execute(insert(models.Article), lignes)
+            lignes = []
+    if lignes:
+        db.execute(insert(models.Article), lignes)
+    db.commit()
+
+
+def ilike(db, company_id: int, recherche: str):
+    A = models.Article
+    return db.query(A).filter(
+        A.company_id == company_id,
+        *[or_(A.nom.ilike(f"%{m}%"), A.reference.ilike(f"%{m}%"), A.category.ilike(f"%{m}%"))
+          for m in recherche.split()]
+    ).limit(100).all()
+
+
+def main(tailles):
+    resultats = {nom: [] for nom in REQUETES}
+    for taille in tailles:
+        random.seed(1)
+        company_id = preparer()
+        db = SessionLocal()
+        try:
+            remplir(db, company_id, taille)
+            for nom, recherche in REQUETES.items():
+                avant = mediane_ms(lambda: ilike(db, company_id, recherche))
+                apres = mediane_ms(lambda: search_articles(db, search=recherche, company_id=company_id, limit=100))
+                resultats[nom].append(f"{avant:.1f} / {apres:.1f}")
+        finally:
+            db.close()
+    print(f"{'requête':<16}" + "".join(f"{taille:>22}" for taille in tailles))
+    for nom, valeurs in resultats.items():
+        print(f"{nom:<16}" + "".join(f"{v:>22}" for v in valeurs))
+    print("(ms : ILIKE / index)")
+
+
+if __name__ == "__main__":
+    try:
+        main([int(t) for t in sys.argv[1:]] or [1000, 100000, 1000000])
+    finally:
+        nettoyer()
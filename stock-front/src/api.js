@@ -46,6 +46,21 @@ api.interceptors.response.use(
   }
 );
 
+// ======================= PAGINATION =======================
+// Les listes sont paginées par curseur : on suit l'en-tête X-Next-Cursor
+export const fetchAllPages = async (url, params = {}) => {
+  const items = [];
+  let cursor = null;
+  do {
+    const response = await api.get(url, {
+      params: { ...params, limit: 500, ...(cursor ? { cursor } : {}) },
+    });
+    items.push(...response.data);
+    cursor = response.headers["x-next-cursor"];
+  } while (cursor);
+  return items;
+};
+
 
 // ======================= AUTHENTIFICATION =======================
 export const login = async (username, password) => {
@@ -66,8 +81,7 @@ export const getCurrentUser = async () => {
 
 // ======================= ENTREPRISES =======================
 export const fetchCompanies = async () => {
-  const response = await api.get("/entreprises");
-  return response.data;
+  return fetchAllPages("/entreprises/");
 };
 
 export const createCompany = async (name) => {
@@ -97,8 +111,7 @@ export const companyAction = async (companyId, actionType) => {
 
 // ======================= ARTICLES =======================
 export const fetchArticles = async () => {
-  const response = await api.get("/articles");
-  return response.data;
+  return fetchAllPages("/articles/");
 };
 
 export const createArticle = async (article) => {
@@ -128,8 +141,7 @@ export const retirerArticle = async (articleId, quantite) => {
 };
 
 export const fetchRetraits = async () => {
-  const response = await api.get("/retraits");
-  return response.data;
+  return fetchAllPages("/retraits/");
 };
 
 // ======================= CALCULATEUR ÉCHAFAUDAGE =======================
@@ -156,8 +168,7 @@ export const appliquerAllocation = async (pieces) => {
 
 // ======================= UTILISATEURS (ADMIN) =======================
 export const fetchUsers = async () => {
-  const response = await api.get("/users");
-  return response.data;
+  return fetchAllPages("/users/");
 };
 
 export const createUser = async (userData) => {
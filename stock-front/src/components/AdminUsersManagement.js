@@ -1,6 +1,5 @@
 import React, { useState, useEffect } from "react";
-import api from "../api";
-import { createUserByAdmin } from "../api";
+import { createUserByAdmin, fetchAllPages } from "../api";
 import "../App.css";
 
 const AdminUsersManagement = ({ user }) => {
@@ -19,8 +18,7 @@ const AdminUsersManagement = ({ user }) => {
   const loadUsers = async () => {
     setLoading(true);
     try {
-      const response = await api.get("/admin/list-users-of-company");
-      setUsers(response.data);
+      setUsers(await fetchAllPages("/admin/list-users-of-company"));
     } catch (err) {
       console.error("Erreur chargement users:", err);
       setMessage({ type: "error", text: "Erreur de chargement des utilisateurs" });
@@ -1,5 +1,5 @@
 import React, { useEffect, useState } from "react";
-import api from "../api";
+import api, { fetchCompanies } from "../api";
 
 const CompaniesTable = () => {
   const [companies, setCompanies] = useState([]);
@@ -13,8 +13,7 @@ const CompaniesTable = () => {
   const loadCompanies = async () => {
     setLoading(true);
     try {
-      const response = await api.get("/entreprises");
-      setCompanies(response.data);
+      setCompanies(await fetchCompanies());
     } catch (err) {
       console.error("Erreur chargement entreprises:", err);
       setMessage({ type: "error", text: "Erreur de chargement des entreprises" });
@@ -10,45 +10,49 @@ const RetraitArticleForm = ({ onArticleRetire }) => {
   const [loading, setLoading] = useState(false);
   const [message, setMessage] = useState(null);
   const [suggestions, setSuggestions] = useState([]);
-  const [allArticles, setAllArticles] = useState([]);
+  const [recherche, setRecherche] = useState('');
   const [showSuggestions, setShowSuggestions] = useState(false);
 
-  // Charger la liste des articles pour l'autocomplétion
+  // Autocomplétion : /articles/suggest interrogé pendant la saisie
+  // (léger délai, réponses d'une saisie dépassée ignorées)
   useEffect(() => {
-    const fetchArticleNames = async () => {
+    if (recherche.length < 2) {
+      setSuggestions([]);
+      setShowSuggestions(false);
+      return;
+    }
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
       try {
         const token = JSON.parse(localStorage.getItem('user')).access_token;
-        const response = await fetch(`${API_URL}/articles/noms`, {
+        const params = new URLSearchParams({ q: recherche, limit: 8 });
+        const response = await fetch(`${API_URL}/articles/suggest?${params}`, {
           headers: { Authorization: `Bearer ${token}` },
+          signal: controller.signal,
         });
         if (response.ok) {
           const data = await response.json();
-          setAllArticles(data);
+          setSuggestions(data);
+          setShowSuggestions(true);
         }
       } catch (err) {
-        console.error('Erreur chargement articles:', err);
+        if (err.name !== 'AbortError') console.error('Erreur suggestions articles:', err);
       }
+    }, 200);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
     };
-    fetchArticleNames();
-  }, []);
+  }, [recherche]);
 
-  // Filtrer les suggestions
   const handleNomChange = (value) => {
     setNomArticle(value);
-    if (value.length >= 2) {
-      const filtered = allArticles.filter((nom) =>
-        nom.toLowerCase().includes(value.toLowerCase())
-      );
-      setSuggestions(filtered.slice(0, 8));
-      setShowSuggestions(true);
-    } else {
-      setSuggestions([]);
-      setShowSuggestions(false);
-    }
+    setRecherche(value);
   };
 
   const selectSuggestion = (nom) => {
     setNomArticle(nom);
+    setRecherche('');
     setSuggestions([]);
     setShowSuggestions(false);
   };
@@ -101,6 +105,7 @@ const RetraitArticleForm = ({ onArticleRetire }) => {
       });
 
       setNomArticle('');
+      setRecherche('');
       setQuantite('');
       if (onArticleRetire) onArticleRetire();
 
@@ -135,7 +140,7 @@ const RetraitArticleForm = ({ onArticleRetire }) => {
             value={nomArticle}
             onChange={(e) => handleNomChange(e.target.value)}
             onBlur={() => setTimeout(() => setShowSuggestions(false), 150)}
-            onFocus={() => nomArticle.length >= 2 && setShowSuggestions(true)}
+            onFocus={() => suggestions.length > 0 && setShowSuggestions(true)}
             placeholder="Ex: Poteau 2m, Moise 3.07m..."
             className="input-ajout"
             style={{ width: '100%' }}
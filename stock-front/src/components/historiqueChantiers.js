@@ -29,17 +29,24 @@ const HistoriqueChantiers = () => {
     setLoading(true);
     try {
       const token = JSON.parse(localStorage.getItem("user")).access_token;
-      const response = await fetch(`${API_URL}/chantiers/`, {
-        headers: {
-          Authorization: `Bearer ${token}`,
-        },
-      });
+      const data = [];
+      let cursor = null;
+      do {
+        // Liste paginée par curseur (en-tête X-Next-Cursor)
+        const query = `limit=500${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ""}`;
+        const response = await fetch(`${API_URL}/chantiers/?${query}`, {
+          headers: {
+            Authorization: `Bearer ${token}`,
+          },
+        });
 
-      if (!response.ok) {
-        throw new Error("Erreur lors de la récupération des chantiers");
-      }
+        if (!response.ok) {
+          throw new Error("Erreur lors de la récupération des chantiers");
+        }
 
-      const data = await response.json();
+        data.push(...(await response.json()));
+        cursor = response.headers.get("X-Next-Cursor");
+      } while (cursor);
       setChantiers(data);
     } catch (err) {
       console.error(err);
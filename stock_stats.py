@@ -0,0 +1,283 @@
+# stock_stats.py
+"""
+Statistiques de stock par entreprise, maintenues par deltas.
+
+Chaque écriture d'article (création, modification, suppression, retrait,
+ajustement) enregistre l'état avant/après de l'article ; les deltas sont
+cumulés dans la session puis appliqués juste avant le commit, dans la même
+transaction (UPSERT ... SET x = x + :delta). Les endpoints /stats lisent
+alors une ligne précalculée au lieu d'agréger toute la table articles.
+
+- Écritures ORM : détectées automatiquement (after_flush)
+- UPDATE hors ORM (crud.decrementer_stock[s]) : appel explicite à enregistrer()
+- Réparation : recalculer() (ou `python stock_stats.py [company_id]`)
+- Bases créées par create_all (hors Alembic) : installer() au démarrage
+
+Les articles sans entreprise (company_id NULL) ne sont pas comptés.
+"""
+import sys
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, event, func, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from models import Article, Company, CompanyCategoryStats, CompanyStockStats
+from suivi_articles import valeur_avant
+from verrous import verrouiller_etat
+
+SEUIL_ALERTE = 10  # quantite <= SEUIL_ALERTE : article en stock faible
+
+_DELTAS = "stock_stats_deltas"  # clé de session.info
+ETAT = "stock_stats"             # ligne de rollup_etats servant de verrou à installer()
+
+# (company_id, category, quantite) d'un article à un instant donné
+Etat = Tuple[Optional[int], Optional[str], Optional[int]]
+
+
+# -----------------------------
+# 📝 ENREGISTREMENT DES DELTAS
+# -----------------------------
+def enregistrer(db: Session, avant: Optional[Etat], apres: Optional[Etat]):
+    """
+    Cumule l'effet d'une écriture d'article : l'état `avant` est retiré des
+    compteurs, l'état `apres` ajouté (None = article inexistant).
+    """
+    deltas = db.info.setdefault(_DELTAS, {})
+    for etat, signe in ((avant, -1), (apres, 1)):
+        if etat is None or etat[0] is None:
+            continue
+        company_id, categorie, quantite = etat
+        d = deltas.setdefault(company_id, {
+            "total_articles": 0, "stock_total": 0, "alertes_stock_faible": 0, "categories": {}
+        })
+        # quantite NULL : comptée comme en SQL (ni dans la somme, ni en alerte)
+        d["total_articles"] += signe
+        d["stock_total"] += signe * (quantite or 0)
+        d["alertes_stock_faible"] += signe * (quantite is not None and quantite <= SEUIL_ALERTE)
+        cat = d["categories"].setdefault(categorie or "", [0, 0])
+        cat[0] += signe
+        cat[1] += signe * (quantite or 0)
+
+
+def _etat_avant(article: Article) -> Etat:
+    """Valeurs d'avant le flush (historique des attributs)"""
+    return tuple(valeur_avant(article, attr) for attr in ("company_id", "category", "quantite"))
+
+
+def _etat(article: Article) -> Etat:
+    return article.company_id, article.category, article.quantite
+
+
+@event.listens_for(Session, "after_flush")
+def _noter_articles(session, flush_context):
+    for obj in session.new:
+        if isinstance(obj, Article):
+            enregistrer(session, None, _etat(obj))
+    for obj in session.dirty:
+        if isinstance(obj, Article) and session.is_modified(obj):
+            enregistrer(session, _etat_avant(obj), _etat(obj))
+    for obj in session.deleted:
+        if isinstance(obj, Article):
+            enregistrer(session, _etat_avant(obj), None)
+
+
+@event.listens_for(Session, "before_commit")
+def _appliquer_avant_commit(session):
+    # Flush d'abord : les dernières écritures ORM produisent leurs deltas
+    session.flush()
+    deltas = session.info.pop(_DELTAS, None)
+    if deltas:
+        appliquer(session, deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _oublier_deltas(session):
+    session.info.pop(_DELTAS, None)
+
+
+# -----------------------------
+# 💾 APPLICATION (UPSERT)
+# -----------------------------
+def _upsert(db: Session, table, cles: Dict, deltas: Dict, returning=None):
+    """INSERT ... ON CONFLICT DO UPDATE SET col = col + delta (UPDATE puis INSERT sinon)"""
+    dialecte = db.get_bind().dialect
+    if dialecte.name in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialecte.name == "postgresql" else sqlite.insert
+        stmt = insert(table).values(**cles, **deltas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(cles),
+            set_={col: getattr(table.c, col) + getattr(stmt.excluded, col) for col in deltas}
+        )
+        if returning is not None and dialecte.insert_returning:
+            return db.execute(stmt.returning(returning)).scalar()
+        db.execute(stmt)
+    else:
+        conditions = [getattr(table.c, col) == val for col, val in cles.items()]
+        maj = update(table).where(*conditions).values(
+            {col: getattr(table.c, col) + val for col, val in deltas.items()}
+        )
+        if db.execute(maj).rowcount == 0:
+            db.execute(table.insert().values(**cles, **deltas))
+    if returning is not None:
+        return db.execute(select(returning).where(
+            *[getattr(table.c, col) == val for col, val in cles.items()]
+        )).scalar()
+
+
+def appliquer(db: Session, deltas: Dict):
+    """
+    Applique les deltas cumulés. Ordre de verrouillage stable : ligne de
+    l'entreprise puis lignes de catégories (triées), entreprises triées.
+    """
+    stats = CompanyStockStats.__table__
+    stats_cat = CompanyCategoryStats.__table__
+    for company_id in sorted(deltas):
+        d = deltas[company_id]
+        compteurs = {k: d[k] for k in ("total_articles", "stock_total", "alertes_stock_faible")}
+        categories = {c: v for c, v in d["categories"].items() if v != [0, 0]}
+        if not any(compteurs.values()) and not categories:
+            continue
+        _upsert(db, stats, {"company_id": company_id}, compteurs)
+
+        delta_categories = 0
+        for categorie in sorted(categories):
+            d_nombre, d_stock = categories[categorie]
+            nombre = _upsert(
+                db, stats_cat, {"company_id": company_id, "categorie": categorie},
+                {"nombre_articles": d_nombre, "stock_total": d_stock},
+                returning=stats_cat.c.nombre_articles
+            )
+            # Catégorie apparue (0 -> n) ou disparue (n -> 0)
+            if d_nombre > 0 and nombre == d_nombre:
+                delta_categories += 1
+            elif d_nombre < 0 and nombre == 0:
+                delta_categories -= 1
+        if delta_categories:
+            db.execute(
+                update(stats).where(stats.c.company_id == company_id)
+                .values(categories=stats.c.categories + delta_categories)
+            )
+
+
+# -----------------------------
+# 📊 LECTURE
+# -----------------------------
+def lire_stats(db: Session, company_id: Optional[int]) -> Dict:
+    """Ligne précalculée de l'entreprise ; company_id=None : toutes les entreprises"""
+    if company_id is not None:
+        ligne = db.get(CompanyStockStats, company_id)
+        if ligne is None:
+            return {"total_articles": 0, "stock_total": 0, "alertes_stock_faible": 0, "categories": 0}
+        return {
+            "total_articles": ligne.total_articles,
+            "stock_total": ligne.stock_total,
+            "alertes_stock_faible": ligne.alertes_stock_faible,
+            "categories": ligne.categories,
+        }
+    total, stock, alertes = db.query(
+        func.coalesce(func.sum(CompanyStockStats.total_articles), 0),
+        func.coalesce(func.sum(CompanyStockStats.stock_total), 0),
+        func.coalesce(func.sum(CompanyStockStats.alertes_stock_faible), 0),
+    ).one()
+    categories = db.query(func.count(func.distinct(CompanyCategoryStats.categorie))).filter(
+        CompanyCategoryStats.nombre_articles > 0
+    ).scalar()
+    return {"total_articles": total, "stock_total": stock, "alertes_stock_faible": alertes, "categories": categories}
+
+
+def lire_stats_categories(db: Session, company_id: Optional[int]) -> List[Dict]:
+    query = db.query(
+        CompanyCategoryStats.categorie,
+        func.sum(CompanyCategoryStats.nombre_articles),
+        func.sum(CompanyCategoryStats.stock_total),
+    ).filter(CompanyCategoryStats.nombre_articles > 0)
+    if company_id is not None:
+        query = query.filter(CompanyCategoryStats.company_id == company_id)
+    return [
+        {"categorie": categorie or None, "nombre_articles": nombre, "stock_total": stock}
+        for categorie, nombre, stock in query.group_by(CompanyCategoryStats.categorie)
+        .order_by(CompanyCategoryStats.categorie)
+    ]
+
+
+# -----------------------------
+# 🔧 RÉPARATION
+# -----------------------------
+def recalculer(db: Session, company_id: Optional[int] = None) -> int:
+    """
+    Recalcul complet depuis la table articles (une entreprise ou toutes),
+    une transaction par entreprise. La ligne de l'entreprise est verrouillée
+    d'abord : les écritures concurrentes attendent et appliquent leurs
+    deltas après le recalcul. Retourne le nombre d'entreprises traitées.
+    """
+    ids = [company_id] if company_id is not None else [
+        cid for (cid,) in db.query(Company.id).order_by(Company.id)
+    ]
+    for cid in ids:
+        db.query(CompanyStockStats).filter(CompanyStockStats.company_id == cid).with_for_update().all()
+        db.execute(delete(CompanyCategoryStats).where(CompanyCategoryStats.company_id == cid))
+        db.execute(delete(CompanyStockStats).where(CompanyStockStats.company_id == cid))
+
+        par_categorie = db.query(
+            func.coalesce(Article.category, ""),
+            func.count(Article.id),
+            func.coalesce(func.sum(Article.quantite), 0),
+        ).filter(Article.company_id == cid).group_by(func.coalesce(Article.category, "")).all()
+        if par_categorie:
+            db.execute(CompanyCategoryStats.__table__.insert(), [
+                {"company_id": cid, "categorie": cat, "nombre_articles": n, "stock_total": stock}
+                for cat, n, stock in par_categorie
+            ])
+        alertes = db.query(func.count(Article.id)).filter(
+            Article.company_id == cid, Article.quantite <= SEUIL_ALERTE
+        ).scalar()
+        db.execute(CompanyStockStats.__table__.insert().values(
+            company_id=cid,
+            total_articles=sum(n for _, n, _ in par_categorie),
+            stock_total=sum(stock for _, _, stock in par_categorie),
+            alertes_stock_faible=alertes,
+            categories=len(par_categorie),
+        ))
+        db.commit()
+    return len(ids)
+
+
+def installer(engine):
+    """
+    Remplissage initial des entreprises qui ont des articles mais pas de
+    ligne de statistiques (bases créées par create_all, hors Alembic) :
+    équivalent du remplissage de la migration. Sans lui, les deltas
+    s'appliqueraient à des compteurs partis de zéro.
+    """
+    db = Session(bind=engine)
+    try:
+        verrouiller_etat(db, ETAT)
+        entreprises = [company_id for (company_id,) in (
+            db.query(Article.company_id).distinct()
+            .filter(
+                Article.company_id.isnot(None),
+                ~select(CompanyStockStats.company_id)
+                .where(CompanyStockStats.company_id == Article.company_id).exists()
+            )
+            .order_by(Article.company_id)
+            .all()
+        )]
+        for company_id in entreprises:
+            recalculer(db, company_id)
+        if entreprises:
+            print(f"📊 Statistiques de stock calculées pour {len(entreprises)} entreprise(s)")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        cible = int(sys.argv[1]) if len(sys.argv) > 1 else None
+        n = recalculer(db, cible)
+        print(f"✅ Statistiques de stock recalculées pour {n} entreprise(s)")
+    finally:
+        db.close()
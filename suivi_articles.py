@@ -0,0 +1,136 @@
+# suivi_articles.py
+"""
+Suivi des écritures d'articles (ORM) pour les index en mémoire.
+
+Un seul jeu d'écouteurs de session : créations / renommages / transferts /
+suppressions notés en after_flush, publiés au commit sous forme de couples
+(avant, apres) d'états (company_id, nom, article_id) — None = article
+inexistant — à chaque fonction enregistrée par abonner(). Un rollback
+oublie les changements notés.
+
+IndexParEntreprise regroupe ce que partagent article_matcher et
+article_suggest : un index par entreprise construit à la demande (une
+requête), TTL, contrôle de génération pendant la construction et mise à
+jour des index déjà construits au commit.
+"""
+import time
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import Article
+
+_CHANGEMENTS = "suivi_articles_changements"  # clé de session.info
+
+EtatArticle = Tuple[Optional[int], Optional[str], int]  # (company_id, nom, article_id)
+Changement = Tuple[Optional[EtatArticle], Optional[EtatArticle]]  # (avant, apres)
+
+_abonnes: List[Callable[[List[Changement]], None]] = []
+
+
+def abonner(fonction: Callable[[List[Changement]], None]):
+    """`fonction(changements)` appelée après chaque commit touchant des articles"""
+    _abonnes.append(fonction)
+    return fonction
+
+
+def valeur_avant(article: Article, attr: str):
+    """Valeur d'avant le flush (historique de l'attribut)"""
+    historique = inspect(article).attrs[attr].history
+    return historique.deleted[0] if historique.deleted else getattr(article, attr)
+
+
+def _ancienne_valeur_chargee(cible, valeur, ancienne, initiateur):
+    """Sans effet : l'écouteur n'existe que pour active_history"""
+
+
+# Attribut expiré (après commit / rollback) puis modifié : sans active_history
+# l'ancienne valeur n'est pas chargée et l'historique ne voit aucun changement
+for _attr in (Article.company_id, Article.nom, Article.category, Article.quantite):
+    event.listen(_attr, "set", _ancienne_valeur_chargee, active_history=True)
+
+
+# -----------------------------
+# 🔄 ÉCOUTEURS DE SESSION
+# -----------------------------
+@event.listens_for(Session, "after_flush")
+def _noter_articles(session, flush_context):
+    changements = session.info.setdefault(_CHANGEMENTS, [])
+    for obj in session.new:
+        if isinstance(obj, Article):
+            changements.append((None, (obj.company_id, obj.nom, obj.id)))
+    for obj in session.dirty:
+        if isinstance(obj, Article) and session.is_modified(obj):
+            avant = (valeur_avant(obj, "company_id"), valeur_avant(obj, "nom"), obj.id)
+            apres = (obj.company_id, obj.nom, obj.id)
+            if avant != apres:
+                changements.append((avant, apres))
+    for obj in session.deleted:
+        if isinstance(obj, Article):
+            changements.append(((valeur_avant(obj, "company_id"), valeur_avant(obj, "nom"), obj.id), None))
+
+
+@event.listens_for(Session, "after_commit")
+def _publier(session):
+    changements = session.info.pop(_CHANGEMENTS, None)
+    if not changements:
+        return
+    for fonction in _abonnes:
+        fonction(changements)
+
+
+@event.listens_for(Session, "after_rollback")
+def _oublier(session):
+    session.info.pop(_CHANGEMENTS, None)
+
+
+# -----------------------------
+# 🗂️ INDEX PAR ENTREPRISE
+# -----------------------------
+class IndexParEntreprise:
+    """
+    Index en mémoire par entreprise. `construire(articles)` reçoit les
+    (id, nom) de l'entreprise et rend un index exposant `expire`,
+    `ajouter(article_id, nom)` et `retirer(article_id, nom)`.
+    """
+
+    def __init__(self, construire: Callable):
+        self._construire = construire
+        self._index: Dict[int, object] = {}
+        self._generations: Dict[int, int] = {}  # commits touchant l'entreprise (construction concurrente)
+        self._lock = Lock()
+        abonner(self._appliquer)
+
+    def interroger(self, db: Session, company_id: int, requete: Callable):
+        """`requete(index)` sur l'index de l'entreprise (construit si absent ou expiré)"""
+        with self._lock:
+            index = self._index.get(company_id)
+        if index is None or index.expire < time.monotonic():
+            with self._lock:
+                generation = self._generations.get(company_id, 0)
+            articles = db.query(Article.id, Article.nom).filter(Article.company_id == company_id).all()
+            index = self._construire(articles)
+            with self._lock:
+                if self._generations.get(company_id, 0) != generation:
+                    index.expire = 0  # écriture commitée pendant la lecture : à reconstruire
+                self._index[company_id] = index
+        with self._lock:
+            return requete(index)
+
+    def vider(self):
+        with self._lock:
+            self._index.clear()
+
+    def _appliquer(self, changements: List[Changement]):
+        with self._lock:
+            # Seuls les index déjà construits sont tenus à jour
+            for avant, apres in changements:
+                for etat in (avant, apres):
+                    if etat:
+                        self._generations[etat[0]] = self._generations.get(etat[0], 0) + 1
+                if avant and avant[0] in self._index:
+                    self._index[avant[0]].retirer(avant[2], avant[1])
+                if apres and apres[0] in self._index:
+                    self._index[apres[0]].ajouter(apres[2], apres[1])
@@ -0,0 +1,108 @@
+# tests/conftest.py
+"""
+Configuration commune des tests : base SQLite sur fichier (ou
+TEST_DATABASE_URL, par ex. PostgreSQL), workers de fond désactivés,
+dossiers d'export et de cache temporaires. Les variables sont posées avant
+l'import des modules de l'application, qui les lisent au chargement.
+"""
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+_DOSSIER = tempfile.mkdtemp(prefix="stock-tests-")
+atexit.register(shutil.rmtree, _DOSSIER, ignore_errors=True)
+
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{_DOSSIER}/test.db"
+os.environ["EMAIL_OUTBOX_WORKER"] = "false"
+os.environ["RETRAIT_ROLLUP_WORKER"] = "false"
+os.environ["STOCK_SNAPSHOT_WORKER"] = "false"
+os.environ["EXPORT_DIR"] = os.path.join(_DOSSIER, "exports")
+os.environ["REPORT_CACHE_DIR"] = os.path.join(_DOSSIER, "rapports")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import text
+
+import article_matcher
+import article_search
+import article_suggest
+import auth
+import models
+from database import Base, SessionLocal, engine
+
+MOT_DE_PASSE = "pw123456"
+
+
+@pytest.fixture
+def base_vide():
+    """Schéma recréé à vide (avec l'index de recherche), index en mémoire vidés"""
+    Base.metadata.drop_all(engine)
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS articles_fts"))
+    Base.metadata.create_all(engine)
+    article_search.installer(engine)
+    article_matcher._catalogues.vider()
+    article_suggest._index.vider()
+    yield engine
+
+
+@pytest.fixture
+def db(base_vide):
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def entreprise(db):
+    """Entreprise ACME et son administrateur bob"""
+    company = models.Company(name="ACME")
+    db.add(company)
+    db.commit()
+    db.add(models.User(
+        username="bob",
+        email="bob@example.com",
+        password_hash=auth.get_password_hash(MOT_DE_PASSE),
+        role=models.RoleEnum.ADMIN,
+        company_id=company.id,
+        first_login=False
+    ))
+    db.commit()
+    return company
+
+
+@pytest.fixture
+def client(base_vide):
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def entetes(client, entreprise):
+    """En-têtes d'authentification de bob"""
+    reponse = client.post("/auth/login", data={"username": "bob", "password": MOT_DE_PASSE})
+    assert reponse.status_code == 200, reponse.text
+    return {"Authorization": "Bearer " + reponse.json()["access_token"]}
+
+
+@pytest.fixture
+def creer_articles(db, entreprise):
+    """Fabrique : {nom: quantité} → {nom: article} de l'entreprise"""
+    def creer(quantites):
+        articles = {
+            nom: models.Article(nom=nom, quantite=quantite, poids=1.0, company_id=entreprise.id)
+            for nom, quantite in quantites.items()
+        }
+        db.add_all(articles.values())
+        db.commit()
+        return articles
+    return creer
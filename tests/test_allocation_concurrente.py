@@ -0,0 +1,93 @@
+# tests/test_allocation_concurrente.py
+"""
+Allocations simultanées sur les mêmes articles : décréments conditionnels,
+jamais de stock négatif, et en mode tout-ou-rien aucune allocation appliquée
+à moitié.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func
+
+import crud
+from calcul.quantites import calculer_quantites
+from database import SessionLocal
+from models import Article, Retrait
+
+FACADE = {"hauteur": 2, "longueur": 3, "largeur": 0.7}
+ALLOCATIONS = 40
+THREADS = 16
+
+
+def _pieces(company_id):
+    db = SessionLocal()
+    try:
+        pieces, _, ajustements = crud.allocate_echafaudage(db, company_id=company_id, **FACADE)
+    finally:
+        db.close()
+    assert not ajustements
+    return pieces
+
+
+def _allouer(pieces, company_id, tout_ou_rien):
+    db = SessionLocal()
+    try:
+        return crud.apply_allocation_to_stock(db, pieces, company_id=company_id, tout_ou_rien=tout_ou_rien)
+    finally:
+        db.close()
+
+
+def _lancer(pieces, company_id, tout_ou_rien):
+    with ThreadPoolExecutor(THREADS) as pool:
+        return list(pool.map(lambda _: _allouer(pieces, company_id, tout_ou_rien), range(ALLOCATIONS)))
+
+
+def _etat(db):
+    db.expire_all()
+    stock = dict(db.query(Article.id, Article.quantite))
+    sorti = dict(db.query(Retrait.article_id, func.sum(Retrait.quantite)).group_by(Retrait.article_id))
+    return stock, sorti
+
+
+def _preparer(db, entreprise, creer_articles, possibles, limitant_possibles):
+    """Stock pour `possibles` allocations ; le premier article n'en permet que `limitant_possibles`"""
+    besoins, _ = calculer_quantites(**FACADE)
+    initial = {
+        nom: qte * (limitant_possibles if i == 0 else possibles) + (qte - 1 if i == 0 else 0)
+        for i, (nom, qte) in enumerate(besoins.items())
+    }
+    articles = creer_articles(initial)
+    pieces = _pieces(entreprise.id)
+    return pieces, {articles[nom].id: (initial[nom], besoins[nom]) for nom in besoins}
+
+
+def test_allocations_tout_ou_rien_concurrentes(db, entreprise, creer_articles):
+    pieces, articles = _preparer(db, entreprise, creer_articles, possibles=30, limitant_possibles=5)
+
+    erreurs = _lancer(pieces, entreprise.id, tout_ou_rien=True)
+
+    reussies = sum(1 for e in erreurs if not e)
+    assert reussies == 5
+    stock, sorti = _etat(db)
+    for article_id, (initial, besoin) in articles.items():
+        # Chaque allocation réussie a sorti toutes ses lignes, les autres aucune
+        assert sorti.get(article_id, 0) == reussies * besoin
+        assert stock[article_id] == initial - reussies * besoin
+        assert stock[article_id] >= 0
+
+
+def test_allocations_partielles_jamais_negatives(db, entreprise, creer_articles):
+    pieces, articles = _preparer(db, entreprise, creer_articles, possibles=30, limitant_possibles=5)
+
+    _lancer(pieces, entreprise.id, tout_ou_rien=False)
+
+    stock, sorti = _etat(db)
+    for article_id, (initial, besoin) in articles.items():
+        assert stock[article_id] >= 0
+        # Chaque ligne sortie l'est en entier et correspond à un décrément
+        assert sorti.get(article_id, 0) % besoin == 0
+        assert stock[article_id] == initial - sorti.get(article_id, 0)
+    # 40 demandes : l'article limitant en sert 5, les autres 30 (stock épuisé)
+    limitant, *autres = articles
+    assert sorti[limitant] == 5 * articles[limitant][1]
+    for article_id in autres:
+        assert sorti[article_id] == 30 * articles[article_id][1]
@@ -0,0 +1,84 @@
+"""
+Résolution approchée des noms saisis : acceptation (SEUIL_ACCEPTATION,
+ECART_MIN), jamais d'article portant d'autres nombres, candidats rendus
+quand la saisie est ambiguë ; catalogue tenu à jour au commit.
+"""
+import pytest
+
+import article_matcher
+
+NOMS = ["Poteau 2m", "Poteau 3m", "Echafaudage 2m", "Planche 2m A", "Planche 2m B", "Madrier 5m"]
+
+
+@pytest.fixture
+def catalogue(creer_articles, entreprise):
+    articles = creer_articles({nom: 10 for nom in NOMS})
+    return entreprise.id, {nom: a.id for nom, a in articles.items()}
+
+
+def _candidats(resolution):
+    return [c[1] for c in resolution.candidats]
+
+
+def test_forme_compacte_identique(db, catalogue):
+    company_id, ids = catalogue
+    resolution = article_matcher.resoudre(db, company_id, "poteau 2 m")
+    assert (resolution.article_id, resolution.nom) == (ids["Poteau 2m"], "Poteau 2m")
+
+
+def test_faute_de_frappe_acceptee(db, catalogue):
+    company_id, ids = catalogue
+    resolution = article_matcher.resoudre(db, company_id, "echafadage 2m")
+    assert resolution.article_id == ids["Echafaudage 2m"]
+    assert resolution.candidats[0][2] >= article_matcher.SEUIL_ACCEPTATION
+
+
+def test_jamais_un_autre_nombre(db, catalogue):
+    company_id, _ = catalogue
+    resolution = article_matcher.resoudre(db, company_id, "poteau 4 m")
+    assert resolution.article_id is None
+    assert "Poteau 2m" in _candidats(resolution)
+
+
+def test_sous_le_seuil(monkeypatch, db, catalogue):
+    company_id, ids = catalogue
+    resolution = article_matcher.resoudre(db, company_id, "madr 5m")
+    assert resolution.article_id is None
+    assert _candidats(resolution) == ["Madrier 5m"]
+
+    monkeypatch.setattr(article_matcher, "SEUIL_ACCEPTATION", 0.6)
+    assert article_matcher.resoudre(db, company_id, "madr 5m").article_id == ids["Madrier 5m"]
+
+
+def test_ambigu_rend_les_candidats(monkeypatch, db, catalogue):
+    company_id, ids = catalogue
+    resolution = article_matcher.resoudre(db, company_id, "planche 2m")
+    assert resolution.article_id is None
+    assert set(_candidats(resolution)[:2]) == {"Planche 2m A", "Planche 2m B"}
+    assert resolution.candidats[0][2] == resolution.candidats[1][2]
+
+    monkeypatch.setattr(article_matcher, "ECART_MIN", 0.0)
+    assert article_matcher.resoudre(db, company_id, "planche 2m").article_id in (
+        ids["Planche 2m A"], ids["Planche 2m B"]
+    )
+
+
+def test_catalogue_tenu_a_jour_au_commit(db, catalogue):
+    from models import Article
+
+    company_id, ids = catalogue
+    assert article_matcher.resoudre(db, company_id, "madrier 5m").article_id == ids["Madrier 5m"]
+
+    madrier = db.get(Article, ids["Madrier 5m"])
+    madrier.nom = "Bastaing 5m"
+    db.rollback()
+    assert article_matcher.resoudre(db, company_id, "madrier 5m").article_id == ids["Madrier 5m"]
+
+    madrier.nom = "Bastaing 5m"
+    db.commit()
+    assert article_matcher.resoudre(db, company_id, "madrier 5m").article_id is None
+    assert article_matcher.resoudre(db, company_id, "bastaing 5 m").article_id == ids["Madrier 5m"]
+
+    db.delete(madrier)
+    db.commit()
+    assert article_matcher.resoudre(db, company_id, "bastaing 5 m").article_id is None
@@ -0,0 +1,35 @@
+"""
+Recherche d'articles : au-delà de SEUIL_CLASSEMENT correspondances, mêmes
+résultats que la recherche classée, dans l'ordre des id.
+"""
+import pytest
+
+import article_search
+from crud_filters import search_articles
+from database import engine
+
+
+@pytest.fixture
+def catalogue(db, entreprise):
+    from models import Article
+
+    noms = [f"Poteau {n}m" for n in range(1, 13)] + ["Moise 3.07m", "Plinthe alu 42"]
+    db.add_all([Article(nom=nom, quantite=5, company_id=entreprise.id) for nom in noms])
+    db.commit()
+    return entreprise.id
+
+
+@pytest.mark.parametrize("recherche", ["poteau", "poteau 2", "plinthe", "introuvable"])
+def test_mots_courants_sans_classement(monkeypatch, db, catalogue, recherche):
+    if engine.dialect.name != "sqlite":
+        pytest.skip("repli propre à l'index FTS5")
+    classes = search_articles(db, search=recherche, company_id=catalogue, limit=None)
+
+    monkeypatch.setattr(article_search, "SEUIL_CLASSEMENT", 3)
+    courants = search_articles(db, search=recherche, company_id=catalogue, limit=None)
+    page = search_articles(db, search=recherche, company_id=catalogue, limit=4)
+
+    assert {a.id for a in courants} == {a.id for a in classes}
+    ids = [a.id for a in courants]
+    assert ids == sorted(ids)
+    assert [a.id for a in page] == ids[:4]
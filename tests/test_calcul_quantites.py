@@ -0,0 +1,30 @@
+"""
+Moteur de quantités : dimensions non arrondies (le cache ne change pas les
+résultats), version vectorisée identique à la version scalaire.
+"""
+from calcul.batch import calculer_quantites_batch
+from calcul.quantites import cache_clear, calculer_quantites
+
+DIMENSIONS = [(2.0, 6.14), (2.0004, 6.1404), (6.0, 20.0), (6.0001, 20.0001), (12.3, 45.7)]
+
+
+def test_dimensions_non_arrondies():
+    cache_clear()
+    _, exacte = calculer_quantites(2.0, 6.14, 0.7)
+    _, juste_au_dessus = calculer_quantites(2.0004, 6.1404, 0.7)
+    assert exacte["nb_niveaux"] == 1
+    assert juste_au_dessus["nb_niveaux"] == 2
+    assert juste_au_dessus["nb_travees"] == exacte["nb_travees"] + 1
+
+
+def test_batch_identique_au_scalaire():
+    pieces_lot, geometrie_lot = calculer_quantites_batch(
+        [h for h, _ in DIMENSIONS], [l for _, l in DIMENSIONS]
+    )
+    for i, (hauteur, longueur) in enumerate(DIMENSIONS):
+        pieces, geometrie = calculer_quantites(hauteur, longueur, 0.7)
+        assert {nom: int(q[i]) for nom, q in pieces_lot.items() if q[i]} == {
+            nom: q for nom, q in pieces.items() if q
+        }
+        assert int(geometrie_lot["nb_niveaux"][i]) == geometrie["nb_niveaux"]
+        assert int(geometrie_lot["amarrages_calcules"][i]) == geometrie["amarrages_calcules"]
@@ -0,0 +1,51 @@
+# tests/test_calcul_queries.py
+"""
+/calcul/ résout la nomenclature en une requête : le nombre de requêtes SQL
+ne dépend pas de la taille de la façade (ni du nombre de pièces).
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from calcul.quantites import calculer_quantites
+from database import engine
+
+PETITE = {"hauteur": 2, "longueur": 3, "largeur": 0.7}
+GRANDE = {"hauteur": 40, "longueur": 120, "largeur": 0.7}
+
+
+@contextmanager
+def compter_requetes():
+    requetes = []
+
+    def noter(conn, cursor, statement, parameters, context, executemany):
+        requetes.append(statement)
+
+    event.listen(engine, "before_cursor_execute", noter)
+    try:
+        yield requetes
+    finally:
+        event.remove(engine, "before_cursor_execute", noter)
+
+
+def _requetes_calcul(client, entetes, facade):
+    with compter_requetes() as requetes:
+        reponse = client.post("/calcul/", json=facade, headers=entetes)
+    assert reponse.status_code == 200, reponse.text
+    return reponse.json(), requetes
+
+
+def test_calcul_nombre_de_requetes_constant(client, entetes, creer_articles):
+    pieces, _ = calculer_quantites(GRANDE["hauteur"], GRANDE["longueur"], GRANDE["largeur"])
+    creer_articles({nom: 100000 for nom in pieces})
+
+    _requetes_calcul(client, entetes, PETITE)  # principal mis en cache par auth
+
+    petite, requetes_petite = _requetes_calcul(client, entetes, PETITE)
+    grande, requetes_grande = _requetes_calcul(client, entetes, GRANDE)
+
+    assert len(grande["pieces"]) > len(petite["pieces"])
+    assert not grande["ajustements"]
+    assert len(requetes_grande) == len(requetes_petite)
+    # Catalogue : une seule lecture de articles quelle que soit la façade
+    assert sum("FROM articles" in r for r in requetes_grande) == 1
@@ -0,0 +1,84 @@
+"""
+Jobs d'export PDF : limite par entreprise sous requêtes simultanées, jobs
+visibles depuis une autre session (autre worker), nettoyage du dossier.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+import exports
+from database import SessionLocal
+from models import ExportJob
+
+
+def test_limite_par_entreprise_sous_concurrence(monkeypatch, db, entreprise, creer_articles):
+    creer_articles({"Poteau 2m": 5})
+    # Les 3 jobs admis lisent leurs données en même temps, les autres arrivent pendant
+    charge_lente = threading.Barrier(3, timeout=10)
+    charger = exports.charger_donnees
+
+    def charger_lentement(*args):
+        charge_lente.wait()
+        time.sleep(0.2)
+        return charger(*args)
+
+    monkeypatch.setattr(exports, "charger_donnees", charger_lentement)
+    monkeypatch.setattr(exports, "EXPORT_JOBS_PAR_ENTREPRISE", 3)
+
+    def soumettre(_):
+        session = SessionLocal()
+        try:
+            return exports.soumettre(session, "low-stock", entreprise.id, 1, {"threshold": 10})["job_id"]
+        except HTTPException as e:
+            return e.status_code
+        finally:
+            session.close()
+
+    with ThreadPoolExecutor(8) as pool:
+        resultats = list(pool.map(soumettre, range(8)))
+
+    acceptes = [r for r in resultats if isinstance(r, str)]
+    assert len(acceptes) == 3
+    assert resultats.count(429) == 5
+
+    # Jobs en base : visibles d'une autre session, rendus par le pool
+    autre = SessionLocal()
+    try:
+        for job_id in acceptes:
+            for _ in range(200):
+                job = exports.get_job(autre, job_id)
+                if job["statut"] != "en_cours":
+                    break
+                autre.rollback()
+                time.sleep(0.1)
+            assert job["statut"] == "termine", job
+            assert os.path.getsize(exports.chemin_fichier(job)) == job["taille_octets"]
+    finally:
+        autre.close()
+    exports.arreter()
+
+
+def test_echec_de_lecture_libere_la_place(db, entreprise):
+    # Aucun article : 404, le job réservé est supprimé
+    with pytest.raises(HTTPException) as erreur:
+        exports.soumettre(db, "low-stock", entreprise.id, 1, {"threshold": 10})
+    assert erreur.value.status_code == 404
+    assert db.query(ExportJob).count() == 0
+
+
+def test_nettoyer_dossier_garde_les_fichiers_recents(tmp_path, monkeypatch):
+    monkeypatch.setattr(exports, "EXPORT_DIR", str(tmp_path))
+    recent, ancien = tmp_path / "recent.pdf", tmp_path / "ancien.pdf.part"
+    recent.write_bytes(b"%PDF")
+    ancien.write_bytes(b"%PDF")
+    vieux = time.time() - max(exports.EXPORT_TTL, exports.EXPORT_JOB_TIMEOUT) - 60
+    os.utime(ancien, (vieux, vieux))
+
+    exports.nettoyer_dossier()
+
+    assert recent.exists()
+    assert not ancien.exists()
@@ -0,0 +1,84 @@
+# tests/test_index_plans.py
+"""
+Plans d'exécution des requêtes de liste filtrées par entreprise : les index
+composites ix_*_company_id_* (migration 3c9a1f5d2b7e) sont utilisés.
+SQLite : EXPLAIN QUERY PLAN. PostgreSQL : EXPLAIN, parcours séquentiels
+désactivés (sur des tables de test minuscules le planner les préférerait).
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from models import Article, Chantier, Retrait, User
+from pagination import PAGE_SIZE_DEFAULT, _apres
+
+
+def _plan(db, query) -> str:
+    sql = str(query.statement.compile(db.get_bind(), compile_kwargs={"literal_binds": True}))
+    dialecte = db.get_bind().dialect.name
+    if dialecte == "sqlite":
+        lignes = db.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+        return "\n".join(str(ligne[-1]) for ligne in lignes)
+    if dialecte == "postgresql":
+        db.execute(text("SET LOCAL enable_seqscan = off"))
+        return "\n".join(ligne[0] for ligne in db.execute(text(f"EXPLAIN {sql}")))
+    pytest.skip(f"EXPLAIN non vérifié pour {dialecte}")
+
+
+def _page(query, colonnes, descendant=True, curseur=None):
+    """Même forme que pagination.paginer"""
+    if curseur:
+        query = query.filter(_apres(colonnes, curseur, descendant))
+    ordre = [c.desc() if descendant else c.asc() for c in colonnes]
+    return query.order_by(*ordre).limit(PAGE_SIZE_DEFAULT + 1)
+
+
+@pytest.fixture
+def donnees(db, entreprise, creer_articles):
+    articles = creer_articles({f"Article {i}": 10 for i in range(50)})
+    debut = datetime(2026, 1, 1)
+    db.add_all(
+        Retrait(article_id=a.id, company_id=entreprise.id, quantite=1, date_retrait=debut + timedelta(hours=i))
+        for i, a in enumerate(articles.values())
+    )
+    db.add_all(
+        Chantier(company_id=entreprise.id, nom_chantier=f"C{i}", date_creation=debut + timedelta(days=i))
+        for i in range(50)
+    )
+    db.commit()
+    db.execute(text("ANALYZE"))
+    db.commit()
+    return entreprise.id
+
+
+def test_plan_articles_par_noms(db, donnees):
+    query = db.query(Article).filter(
+        Article.nom.in_(["Article 1", "Article 2"]),
+        Article.company_id == donnees
+    )
+    assert "ix_articles_company_id_nom" in _plan(db, query)
+
+
+def test_plan_historique_retraits(db, donnees):
+    colonnes = [Retrait.date_retrait, Retrait.id]
+    query = db.query(Retrait).filter(Retrait.company_id == donnees)
+    for curseur in (None, [datetime(2026, 1, 2), 25]):
+        plan = _plan(db, _page(query, colonnes, curseur=curseur))
+        assert "ix_retraits_company_id_date_retrait" in plan
+        assert "TEMP B-TREE" not in plan  # ORDER BY servi par l'index
+
+
+def test_plan_historique_chantiers(db, donnees):
+    colonnes = [Chantier.date_creation, Chantier.id]
+    query = db.query(Chantier).filter(Chantier.company_id == donnees)
+    for curseur in (None, [datetime(2026, 1, 20), 20]):
+        plan = _plan(db, _page(query, colonnes, curseur=curseur))
+        assert "ix_chantiers_company_id_date_creation" in plan
+        assert "TEMP B-TREE" not in plan
+
+
+def test_plan_utilisateurs_entreprise(db, donnees):
+    query = db.query(User).filter(User.company_id == donnees)
+    assert "ix_users_company_id" in _plan(db, _page(query, [User.id], descendant=False))
+
@@ -0,0 +1,38 @@
+"""
+Base create_all dont les articles précèdent le journal des mouvements :
+installer() prend le snapshot d'ouverture, comme la migration.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+import mouvements_stock
+from database import engine
+from models import MouvementStock, StockSnapshot
+
+
+def test_snapshot_ouverture_articles_sans_mouvement(db, entreprise, creer_articles):
+    articles = creer_articles({"Poteau 2m": 40, "Moise 3.07m": 12})
+    # Articles antérieurs au journal : aucun mouvement
+    db.query(MouvementStock).delete()
+    db.commit()
+    assert mouvements_stock.quantites_au(db, entreprise.id, datetime.utcnow()) == {}
+
+    mouvements_stock.installer(engine)
+    mouvements_stock.installer(engine)  # idempotent
+
+    assert db.query(StockSnapshot).filter(StockSnapshot.company_id == entreprise.id).count() == 1
+    assert mouvements_stock.quantites_au(db, entreprise.id, datetime.utcnow()) == {
+        a.id: a.quantite for a in articles.values()
+    }
+    # Avant le snapshot : historique indisponible (400), pas une liste vide
+    with pytest.raises(HTTPException) as erreur:
+        mouvements_stock.quantites_au(db, entreprise.id, datetime.utcnow() - timedelta(days=1))
+    assert erreur.value.status_code == 400
+
+
+def test_pas_de_snapshot_quand_le_journal_couvre_tout(db, entreprise, creer_articles):
+    creer_articles({"Poteau 2m": 40})
+    mouvements_stock.installer(engine)
+    assert db.query(StockSnapshot).count() == 0
@@ -0,0 +1,183 @@
+# tests/test_outbox_smtp.py
+"""
+Worker de l'outbox face à un serveur SMTP local (aiosmtpd) : envoi normal,
+refus temporaire (4xx → backoff), refus définitif (5xx → FAILED), connexion
+coupée par le serveur (→ reconnexion), effacement du corps et purge.
+"""
+import asyncio
+import email as email_parser
+import socket
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+import email_service
+import outbox
+from models import EmailOutbox, EmailStatusEnum
+
+REFUS_TEMPORAIRE = "temporaire@example.com"
+REFUS_DEFINITIF = "inconnu@example.com"
+
+
+class ServeurSMTP:
+    """Handler aiosmtpd : messages reçus, connexions authentifiées, coupure sur demande"""
+
+    def __init__(self):
+        self.messages = []
+        self.connexions = 0
+        self.couper_apres_envoi = False
+        self.coupee = threading.Event()  # connexion fermée côté serveur
+
+    def authentifier(self, server, session, envelope, mechanism, auth_data):
+        self.connexions += 1
+        return AuthResult(success=True)
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == REFUS_TEMPORAIRE:
+            return "450 Boîte occupée, réessayez plus tard"
+        if address == REFUS_DEFINITIF:
+            return "550 Destinataire inconnu"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        message = email_parser.message_from_bytes(envelope.content)
+        texte = "".join(
+            partie.get_payload(decode=True).decode() for partie in message.walk() if not partie.is_multipart()
+        )
+        self.messages.append((envelope.rcpt_tos[0], texte))
+        if self.couper_apres_envoi:
+            self.couper_apres_envoi = False
+            # Coupure côté serveur juste après la réponse (redémarrage, timeout)
+            asyncio.get_running_loop().call_later(0.05, self._couper, server)
+        return "250 Message accepté"
+
+    def _couper(self, server):
+        server.transport.close()
+        # Après la fermeture effective du socket (planifiée par close())
+        asyncio.get_running_loop().call_soon(self.coupee.set)
+
+
+def _port_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    handler = ServeurSMTP()
+    port = _port_libre()
+    controller = Controller(
+        handler, hostname="127.0.0.1", port=port,
+        authenticator=handler.authentifier, auth_require_tls=False
+    )
+    controller.start()
+    monkeypatch.setattr(email_service, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(email_service, "SMTP_PORT", port)
+    monkeypatch.setattr(email_service, "SMTP_USER", "outbox")
+    monkeypatch.setattr(email_service, "SMTP_PASSWORD", "secret")
+    monkeypatch.setattr(email_service, "SMTP_FROM", "stock@example.com")
+    monkeypatch.setattr(email_service, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(email_service, "SMTP_TIMEOUT", 5)
+    yield handler
+    controller.stop()
+
+
+@pytest.fixture
+def connexion():
+    c = outbox._ConnexionSMTP()
+    yield c
+    c.fermer()
+
+
+def _bienvenue(db, destinataire, mot_de_passe="Tmp-12345"):
+    email = outbox.enqueue_welcome_email(db, "alice", destinataire, mot_de_passe, "user", "ACME")
+    db.commit()
+    return email
+
+
+def test_envoi_normal(db, smtp, connexion):
+    email = _bienvenue(db, "alice@example.com", "Tmp-secret-1")
+
+    assert outbox.traiter_lot(db, connexion) == 1
+
+    db.refresh(email)
+    assert email.status == EmailStatusEnum.SENT
+    assert email.sent_at is not None and email.attempts == 1
+    assert email.body is None  # mot de passe temporaire non conservé
+    (destinataire, contenu), = smtp.messages
+    assert destinataire == "alice@example.com"
+    assert "Tmp-secret-1" in contenu
+
+
+def test_refus_temporaire_replanifie(db, smtp, connexion):
+    email = _bienvenue(db, REFUS_TEMPORAIRE)
+    avant = datetime.utcnow()
+
+    outbox.traiter_lot(db, connexion)
+
+    db.refresh(email)
+    assert email.status == EmailStatusEnum.PENDING
+    assert email.attempts == 1
+    assert "450" in email.last_error
+    assert email.next_attempt_at >= avant + outbox._delai_backoff(1) - timedelta(seconds=1)
+    assert email.body is not None  # encore à envoyer
+    # Pas encore échu : le lot suivant ne le reprend pas
+    assert outbox.traiter_lot(db, connexion) == 0
+    assert not smtp.messages
+
+
+def test_refus_definitif_echec(db, smtp, connexion):
+    email = _bienvenue(db, REFUS_DEFINITIF)
+    suivant = _bienvenue(db, "bob@example.com")
+
+    assert outbox.traiter_lot(db, connexion) == 2
+
+    db.refresh(email)
+    db.refresh(suivant)
+    assert email.status == EmailStatusEnum.FAILED
+    assert email.attempts == 1 and "550" in email.last_error
+    assert email.body is None
+    # Un refus de destinataire n'interrompt pas le lot
+    assert suivant.status == EmailStatusEnum.SENT
+    assert [d for d, _ in smtp.messages] == ["bob@example.com"]
+
+
+def test_connexion_coupee_reconnexion(db, smtp, connexion):
+    premier = _bienvenue(db, "alice@example.com")
+    smtp.couper_apres_envoi = True
+    assert outbox.traiter_lot(db, connexion) == 1
+    assert smtp.connexions == 1
+
+    deuxieme = _bienvenue(db, "bob@example.com")
+    troisieme = _bienvenue(db, "carol@example.com")
+    # Connexion réutilisée fermée par le serveur avant le lot suivant
+    assert smtp.coupee.wait(timeout=5)
+
+    assert outbox.traiter_lot(db, connexion) == 2
+
+    for email in (premier, deuxieme, troisieme):
+        db.refresh(email)
+        assert email.status == EmailStatusEnum.SENT
+    assert smtp.connexions == 2  # une reconnexion, puis connexion réutilisée
+    assert [d for d, _ in smtp.messages] == ["alice@example.com", "bob@example.com", "carol@example.com"]
+
+
+def test_purge_emails_termines(db):
+    vieux = datetime.utcnow() - timedelta(days=outbox.RETENTION_JOURS + 1)
+    db.add_all([
+        EmailOutbox(to_email="a@example.com", subject="s", body=None, status=EmailStatusEnum.SENT, created_at=vieux),
+        EmailOutbox(to_email="b@example.com", subject="s", body="x", status=EmailStatusEnum.PENDING, created_at=vieux),
+        EmailOutbox(to_email="c@example.com", subject="s", body=None, status=EmailStatusEnum.FAILED),
+    ])
+    db.commit()
+
+    assert outbox.purger(db) == 1
+    restants = {e.to_email for e in db.query(EmailOutbox)}
+    assert restants == {"b@example.com", "c@example.com"}
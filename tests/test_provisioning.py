@@ -0,0 +1,43 @@
+"""
+Lots de création d'utilisateurs : rapport ligne par ligne en base (lisible
+depuis n'importe quel worker), supprimé après PROVISIONING_JOB_TTL.
+"""
+from datetime import datetime, timedelta
+
+from database import SessionLocal
+from models import ProvisioningJob, User
+
+
+def test_lot_persiste_et_purge(client, entetes, entreprise, db):
+    reponse = client.post("/admin/create-users/bulk", headers=entetes, json={
+        "company_id": entreprise.id,
+        "users": [
+            {"username": "alice", "email": "alice@example.com"},
+            {"username": "alice", "email": "alice2@example.com"},
+            {"username": "carol", "email": "pas-un-email"},
+            {"username": "bob", "email": "bob2@example.com"},
+        ],
+    })
+    assert reponse.status_code == 200, reponse.text
+    lot = reponse.json()
+    assert (lot["total"], lot["crees"]) == (4, 1)
+    assert [l["statut"] for l in lot["lignes"]] == ["cree", "doublon", "invalide", "existe_deja"]
+
+    # Autre session (= autre worker) : le lot est en base
+    autre = SessionLocal()
+    try:
+        job = autre.get(ProvisioningJob, lot["job_id"])
+        assert (job.company_id, job.total, job.crees) == (entreprise.id, 4, 1)
+        assert autre.query(User).filter(User.username == "alice").count() == 1
+    finally:
+        autre.close()
+
+    suivi = client.get(f"/admin/create-users/bulk/{lot['job_id']}", headers=entetes)
+    assert suivi.status_code == 200
+    assert suivi.json()["lignes"][0]["user_id"] == lot["lignes"][0]["user_id"]
+
+    # Rétention dépassée : lot supprimé
+    db.query(ProvisioningJob).update({ProvisioningJob.expire_le: datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+    assert client.get(f"/admin/create-users/bulk/{lot['job_id']}", headers=entetes).status_code == 404
+    assert db.query(ProvisioningJob).count() == 0
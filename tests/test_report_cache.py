@@ -0,0 +1,73 @@
+"""
+Versions du cache des rapports : lues en base, incrémentées dans la
+transaction de l'écriture (partagées entre workers), propres à chaque
+entreprise.
+"""
+from database import SessionLocal
+from models import Article, Company
+from report_cache import TOUTES_ENTREPRISES, marquer_modification, version_donnees
+
+
+def test_version_incrementee_au_commit(db, entreprise, creer_articles):
+    avant = version_donnees(db, entreprise.id), version_donnees(db)
+    articles = creer_articles({"Poteau 2m": 5})
+
+    # Autre session (= autre worker) : voit la nouvelle version
+    autre = SessionLocal()
+    try:
+        assert version_donnees(autre, entreprise.id) == avant[0] + 1
+        assert version_donnees(autre, TOUTES_ENTREPRISES) == avant[1] + 1
+    finally:
+        autre.close()
+
+    # Rollback : version inchangée
+    articles["Poteau 2m"].quantite = 1
+    db.flush()
+    db.rollback()
+    assert version_donnees(db, entreprise.id) == avant[0] + 1
+
+    # Écriture hors ORM signalée explicitement
+    marquer_modification(db, entreprise.id)
+    db.commit()
+    assert version_donnees(db, entreprise.id) == avant[0] + 2
+
+
+def test_pdf_regenere_apres_ecriture(client, entetes, entreprise, creer_articles):
+    articles = creer_articles({"Poteau 2m": 5})
+    premiere = client.get("/export/low-stock/pdf", headers=entetes)
+    assert premiere.status_code == 200
+    etag = premiere.headers["etag"]
+
+    assert client.get("/export/low-stock/pdf", headers={**entetes, "If-None-Match": etag}).status_code == 304
+
+    # Écriture depuis une autre session : la clé change, plus de 304
+    autre = SessionLocal()
+    try:
+        autre.get(Article, articles["Poteau 2m"].id).quantite = 2
+        autre.commit()
+    finally:
+        autre.close()
+    assert client.get("/export/low-stock/pdf", headers={**entetes, "If-None-Match": etag}).status_code == 200
+
+
+def test_pdf_propre_a_l_entreprise(client, entetes, entreprise, creer_articles, db):
+    creer_articles({"Poteau 2m": 50})
+    autre = Company(name="Globex")
+    db.add(autre)
+    db.commit()
+    article_autre = Article(nom="Poteau 3m", quantite=1, poids=1.0, category="Poteaux", company_id=autre.id)
+    db.add(article_autre)
+    db.commit()
+
+    # Le stock faible de l'autre entreprise n'apparaît pas
+    assert client.get("/export/low-stock/pdf", headers=entetes).status_code == 404
+
+    premiere = client.get("/export/categories/pdf", headers=entetes)
+    assert premiere.status_code == 200
+    etag = premiere.headers["etag"]
+
+    # Écriture dans l'autre entreprise : le rapport en cache reste valide
+    article_autre.quantite = 0
+    db.add(Article(nom="Moise 3.07m", quantite=4, poids=1.0, category="Moises", company_id=autre.id))
+    db.commit()
+    assert client.get("/export/categories/pdf", headers={**entetes, "If-None-Match": etag}).status_code == 304
@@ -0,0 +1,79 @@
+# tests/test_retrait_charge.py
+"""
+Test de charge des retraits : milliers de retraits simultanés sur les mêmes
+articles (base sur fichier, un thread = une session). Le décrément
+conditionnel ne laisse jamais le stock passer sous zéro.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+from sqlalchemy import func
+
+import crud
+from database import SessionLocal
+from models import Article, MouvementStock, Retrait
+
+RETRAITS = 3000
+THREADS = 32
+STOCK = {"Poteau 2m": 1000, "Moise 3.07m": 500}
+QUANTITE = {"Poteau 2m": 1, "Moise 3.07m": 3}  # 500 n'est pas multiple de 3 : reste 2
+
+
+def _retirer(article_id, quantite, company_id):
+    db = SessionLocal()
+    try:
+        crud.retirer_article_by_id(db, article_id, quantite, company_id=company_id)
+        return "ok"
+    except HTTPException as e:
+        assert e.status_code == 400, e.detail
+        return "stock_insuffisant"
+    finally:
+        db.close()
+
+
+def test_retraits_concurrents_jamais_negatifs(db, entreprise, creer_articles):
+    articles = creer_articles(STOCK)
+    noms = list(STOCK)
+    # Ids lus avant la charge : la session du test ne doit pas servir aux threads
+    ids = {nom: article.id for nom, article in articles.items()}
+    company_id = entreprise.id
+
+    # Observateur : relit le stock minimal pendant toute la charge
+    minimum = {"valeur": min(STOCK.values())}
+    fini = threading.Event()
+
+    def observer():
+        lecture = SessionLocal()
+        try:
+            while not fini.is_set():
+                minimum["valeur"] = min(minimum["valeur"], lecture.query(func.min(Article.quantite)).scalar())
+                lecture.rollback()
+        finally:
+            lecture.close()
+
+    observateur = threading.Thread(target=observer)
+    observateur.start()
+    try:
+        with ThreadPoolExecutor(THREADS) as pool:
+            statuts = list(pool.map(
+                lambda i: (noms[i % 2], _retirer(ids[noms[i % 2]], QUANTITE[noms[i % 2]], company_id)),
+                range(RETRAITS)
+            ))
+    finally:
+        fini.set()
+        observateur.join()
+
+    assert minimum["valeur"] >= 0
+    db.expire_all()
+    for nom, article in articles.items():
+        reussis = sum(1 for n, statut in statuts if n == nom and statut == "ok")
+        assert reussis == STOCK[nom] // QUANTITE[nom]
+        db.refresh(article)
+        assert article.quantite == STOCK[nom] % QUANTITE[nom]
+        assert db.query(func.sum(Retrait.quantite)).filter(Retrait.article_id == article.id).scalar() \
+            == reussis * QUANTITE[nom]
+        # Journal de stock : un mouvement par retrait réussi
+        assert db.query(func.count(MouvementStock.id)).filter(
+            MouvementStock.article_id == article.id, MouvementStock.delta < 0
+        ).scalar() == reussis
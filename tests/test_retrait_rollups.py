@@ -0,0 +1,81 @@
+"""
+Consommation des retraits : mêmes résultats avant et après consolidation,
+y compris pour une période à cheval sur le dernier jour consolidé.
+"""
+from datetime import date, datetime
+
+import pytest
+
+import auth
+import retrait_rollups
+from models import Retrait, RoleEnum, User
+
+JOUR_CONSOLIDE = date(2026, 2, 2)  # lundi
+RETRAITS = [  # (date, article, utilisateur, quantité)
+    (datetime(2026, 1, 27, 9), "Poteau 2m", "bob", 1),
+    (datetime(2026, 1, 29, 23, 59), "Poteau 2m", "alice", 2),
+    (datetime(2026, 1, 30, 8), "Moise 3.07m", "bob", 3),
+    (datetime(2026, 2, 2, 0, 0), "Poteau 2m", "bob", 4),
+    (datetime(2026, 2, 2, 17), "Moise 3.07m", "alice", 5),
+    (datetime(2026, 2, 3, 10), "Poteau 2m", "alice", 6),
+    (datetime(2026, 2, 9, 12), "Moise 3.07m", "bob", 7),
+    (datetime(2026, 2, 10, 12), "Poteau 2m", "bob", 8),
+]
+REQUETES = [
+    {"periode": periode, "par": par, "debut": debut, "fin": fin}
+    for periode in ("jour", "semaine", "mois", "total")
+    for par in ("aucun", "article", "utilisateur")
+    for debut, fin in ((date(2026, 1, 29), date(2026, 2, 9)), (None, None), (date(2026, 2, 2), None))
+]
+
+
+@pytest.fixture
+def retraits(db, entreprise, creer_articles):
+    articles = creer_articles({"Poteau 2m": 100, "Moise 3.07m": 100})
+    alice = User(
+        username="alice", email="alice@example.com", password_hash=auth.get_password_hash("pw123456"),
+        role=RoleEnum.USER, company_id=entreprise.id, first_login=False
+    )
+    db.add(alice)
+    db.commit()
+    users = {u.username: u for u in db.query(User).all()}
+    db.add_all([
+        Retrait(
+            article_id=articles[nom].id, company_id=entreprise.id, user_id=users[qui].id,
+            nom_utilisateur=qui, quantite=q, poids_total=q * 1.0, date_retrait=quand
+        )
+        for quand, nom, qui, q in RETRAITS
+    ])
+    db.commit()
+    return entreprise.id
+
+
+def _toutes(db, company_id):
+    return [retrait_rollups.consommation(db, company_id, **r) for r in REQUETES]
+
+
+def test_identique_avant_et_apres_consolidation(db, retraits):
+    bruts = _toutes(db, retraits)
+
+    retrait_rollups.consolider(db, jusqu_au=JOUR_CONSOLIDE)
+    assert retrait_rollups.jour_consolide(db) == JOUR_CONSOLIDE
+    assert _toutes(db, retraits) == bruts
+
+    retrait_rollups.consolider(db, jusqu_au=date(2026, 2, 28))
+    assert _toutes(db, retraits) == bruts
+
+
+def test_periode_a_cheval(db, retraits):
+    retrait_rollups.consolider(db, jusqu_au=JOUR_CONSOLIDE)
+    bornes = {"debut": date(2026, 1, 29), "fin": date(2026, 2, 9)}
+
+    semaines = retrait_rollups.consommation(db, retraits, periode="semaine", **bornes)
+    assert [(l["periode"], l["quantite_totale"]) for l in semaines] == [
+        (date(2026, 1, 26), 5), (date(2026, 2, 2), 15), (date(2026, 2, 9), 7)
+    ]
+
+    mois = retrait_rollups.consommation(db, retraits, periode="mois", **bornes)
+    assert [(l["periode"], l["nombre_retraits"]) for l in mois] == [(date(2026, 1, 1), 2), (date(2026, 2, 1), 4)]
+
+    par_utilisateur = retrait_rollups.consommation(db, retraits, periode="total", par="utilisateur", **bornes)
+    assert [(l["utilisateur"], l["quantite_totale"]) for l in par_utilisateur] == [("bob", 14), ("alice", 13)]
@@ -0,0 +1,76 @@
+"""
+Stock à une date (/articles/as-of, /articles/{id}/stock-au) : quantités
+reconstruites à chaque étape d'un historique d'écritures, identiques avant
+et après prise de snapshots.
+"""
+import time
+from datetime import datetime
+
+import mouvements_stock
+
+
+def _instant():
+    time.sleep(0.01)
+    instant = datetime.utcnow()
+    time.sleep(0.01)
+    return instant
+
+
+def _lire(client, entetes, instants, poteau):
+    """(quantités par article_id via as-of, quantité du poteau via stock-au) à chaque instant"""
+    as_of, stock_au = [], []
+    for instant in instants:
+        reponse = client.get("/articles/as-of", headers=entetes, params={"date": instant.isoformat()})
+        assert reponse.status_code == 200, reponse.text
+        as_of.append({a["article_id"]: a["quantite"] for a in reponse.json()})
+        reponse = client.get(f"/articles/{poteau}/stock-au", headers=entetes, params={"date": instant.isoformat()})
+        assert reponse.status_code in (200, 404), reponse.text
+        stock_au.append(reponse.json()["quantite"] if reponse.status_code == 200 else None)
+    return as_of, stock_au
+
+
+def test_stock_au_fil_des_ecritures(client, entetes, db):
+    instants = [_instant()]
+    reponse = client.post("/articles/", headers=entetes, json={"nom": "Poteau 2m", "quantite": 40, "poids": 1.0})
+    assert reponse.status_code == 200, reponse.text
+    poteau = reponse.json()["id"]
+    moise = client.post("/articles/", headers=entetes, json={"nom": "Moise 3.07m", "quantite": 12, "poids": 1.0}).json()["id"]
+    instants.append(_instant())
+
+    assert client.post("/retraits/", headers=entetes, json={"nom_article": "Poteau 2m", "quantite": 5}).status_code == 200
+    instants.append(_instant())
+
+    reponse = client.post("/retraits/batch", headers=entetes, json={"lignes": [
+        {"nom_article": "Poteau 2m", "quantite": 10}, {"nom_article": "Moise 3.07m", "quantite": 2}
+    ]})
+    assert reponse.status_code == 200, reponse.text
+    instants.append(_instant())
+
+    assert client.post(f"/articles/{poteau}/adjust-stock?quantite=7", headers=entetes).status_code == 200
+    instants.append(_instant())
+
+    assert client.put(f"/articles/{poteau}", headers=entetes, json={"quantite": 50}).status_code == 200
+    instants.append(_instant())
+
+    assert client.delete(f"/articles/{poteau}", headers=entetes).status_code == 200
+    instants.append(_instant())
+
+    attendu = (
+        [
+            {},
+            {poteau: 40, moise: 12},
+            {poteau: 35, moise: 12},
+            {poteau: 25, moise: 10},
+            {poteau: 32, moise: 10},
+            {poteau: 50, moise: 10},
+            {moise: 10},
+        ],
+        [None, 40, 35, 25, 32, 50, None],
+    )
+    assert _lire(client, entetes, instants, poteau) == attendu
+
+    # Snapshot au milieu de l'historique puis à la fin : mêmes réponses
+    assert mouvements_stock.prendre_snapshots(db, jusqu_a=instants[3]) == 1
+    assert _lire(client, entetes, instants, poteau) == attendu
+    assert mouvements_stock.prendre_snapshots(db, jusqu_a=instants[-1]) == 1
+    assert _lire(client, entetes, instants, poteau) == attendu
@@ -0,0 +1,69 @@
+"""
+Statistiques de stock par deltas : la ligne tenue à jour à chaque écriture
+est égale au recalcul complet ; installer() remplit les bases create_all.
+"""
+import stock_stats
+from database import engine
+from models import CompanyCategoryStats, CompanyStockStats
+
+
+def _lire(db, company_id):
+    db.expire_all()
+    return stock_stats.lire_stats(db, company_id), stock_stats.lire_stats_categories(db, company_id)
+
+
+def _verifier(db, company_id):
+    incremental = _lire(db, company_id)
+    stock_stats.recalculer(db, company_id)
+    assert incremental == _lire(db, company_id)
+    return incremental
+
+
+def test_deltas_egaux_au_recalcul(client, entetes, db, entreprise):
+    cid = entreprise.id
+
+    reponse = client.post("/articles/", headers=entetes, json={"nom": "Poteau 2m", "quantite": 40, "poids": 1.0})
+    assert reponse.status_code == 200, reponse.text
+    poteau = reponse.json()["id"]
+    client.post("/articles/", headers=entetes, json={"nom": "Moise 3.07m", "quantite": 12, "poids": 1.0})
+    stats, categories = _verifier(db, cid)
+    assert stats["total_articles"] == 2 and stats["stock_total"] == 52
+    assert {c["categorie"] for c in categories} == {"poteau", "moise"}
+
+    assert client.put(f"/articles/{poteau}", headers=entetes, json={"quantite": 30}).status_code == 200
+    _verifier(db, cid)
+
+    assert client.post("/retraits/", headers=entetes, json={"nom_article": "Poteau 2m", "quantite": 5}).status_code == 200
+    _verifier(db, cid)
+
+    reponse = client.post("/retraits/batch", headers=entetes, json={"lignes": [
+        {"nom_article": "Poteau 2m", "quantite": 20}, {"nom_article": "Moise 3.07m", "quantite": 4}
+    ]})
+    assert reponse.status_code == 200, reponse.text
+    stats, _ = _verifier(db, cid)
+    assert stats["stock_total"] == 13 and stats["alertes_stock_faible"] == 2
+
+    assert client.post(f"/articles/{poteau}/adjust-stock?quantite=15", headers=entetes).status_code == 200
+    _verifier(db, cid)
+
+    assert client.delete(f"/articles/{poteau}", headers=entetes).status_code == 200
+    stats, categories = _verifier(db, cid)
+    assert stats == {"total_articles": 1, "stock_total": 8, "alertes_stock_faible": 1, "categories": 1}
+    assert [c["categorie"] for c in categories] == ["moise"]
+
+
+def test_installer_remplit_les_bases_create_all(client, entetes, db, entreprise, creer_articles):
+    creer_articles({"Poteau 2m": 40, "Moise 3.07m": 12})
+    # Base create_all : tables de statistiques vides
+    db.query(CompanyCategoryStats).delete()
+    db.query(CompanyStockStats).delete()
+    db.commit()
+
+    stock_stats.installer(engine)
+    stock_stats.installer(engine)  # rien à refaire
+
+    stats, _ = _lire(db, entreprise.id)
+    assert stats == {"total_articles": 2, "stock_total": 52, "alertes_stock_faible": 0, "categories": 2}
+    assert client.post("/retraits/", headers=entetes, json={"nom_article": "Poteau 2m", "quantite": 5}).status_code == 200
+    assert client.get("/stats/stock", headers=entetes).json()["stock_total"] == 47
+    _verifier(db, entreprise.id)
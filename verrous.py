@@ -0,0 +1,26 @@
+# verrous.py
+"""
+Verrous de jobs de fond partagés par tous les processus.
+
+Une ligne de rollup_etats par job (consolidation des retraits, snapshots de
+stock...) : la verrouiller (FOR UPDATE) garantit qu'un seul worker exécute
+le job à la fois. La ligne porte aussi l'avancement éventuel du job
+(jour_consolide).
+"""
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import RollupEtat
+
+
+def verrouiller_etat(db: Session, nom: str) -> RollupEtat:
+    """Ligne d'état verrouillée (FOR UPDATE) : un seul job `nom` à la fois, tous processus confondus"""
+    etat = db.query(RollupEtat).filter(RollupEtat.nom == nom).with_for_update().first()
+    if etat is None:
+        try:
+            db.add(RollupEtat(nom=nom))
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # créée par un autre processus
+        etat = db.query(RollupEtat).filter(RollupEtat.nom == nom).with_for_update().one()
+    return etat